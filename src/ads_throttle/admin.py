@@ -1,18 +1,78 @@
+import ipaddress
+
 from django import forms
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Q
+from django.http import StreamingHttpResponse
 from django.utils.translation import gettext as gettext
 from django.utils.translation import gettext_lazy as _
 
-from .models import AdsThrottleEvent, AdsThrottleOverride, SiteSetting
+from .export import EXPORT_FORMATS, export_events
+from .models import (
+    AdsThrottleCompactEvent,
+    AdsThrottleCompactOverride,
+    AdsThrottleEvent,
+    AdsThrottleOverride,
+    ScopeProfile,
+    SiteSetting,
+)
+from .overrides import batched_invalidation, create_overrides, fingerprint_viewer_id
 from .throttling import _hash_ip
 
 
+class HashSearchMixin:
+    """Let admin search match hashed identifiers by raw IP address.
+
+    ``hash_search_fields`` lists the fields compared against the hash of a
+    searched IP address. With ``digest_search`` the fields hold binary digests,
+    and a hex search term is matched against them as well.
+    """
+
+    hash_search_fields = ("ip_address_hash",)
+    digest_search = False
+
+    def get_hash_search_values(self, search_term):
+        term = search_term.strip()
+        if not term:
+            return []
+        try:
+            ipaddress.ip_address(term)
+        except ValueError:
+            hashed_ip = None
+        else:
+            hashed_ip = _hash_ip(term)
+        if not self.digest_search:
+            return [hashed_ip] if hashed_ip else []
+        if hashed_ip:
+            return [bytes.fromhex(hashed_ip)]
+        try:
+            digest = bytes.fromhex(term)
+        except ValueError:
+            return []
+        return [digest] if digest else []
+
+    def get_search_results(self, request, queryset, search_term):
+        queryset, use_distinct = super().get_search_results(
+            request, queryset, search_term
+        )
+        values = self.get_hash_search_values(search_term)
+        if values:
+            hash_filter = Q()
+            for field in self.hash_search_fields:
+                hash_filter |= Q(**{f"{field}__in": values})
+            queryset |= self.model.objects.filter(hash_filter)
+        return queryset, use_distinct
+
+
 @admin.register(SiteSetting)
 class SiteSettingAdmin(admin.ModelAdmin):
     list_display = (
         "view_repeat_window_seconds",
         "view_repeat_threshold",
         "block_seconds",
+        "ip_repeat_threshold",
+        "site_ip_repeat_threshold",
         "event_record_seconds",
         "updated_at",
     )
@@ -23,6 +83,23 @@ class SiteSettingAdmin(admin.ModelAdmin):
         return super().has_add_permission(request)
 
 
+@admin.register(ScopeProfile)
+class ScopeProfileAdmin(admin.ModelAdmin):
+    list_display = (
+        "scope",
+        "match",
+        "view_repeat_window_seconds",
+        "view_repeat_threshold",
+        "block_seconds",
+        "ip_repeat_threshold",
+        "site_ip_repeat_threshold",
+        "updated_at",
+    )
+    list_filter = ("match",)
+    search_fields = ("scope",)
+    ordering = ("scope",)
+
+
 class AdsThrottleOverrideAdminForm(forms.ModelForm):
     APPLY_TO_USER = "user"
     APPLY_TO_IP = "ip"
@@ -135,7 +212,7 @@ class AdsThrottleOverrideAdminForm(forms.ModelForm):
 
 
 @admin.register(AdsThrottleOverride)
-class AdsThrottleOverrideAdmin(admin.ModelAdmin):
+class AdsThrottleOverrideAdmin(HashSearchMixin, admin.ModelAdmin):
     form = AdsThrottleOverrideAdminForm
     list_display = (
         "display_scope",
@@ -161,23 +238,6 @@ class AdsThrottleOverrideAdmin(admin.ModelAdmin):
         queryset = super().get_queryset(request)
         return queryset.select_related("user")
 
-    def get_search_results(self, request, queryset, search_term):
-        queryset, use_distinct = super().get_search_results(
-            request, queryset, search_term
-        )
-        if search_term:
-            hashed_ip = None
-            try:
-                import ipaddress
-
-                ipaddress.ip_address(search_term.strip())
-                hashed_ip = _hash_ip(search_term.strip())
-            except ValueError:
-                hashed_ip = None
-            if hashed_ip:
-                queryset |= self.model.objects.filter(ip_address_hash=hashed_ip)
-        return queryset, use_distinct
-
     @admin.display(description=_("Scope"))
     def display_scope(self, obj):
         return obj.scope or gettext("All")
@@ -200,9 +260,13 @@ class AdsThrottleOverrideAdmin(admin.ModelAdmin):
                 obj.viewer_id = f"user:{obj.user.pk}"
         super().save_model(request, obj, form, change)
 
+    def delete_queryset(self, request, queryset):
+        with batched_invalidation():
+            super().delete_queryset(request, queryset)
+
 
 @admin.register(AdsThrottleEvent)
-class AdsThrottleEventAdmin(admin.ModelAdmin):
+class AdsThrottleEventAdmin(HashSearchMixin, admin.ModelAdmin):
     list_display = (
         "display_scope",
         "viewer_hash",
@@ -225,33 +289,135 @@ class AdsThrottleEventAdmin(admin.ModelAdmin):
         "blocked",
     )
     date_hierarchy = "last_seen"
+    actions = (
+        "block_ip_addresses",
+        "block_viewers",
+        "export_csv",
+        "export_ndjson",
+        "export_parquet",
+    )
 
     def has_add_permission(self, request):
         return False
 
+    def has_block_permission(self, request):
+        override_model = (
+            AdsThrottleCompactOverride
+            if self.model is AdsThrottleCompactEvent
+            else AdsThrottleOverride
+        )
+        opts = override_model._meta
+        return request.user.has_perm(f"{opts.app_label}.add_{opts.model_name}")
+
+    @admin.action(
+        permissions=["block"],
+        description=_("Block IP addresses of selected events"),
+    )
+    def block_ip_addresses(self, request, queryset):
+        hashes = [event.ip_address_hash for event in queryset.iterator()]
+        self._report_blocked(
+            request,
+            create_overrides(ip_address_hashes=[value for value in hashes if value]),
+            len(set(filter(None, hashes))),
+        )
+
+    @admin.action(
+        permissions=["block"],
+        description=_("Block viewers of selected events"),
+    )
+    def block_viewers(self, request, queryset):
+        viewer_ids = {
+            fingerprint_viewer_id(event.viewer_hash) for event in queryset.iterator()
+        }
+        self._report_blocked(
+            request, create_overrides(viewer_ids=viewer_ids), len(viewer_ids)
+        )
+
+    def _report_blocked(self, request, created, targets):
+        self.message_user(
+            request,
+            gettext(
+                "Site-wide block overrides created: %(created)d; "
+                "already blocked: %(existing)d."
+            )
+            % {"created": created, "existing": targets - created},
+            messages.SUCCESS,
+        )
+
+    @admin.action(permissions=["view"], description=_("Export selected events as CSV"))
+    def export_csv(self, request, queryset):
+        return self._export(request, queryset, "csv")
+
+    @admin.action(
+        permissions=["view"], description=_("Export selected events as NDJSON")
+    )
+    def export_ndjson(self, request, queryset):
+        return self._export(request, queryset, "ndjson")
+
+    @admin.action(
+        permissions=["view"], description=_("Export selected events as Parquet")
+    )
+    def export_parquet(self, request, queryset):
+        return self._export(request, queryset, "parquet")
+
+    def _export(self, request, queryset, export_format):
+        try:
+            chunks = export_events(queryset, export_format)
+        except ImproperlyConfigured:
+            self.message_user(
+                request,
+                gettext("Parquet export requires the pyarrow package."),
+                messages.ERROR,
+            )
+            return None
+        content_type, extension = EXPORT_FORMATS[export_format]
+        response = StreamingHttpResponse(chunks, content_type=content_type)
+        response["Content-Disposition"] = (
+            f'attachment; filename="{self.model._meta.model_name}.{extension}"'
+        )
+        return response
+
     def has_change_permission(self, request, obj=None):
         return False
 
     def has_delete_permission(self, request, obj=None):
         return request.user.is_superuser
 
-    def get_search_results(self, request, queryset, search_term):
-        queryset, use_distinct = super().get_search_results(
-            request, queryset, search_term
-        )
-        if search_term:
-            hashed_ip = None
-            try:
-                import ipaddress
-
-                ipaddress.ip_address(search_term.strip())
-                hashed_ip = _hash_ip(search_term.strip())
-            except ValueError:
-                hashed_ip = None
-            if hashed_ip:
-                queryset |= self.model.objects.filter(ip_address_hash=hashed_ip)
-        return queryset, use_distinct
-
     @admin.display(description=_("Scope"))
     def display_scope(self, obj):
         return obj.scope or gettext("All")
+
+
+class AdsThrottleCompactOverrideAdminForm(AdsThrottleOverrideAdminForm):
+    class Meta:
+        model = AdsThrottleCompactOverride
+        fields = "__all__"
+
+
+@admin.register(AdsThrottleCompactOverride)
+class AdsThrottleCompactOverrideAdmin(AdsThrottleOverrideAdmin):
+    form = AdsThrottleCompactOverrideAdminForm
+    search_fields = (
+        "scope",
+        "viewer_id",
+        "user__email",
+        "user__username",
+    )
+    hash_search_fields = ("ip_address_digest",)
+    digest_search = True
+
+
+@admin.register(AdsThrottleCompactEvent)
+class AdsThrottleCompactEventAdmin(AdsThrottleEventAdmin):
+    search_fields = ("scope",)
+    hash_search_fields = ("viewer_digest", "ip_address_digest")
+    digest_search = True
+    readonly_fields = (
+        "scope",
+        "viewer_hash",
+        "ip_address_hash",
+        "first_seen",
+        "last_seen",
+        "count",
+        "blocked",
+    )
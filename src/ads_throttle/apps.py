@@ -6,3 +6,12 @@ class AdsThrottleConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "ads_throttle"
     verbose_name = _("Ads throttle")
+
+    def ready(self):
+        # Connect the receivers that invalidate cached overrides, profiles and
+        # exempt group memberships.
+        from . import exemptions, overrides, profiles  # noqa: F401
+        from .proxies import trusted_networks
+
+        # Parse the trusted proxy networks once, failing early on bad entries.
+        trusted_networks()
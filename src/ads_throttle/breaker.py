@@ -0,0 +1,125 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+DEFAULT_BREAKER_FAILURE_THRESHOLD = 5
+DEFAULT_BREAKER_SLOW_CALL_SECONDS = 0.25
+DEFAULT_BREAKER_RESET_SECONDS = 30
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Per-process circuit breaker for a throttle backend.
+
+    The breaker opens after ``failure_threshold`` consecutive failed or slow
+    calls. While open, ``allow`` returns ``False`` until ``reset_seconds`` have
+    passed; then a single probe call is let through (half-open). A successful
+    probe closes the breaker, a failed one opens it again.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = DEFAULT_BREAKER_FAILURE_THRESHOLD,
+        slow_call_seconds: float = DEFAULT_BREAKER_SLOW_CALL_SECONDS,
+        reset_seconds: float = DEFAULT_BREAKER_RESET_SECONDS,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.reset_seconds = reset_seconds
+        self.state = STATE_CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Return whether a call to the backend may be attempted."""
+        if self.state == STATE_CLOSED:
+            return True
+        with self._lock:
+            if self.state == STATE_OPEN:
+                if time.monotonic() - self.opened_at < self.reset_seconds:
+                    return False
+                self.state = STATE_HALF_OPEN
+                self._probing = False
+            if self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self, elapsed: float) -> None:
+        """Record a finished call; slow calls count as failures."""
+        if self.slow_call_seconds and elapsed > self.slow_call_seconds:
+            self.record_failure()
+            return
+        if self.state == STATE_CLOSED and not self.failures:
+            return
+        with self._lock:
+            self.state = STATE_CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self) -> None:
+        """Record a failed call and open the breaker when the limit is hit."""
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == STATE_HALF_OPEN or (
+                self.failures >= self.failure_threshold
+            ):
+                self.state = STATE_OPEN
+                self.opened_at = time.monotonic()
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Return the process-wide breaker for ``name`` (for example, ``cache``)."""
+    breaker = _breakers.get(name)
+    if breaker is not None:
+        return breaker
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                name,
+                failure_threshold=getattr(
+                    settings,
+                    "ADS_THROTTLE_BREAKER_FAILURE_THRESHOLD",
+                    DEFAULT_BREAKER_FAILURE_THRESHOLD,
+                ),
+                slow_call_seconds=getattr(
+                    settings,
+                    "ADS_THROTTLE_BREAKER_SLOW_CALL_SECONDS",
+                    DEFAULT_BREAKER_SLOW_CALL_SECONDS,
+                ),
+                reset_seconds=getattr(
+                    settings,
+                    "ADS_THROTTLE_BREAKER_RESET_SECONDS",
+                    DEFAULT_BREAKER_RESET_SECONDS,
+                ),
+            )
+            _breakers[name] = breaker
+    return breaker
+
+
+def reset_breakers() -> None:
+    """Forget all breakers so they are rebuilt from current settings."""
+    with _breakers_lock:
+        _breakers.clear()
+
+
+@receiver(setting_changed)
+def _reset_breakers_on_setting_change(*, setting: str, **kwargs) -> None:
+    if setting.startswith("ADS_THROTTLE_BREAKER_"):
+        reset_breakers()
@@ -0,0 +1,171 @@
+import re
+from collections.abc import Callable, Iterable
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.http import HttpRequest
+from django.utils.module_loading import import_string
+
+CLASS_HEAD = "head"
+CLASS_PREFETCH = "prefetch"
+CLASS_BOT = "bot"
+CLASS_HEALTH_CHECK = "health_check"
+CLASS_EXEMPT = "exempt"
+
+ACTION_COUNT = "count"
+ACTION_UNCOUNTED = "uncounted"
+ACTION_HIDE = "hide"
+ACTION_SHOW = "show"
+
+ACTIONS = (ACTION_COUNT, ACTION_UNCOUNTED, ACTION_HIDE, ACTION_SHOW)
+
+DEFAULT_CLASSIFIERS = (
+    "ads_throttle.exemptions.classify_exempt_path",
+    "ads_throttle.exemptions.classify_exempt_request",
+    "ads_throttle.exemptions.classify_exempt_user",
+    "ads_throttle.exemptions.classify_exempt_group",
+    "ads_throttle.classifiers.classify_method",
+    "ads_throttle.classifiers.classify_prefetch",
+    "ads_throttle.classifiers.classify_user_agent",
+)
+DEFAULT_CLASS_ACTIONS = {
+    CLASS_HEAD: ACTION_SHOW,
+    CLASS_PREFETCH: ACTION_UNCOUNTED,
+    CLASS_BOT: ACTION_UNCOUNTED,
+    CLASS_HEALTH_CHECK: ACTION_SHOW,
+    CLASS_EXEMPT: ACTION_HIDE,
+}
+DEFAULT_BOT_USER_AGENT_PATTERNS = (
+    # A crawler token ends the product name ("Googlebot/2.1", "AdsBot-Google",
+    # "; bingbot)"); device names such as "CUBOT X30" continue with a space.
+    r"bot(?:[/;)-]|$)",
+    r"(?:slack|telegram)bot\b",
+    r"crawl",
+    r"spider",
+    r"slurp",
+    r"facebookexternalhit",
+    r"headlesschrome",
+    r"python-requests",
+    r"python-urllib",
+    r"go-http-client",
+    r"curl/",
+    r"wget/",
+)
+DEFAULT_HEALTH_CHECK_USER_AGENT_PATTERNS = (
+    r"kube-probe",
+    r"elb-healthchecker",
+    r"googlehc",
+    r"consul health check",
+    r"uptimerobot",
+    r"pingdom",
+)
+USER_AGENT_CACHE_SIZE = 4096
+
+RequestClassifier = Callable[[HttpRequest], str | None]
+
+
+def classify_method(request: HttpRequest) -> str | None:
+    """Classify HEAD requests, which never render an ad slot."""
+    if request.method == "HEAD":
+        return CLASS_HEAD
+    return None
+
+
+def classify_prefetch(request: HttpRequest) -> str | None:
+    """Classify speculative browser prefetches and prerenders."""
+    purpose = request.META.get("HTTP_SEC_PURPOSE") or request.META.get(
+        "HTTP_PURPOSE", ""
+    )
+    if "prefetch" in purpose.lower():
+        return CLASS_PREFETCH
+    if request.META.get("HTTP_X_MOZ", "").lower() == "prefetch":
+        return CLASS_PREFETCH
+    return None
+
+
+def classify_user_agent(request: HttpRequest) -> str | None:
+    """Classify self-declared crawlers and health checkers by User-Agent."""
+    user_agent = request.META.get("HTTP_USER_AGENT", "")
+    if not user_agent:
+        return None
+    return _classify_user_agent(user_agent)
+
+
+@lru_cache(maxsize=None)
+def _compile_patterns(patterns: tuple[str, ...]) -> re.Pattern[str] | None:
+    if not patterns:
+        return None
+    return re.compile("|".join(f"(?:{pattern})" for pattern in patterns), re.I)
+
+
+@lru_cache(maxsize=USER_AGENT_CACHE_SIZE)
+def _classify_user_agent(user_agent: str) -> str | None:
+    """Return the memoized class for a User-Agent string."""
+    health_check = _compile_patterns(
+        tuple(
+            getattr(
+                settings,
+                "ADS_THROTTLE_HEALTH_CHECK_USER_AGENTS",
+                DEFAULT_HEALTH_CHECK_USER_AGENT_PATTERNS,
+            )
+        )
+    )
+    if health_check and health_check.search(user_agent):
+        return CLASS_HEALTH_CHECK
+    bot = _compile_patterns(
+        tuple(
+            getattr(
+                settings,
+                "ADS_THROTTLE_BOT_USER_AGENTS",
+                DEFAULT_BOT_USER_AGENT_PATTERNS,
+            )
+        )
+    )
+    if bot and bot.search(user_agent):
+        return CLASS_BOT
+    return None
+
+
+@lru_cache(maxsize=1)
+def _get_classifiers() -> tuple[RequestClassifier, ...]:
+    paths: Iterable[str] = getattr(
+        settings, "ADS_THROTTLE_REQUEST_CLASSIFIERS", DEFAULT_CLASSIFIERS
+    )
+    return tuple(import_string(path) for path in paths)
+
+
+def classify_request(request: HttpRequest) -> str | None:
+    """Return the first class reported by the configured classifiers."""
+    for classifier in _get_classifiers():
+        request_class = classifier(request)
+        if request_class:
+            return request_class
+    return None
+
+
+def get_request_action(request: HttpRequest) -> str:
+    """Return the throttle action configured for the request class."""
+    request_class = classify_request(request)
+    if not request_class:
+        return ACTION_COUNT
+    actions = {
+        **DEFAULT_CLASS_ACTIONS,
+        **getattr(settings, "ADS_THROTTLE_CLASS_ACTIONS", {}),
+    }
+    action = actions.get(request_class, ACTION_COUNT)
+    if action not in ACTIONS:
+        return ACTION_COUNT
+    return action
+
+
+@receiver(setting_changed)
+def _reset_classifier_caches(*, setting: str, **kwargs) -> None:
+    if setting in {
+        "ADS_THROTTLE_REQUEST_CLASSIFIERS",
+        "ADS_THROTTLE_BOT_USER_AGENTS",
+        "ADS_THROTTLE_HEALTH_CHECK_USER_AGENTS",
+    }:
+        _get_classifiers.cache_clear()
+        _classify_user_agent.cache_clear()
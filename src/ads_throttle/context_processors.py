@@ -1,5 +1,9 @@
+from ads_throttle.prefetch import prefetched_decision
 from ads_throttle.throttling import should_show_ads
 
 
 def ads(request):
-    return {"show_ads": should_show_ads(request)}
+    decision = prefetched_decision(request, request.path)
+    if decision is None:
+        decision = should_show_ads(request)
+    return {"show_ads": decision}
@@ -0,0 +1,139 @@
+import random
+import time
+import zlib
+from collections.abc import Mapping, Sequence
+
+from django.core.cache.backends.base import BaseCache
+
+from .sharding import ShardedCache
+
+
+def _redis_client(cache: BaseCache):
+    """Return a raw redis client when the cache backend exposes one."""
+    backend_client = getattr(cache, "_cache", None)
+    if backend_client is not None and hasattr(backend_client, "get_client"):
+        # django.core.cache.backends.redis.RedisCache
+        return backend_client.get_client(write=True)
+    backend_client = getattr(cache, "client", None)
+    if backend_client is not None and hasattr(backend_client, "get_client"):
+        # django_redis.cache.RedisCache
+        return backend_client.get_client(write=True)
+    return None
+
+
+def _make_key(cache: BaseCache, key: str) -> str:
+    make_and_validate_key = getattr(cache, "make_and_validate_key", None)
+    if make_and_validate_key is not None:
+        return make_and_validate_key(key)
+    return cache.make_key(key)
+
+
+def hot_key_marker(key: str) -> str:
+    """Return the cache key that marks ``key`` as a sharded hot counter."""
+    return f"{key}:hot"
+
+
+def shard_keys(key: str, shards: int) -> list[str]:
+    """Return the sub-keys of a counter split into ``shards`` parts."""
+    return [key] + [f"{key}:{index}" for index in range(1, shards)]
+
+
+def is_sampled(viewer_hash: str, rate: int, bucket_seconds: float = 1) -> bool:
+    """Return whether this viewer's impression is one of the 1-in-``rate``.
+
+    The decision hashes the viewer with the current time bucket, so every
+    worker makes the same choice for the same viewer and bucket.
+    """
+    if rate <= 1:
+        return True
+    bucket = int(time.time() // bucket_seconds)
+    return zlib.crc32(f"{viewer_hash}:{bucket}".encode("ascii")) % rate == 0
+
+
+def _incr_or_create(cache: BaseCache, key: str, timeout: int, amount: int) -> int:
+    if cache.add(key, amount, timeout=timeout):
+        return amount
+    try:
+        return cache.incr(key, amount)
+    except ValueError:
+        # The counter expired between ``add`` and ``incr``; start a new window.
+        if cache.add(key, amount, timeout=timeout):
+            return amount
+        return cache.incr(key, amount)
+
+
+def incr_many(
+    cache: BaseCache | ShardedCache,
+    keys: Sequence[str],
+    timeout: int,
+    shards: Mapping[str, int] | None = None,
+    amount: int = 1,
+) -> list[int]:
+    """Increment several counters by ``amount``, creating missing ones.
+
+    Keys listed in ``shards`` are split into that many sub-keys: one random
+    sub-key is incremented and the returned count is the sum of all of them.
+    Redis backends run all increments and sub-key reads in one pipeline; other
+    backends fall back to ``add``/``incr`` per key and one ``get_many``. A
+    ``ShardedCache`` runs one such batch per shard.
+    """
+    if not keys:
+        return []
+    partition = getattr(cache, "partition", None)
+    if partition is not None:
+        counts = [0] * len(keys)
+        for shard, indexes in partition(keys):
+            shard_counts = incr_many(
+                shard, [keys[index] for index in indexes], timeout, shards, amount
+            )
+            for index, count in zip(indexes, shard_counts):
+                counts[index] = count
+        return counts
+    shards = shards or {}
+    targets = []
+    siblings = []
+    for key in keys:
+        sub_keys = shard_keys(key, shards.get(key, 1))
+        target = random.choice(sub_keys) if len(sub_keys) > 1 else key
+        targets.append(target)
+        siblings.append([sub_key for sub_key in sub_keys if sub_key != target])
+    client = _redis_client(cache)
+    if client is not None:
+        pipeline = client.pipeline(transaction=False)
+        for target in targets:
+            redis_key = _make_key(cache, target)
+            pipeline.set(redis_key, 0, ex=timeout, nx=True)
+            pipeline.incr(redis_key, amount)
+        for group in siblings:
+            for sub_key in group:
+                pipeline.get(_make_key(cache, sub_key))
+        results = pipeline.execute()
+        counts = [int(value) for value in results[1 : 2 * len(targets) : 2]]
+        values = iter(results[2 * len(targets) :])
+        return [
+            count + sum(int(next(values) or 0) for _ in group)
+            for count, group in zip(counts, siblings)
+        ]
+    counts = [_incr_or_create(cache, target, timeout, amount) for target in targets]
+    sibling_keys = [sub_key for group in siblings for sub_key in group]
+    if not sibling_keys:
+        return counts
+    values = cache.get_many(sibling_keys)
+    return [
+        count + sum(int(values.get(sub_key) or 0) for sub_key in group)
+        for count, group in zip(counts, siblings)
+    ]
+
+
+def promote_hot_keys(
+    cache: BaseCache,
+    counts: Mapping[str, int],
+    shards: Mapping[str, int],
+    shard_count: int,
+    thresholds: Mapping[str, int],
+    timeout: int,
+) -> None:
+    """Mark counters that reached their hot threshold as sharded for ``timeout``."""
+    for key, count in counts.items():
+        if key not in shards and count >= thresholds[key]:
+            cache.add(hot_key_marker(key), shard_count, timeout=timeout)
@@ -0,0 +1,65 @@
+try:
+    from debug_toolbar.panels import Panel
+except ImportError as error:
+    from django.core.exceptions import ImproperlyConfigured
+
+    raise ImproperlyConfigured(
+        "ads_throttle.debug_panel requires django-debug-toolbar."
+    ) from error
+
+from django.utils.html import format_html, format_html_join
+from django.utils.translation import gettext_lazy as _
+
+from .explain import explain_should_show_ads
+
+
+class AdsThrottlePanel(Panel):
+    """Django Debug Toolbar panel with a dry-run trace per ad decision.
+
+    Every scope decided while rendering the request is explained again with
+    ``explain_should_show_ads(dry_run=True)`` after the response is built.
+    """
+
+    title = _("Ads throttle")
+
+    @property
+    def nav_subtitle(self):
+        traces = self.get_stats().get("traces", [])
+        return ", ".join(
+            f"{trace['scope']}: {'show' if trace['decision'] else 'hide'}"
+            for trace in traces
+        )
+
+    def process_request(self, request):
+        if getattr(request, "_ads_throttle_timings", None) is None:
+            request._ads_throttle_timings = []
+        return super().process_request(request)
+
+    def generate_stats(self, request, response):
+        scopes = dict.fromkeys(
+            scope for scope, _ in getattr(request, "_ads_throttle_timings", [])
+        )
+        scopes.update(dict.fromkeys(getattr(request, "_ads_throttle_cache", {})))
+        self.record_stats(
+            {
+                "traces": [
+                    explain_should_show_ads(request, scope, dry_run=True)
+                    for scope in scopes or [request.path]
+                ]
+            }
+        )
+
+    @property
+    def content(self):
+        return format_html_join(
+            "",
+            "<h4>{}</h4><pre>{}</pre>",
+            (
+                (trace["scope"], _format_trace(trace))
+                for trace in self.get_stats().get("traces", [])
+            ),
+        ) or format_html("<p>{}</p>", _("No ad decisions."))
+
+
+def _format_trace(trace: dict) -> str:
+    return "\n".join(f"{key}: {value}" for key, value in trace.items())
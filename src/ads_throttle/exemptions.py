@@ -0,0 +1,99 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.signals import setting_changed
+from django.db.models.signals import m2m_changed
+from django.dispatch import receiver
+from django.http import HttpRequest
+
+from .classifiers import CLASS_EXEMPT
+from .throttling import _call_db
+
+DEFAULT_EXEMPT_GROUP_CACHE_SECONDS = 300
+GROUP_CACHE_SIZE = 10000
+
+# User pk -> (expires at, monotonic clock; member of an exempt group).
+_group_members: dict[object, tuple[float, bool]] = {}
+
+
+def classify_exempt_path(request: HttpRequest) -> str | None:
+    """Classify requests under ``ADS_THROTTLE_EXEMPT_PATH_PREFIXES``."""
+    prefixes = getattr(settings, "ADS_THROTTLE_EXEMPT_PATH_PREFIXES", ())
+    if prefixes and request.path.startswith(tuple(prefixes)):
+        return CLASS_EXEMPT
+    return None
+
+
+def classify_exempt_request(request: HttpRequest) -> str | None:
+    """Classify requests flagged by ``ADS_THROTTLE_EXEMPT_REQUEST_ATTRIBUTE``."""
+    attribute = getattr(settings, "ADS_THROTTLE_EXEMPT_REQUEST_ATTRIBUTE", "")
+    if attribute and getattr(request, attribute, False):
+        return CLASS_EXEMPT
+    return None
+
+
+def classify_exempt_user(request: HttpRequest) -> str | None:
+    """Classify users with an ``ADS_THROTTLE_EXEMPT_USER_ATTRIBUTES`` flag set."""
+    attributes = getattr(settings, "ADS_THROTTLE_EXEMPT_USER_ATTRIBUTES", ())
+    user = _authenticated_user(request) if attributes else None
+    if user is not None and any(getattr(user, name, False) for name in attributes):
+        return CLASS_EXEMPT
+    return None
+
+
+def classify_exempt_group(request: HttpRequest) -> str | None:
+    """Classify members of ``ADS_THROTTLE_EXEMPT_GROUPS``.
+
+    Membership is cached per user in process memory for
+    ``ADS_THROTTLE_EXEMPT_GROUP_CACHE_SECONDS``.
+    """
+    groups = getattr(settings, "ADS_THROTTLE_EXEMPT_GROUPS", ())
+    user = _authenticated_user(request) if groups else None
+    if user is not None and _in_exempt_groups(user, tuple(groups)):
+        return CLASS_EXEMPT
+    return None
+
+
+def _authenticated_user(request: HttpRequest):
+    user = getattr(request, "user", None)
+    if user is None or not user.is_authenticated:
+        return None
+    return user
+
+
+def _in_exempt_groups(user, groups: tuple[str, ...]) -> bool:
+    now = time.monotonic()
+    cached = _group_members.get(user.pk)
+    if cached is not None and cached[0] > now:
+        return cached[1]
+    member = _call_db(lambda: user.groups.filter(name__in=groups).exists())
+    if member is None:
+        return False
+    if len(_group_members) >= GROUP_CACHE_SIZE:
+        _group_members.clear()
+    ttl = getattr(
+        settings,
+        "ADS_THROTTLE_EXEMPT_GROUP_CACHE_SECONDS",
+        DEFAULT_EXEMPT_GROUP_CACHE_SECONDS,
+    )
+    _group_members[user.pk] = (now + ttl, member)
+    return member
+
+
+@receiver(m2m_changed)
+def _forget_group_memberships(*, sender, instance, action, **kwargs) -> None:
+    user_model = get_user_model()
+    through = getattr(getattr(user_model, "groups", None), "through", None)
+    if through is None or sender is not through or not action.startswith("post_"):
+        return
+    if isinstance(instance, user_model):
+        _group_members.pop(instance.pk, None)
+    else:
+        _group_members.clear()
+
+
+@receiver(setting_changed)
+def _reset_group_memberships(*, setting: str, **kwargs) -> None:
+    if setting.startswith("ADS_THROTTLE_EXEMPT_GROUP"):
+        _group_members.clear()
@@ -0,0 +1,221 @@
+import time
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from django.http import HttpRequest
+
+from .classifiers import (
+    ACTION_HIDE,
+    ACTION_SHOW,
+    ACTION_UNCOUNTED,
+    classify_request,
+    get_request_action,
+)
+from .counters import hot_key_marker, shard_keys
+from .hashing import get_key_formats, hash_scope, hash_viewer
+from .middleware import has_block_token
+from .penalties import is_blocking, unpack_penalty
+from .throttling import (
+    COUNT_MODE_BEACON,
+    SETTINGS_CACHE_KEY,
+    _cached_override,
+    _call_db,
+    _count_mode,
+    _counter_cache,
+    _counter_keys,
+    _find_override,
+    _get_client_ip,
+    _hash_ip,
+    _override_cache_key,
+    _override_user,
+    _sample_amount,
+    _settings_and_profiles,
+    _viewer_fingerprint,
+    _viewer_id,
+    should_show_ads,
+)
+
+
+class _Stages:
+    """Collect nanosecond timings for named stages."""
+
+    def __init__(self):
+        self.timings: dict[str, int] = {}
+
+    @contextmanager
+    def __call__(self, name: str):
+        started = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.timings[name] = time.perf_counter_ns() - started
+
+
+def explain_should_show_ads(
+    request: HttpRequest, scope: str | None = None, *, dry_run: bool = True
+) -> dict:
+    """Return a trace of how ``should_show_ads`` decides for a request.
+
+    The trace lists the identity, settings, override and counter state the
+    decision depends on, with ``timings_ns`` per stage. With ``dry_run`` (the
+    default) nothing is counted or written: ``decision`` is what the next
+    impression would get. Otherwise ``should_show_ads`` runs for real and its
+    result is reported. Unlike ``should_show_ads``, errors are raised.
+    """
+    stage = _Stages()
+    scope_value = scope or request.path
+    trace = {"scope": scope_value, "dry_run": dry_run, "timings_ns": stage.timings}
+    decision, reason = _explain(request, scope_value, trace, stage)
+    if not dry_run:
+        with stage("decide"):
+            decision = should_show_ads(request, scope)
+        reason = f"decided ({reason})"
+    trace["decision"] = decision
+    trace["reason"] = reason
+    traces = getattr(request, "_ads_throttle_traces", None)
+    if traces is not None:
+        traces.append(trace)
+    return trace
+
+
+def _explain(
+    request: HttpRequest, scope_value: str, trace: dict, stage: _Stages
+) -> tuple[bool, str]:
+    with stage("classify"):
+        trace["request_class"] = classify_request(request)
+        trace["action"] = action = get_request_action(request)
+    if action == ACTION_SHOW:
+        return True, "request class shows ads"
+    if action == ACTION_HIDE:
+        return False, "request class hides ads"
+
+    with stage("identity"):
+        trace["scope_hash"] = scope_hash = hash_scope(scope_value)
+        trace["block_token"] = has_block_token(request, scope_hash)
+        trace["viewer_id"] = viewer_id = _viewer_id(request)
+        trace["viewer_hash"] = viewer_hash = hash_viewer(_viewer_fingerprint(request))
+        trace["ip_address_hash"] = ip_address_hash = _hash_ip(_get_client_ip(request))
+
+    with stage("settings"):
+        cached_settings = bool(cache.get(SETTINGS_CACHE_KEY))
+        settings_values, profiles = _settings_and_profiles()
+        if cached_settings:
+            trace["settings_source"] = "cache"
+        elif cache.get(SETTINGS_CACHE_KEY):
+            trace["settings_source"] = "database"
+        else:
+            trace["settings_source"] = "defaults"
+        trace["profile"] = profiles.lookup(scope_value) or None
+        trace["settings"] = settings_values = profiles.apply(
+            settings_values, scope_value
+        )
+
+    with stage("override"):
+        override = _explain_override(
+            trace, _override_user(request), viewer_id, ip_address_hash, scope_value
+        )
+    if override == "show":
+        return True, "override shows"
+    if trace["block_token"]:
+        return False, "block token"
+    if override == "block":
+        return False, "override blocks"
+
+    with stage("counters"):
+        levels = _counter_keys(
+            scope_hash, viewer_hash, ip_address_hash, settings_values
+        )
+        blocking, amount = _explain_counters(trace, levels, scope_value, viewer_hash)
+    if blocking:
+        return False, "blocked"
+    if action == ACTION_UNCOUNTED or _count_mode() == COUNT_MODE_BEACON:
+        return True, "not counted"
+    if not amount:
+        return True, "not sampled"
+    if any(level["value"] + amount > level["threshold"] for level in trace["counters"]):
+        return False, "threshold reached"
+    return True, "under threshold"
+
+
+def _explain_override(
+    trace: dict, user, viewer_id: str, ip_address_hash: str, scope_value: str
+) -> str | None:
+    viewer_hash = trace["viewer_hash"]
+    user_id = user.pk if user and user.is_authenticated else ""
+    cache_key = _override_cache_key(
+        user_id, viewer_id, ip_address_hash, scope_value, viewer_hash
+    )
+    generation_key = get_key_formats()["override_generation"]
+    cached_values = cache.get_many([cache_key, generation_key])
+    hit, decision = _cached_override(
+        cached_values.get(cache_key), cached_values.get(generation_key)
+    )
+    trace["overrides"] = []
+    if hit:
+        trace["override"], trace["override_source"] = decision, "cache"
+        return decision
+    queryset = _find_override(
+        user, viewer_id, ip_address_hash, scope_value, viewer_hash
+    )
+    rows = (
+        _call_db(lambda: list(queryset.values("pk", "force_block", "force_show")))
+        if queryset is not None
+        else []
+    )
+    if rows is None:
+        trace["override"], trace["override_source"] = None, "unavailable"
+        return None
+    trace["overrides"] = [row["pk"] for row in rows]
+    if any(row["force_block"] for row in rows):
+        decision = "block"
+    elif any(row["force_show"] for row in rows):
+        decision = "show"
+    trace["override"], trace["override_source"] = decision, "database"
+    return decision
+
+
+def _explain_counters(
+    trace: dict, levels: list[tuple[str, str, int]], scope_value: str, viewer_hash: str
+) -> tuple[bool, int]:
+    counters = _counter_cache()
+    count_keys = [count_key for count_key, _, _ in levels]
+    block_keys = [block_key for _, block_key, _ in levels]
+    markers = [hot_key_marker(count_key) for count_key in count_keys]
+    state = counters.get_many(block_keys + markers)
+    sub_keys = {
+        count_key: shard_keys(count_key, state.get(marker) or 1)
+        for count_key, marker in zip(count_keys, markers)
+    }
+    values = counters.get_many([key for keys in sub_keys.values() for key in keys])
+    now = time.time()
+    blocking = False
+    trace["counters"] = []
+    for count_key, block_key, threshold in levels:
+        block_value = state.get(block_key)
+        blocked = is_blocking(block_value, now)
+        blocking = blocking or blocked
+        trace["counters"].append(
+            {
+                "key": count_key,
+                "value": sum(int(values.get(key) or 0) for key in sub_keys[count_key]),
+                "threshold": threshold,
+                "blocked": blocked,
+                "block_ttl": _block_ttl(counters, block_key, block_value, now),
+                "strikes": getattr(unpack_penalty(block_value), "strikes", None),
+            }
+        )
+    amount = _sample_amount(scope_value, viewer_hash)
+    trace["sample_amount"] = amount
+    return blocking, amount
+
+
+def _block_ttl(counters, block_key: str, block_value, now: float) -> float | None:
+    """Return the remaining block time, when the cache can tell it."""
+    if not is_blocking(block_value, now):
+        return None
+    penalty = unpack_penalty(block_value)
+    if penalty is not None:
+        return penalty.block_until - now
+    ttl = getattr(counters, "ttl", None)
+    # django-redis exposes ttl(); the built-in backends do not.
+    return ttl(block_key) if callable(ttl) else None
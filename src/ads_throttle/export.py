@@ -0,0 +1,218 @@
+import csv
+import io
+import json
+from collections.abc import Iterable, Iterator
+from datetime import datetime
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Parquet export is optional.
+    pyarrow = None
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import QuerySet
+
+from .models import AdsThrottleCompactEvent, AdsThrottleEvent, scope_digest
+
+DEFAULT_EXPORT_CHUNK_SIZE = 2000
+DEFAULT_EXPORT_PAGE_SIZE = 50000
+EXPORT_FIELDS = (
+    "id",
+    "scope",
+    "viewer_hash",
+    "ip_address_hash",
+    "first_seen",
+    "last_seen",
+    "count",
+    "blocked",
+)
+# Format name -> (content type, file extension).
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+
+def event_queryset(
+    *,
+    scope: str | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    blocked: bool | None = None,
+) -> QuerySet:
+    """Return the events to export; ``since``/``until`` bound ``last_seen``."""
+    if getattr(settings, "ADS_THROTTLE_COMPACT_SCHEMA", False):
+        queryset = AdsThrottleCompactEvent.objects.all()
+        if scope is not None:
+            queryset = queryset.filter(scope_hash=scope_digest(scope))
+    else:
+        queryset = AdsThrottleEvent.objects.all()
+        if scope is not None:
+            queryset = queryset.filter(scope=scope)
+    if since is not None:
+        queryset = queryset.filter(last_seen__gte=since)
+    if until is not None:
+        queryset = queryset.filter(last_seen__lt=until)
+    if blocked is not None:
+        queryset = queryset.filter(blocked=blocked)
+    return queryset
+
+
+def iter_event_rows(
+    queryset: QuerySet,
+    *,
+    chunk_size: int = DEFAULT_EXPORT_CHUNK_SIZE,
+    page_size: int = DEFAULT_EXPORT_PAGE_SIZE,
+) -> Iterator[dict]:
+    """Yield events as dictionaries of ``EXPORT_FIELDS``, in primary-key order.
+
+    Rows are read in keyset pages (``pk > last seen pk``), so no query scans
+    past an offset or keeps a cursor open for the whole export; each page is
+    streamed with ``iterator(chunk_size=...)``.
+    """
+    compact = queryset.model is AdsThrottleCompactEvent
+    fields = (
+        ("viewer_digest", "ip_address_digest")
+        if compact
+        else ("viewer_hash", "ip_address_hash")
+    )
+    columns = ("id", "scope", *fields, "first_seen", "last_seen", "count", "blocked")
+    queryset = queryset.order_by("pk")
+    last_pk = None
+    while True:
+        page = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        rows = 0
+        for row in page.values(*columns)[:page_size].iterator(chunk_size=chunk_size):
+            rows += 1
+            last_pk = row["id"]
+            if compact:
+                row["viewer_hash"] = bytes(row.pop("viewer_digest")).hex()
+                row["ip_address_hash"] = bytes(
+                    row.pop("ip_address_digest") or b""
+                ).hex()
+            yield row
+        if rows < page_size:
+            return
+
+
+def _text_value(value) -> str | int | bool:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _csv_chunks(rows: Iterable[dict], flush_rows: int) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for index, row in enumerate(rows, 1):
+        writer.writerow([_text_value(row[field]) for field in EXPORT_FIELDS])
+        if index % flush_rows == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
+def _ndjson_chunks(rows: Iterable[dict], flush_rows: int) -> Iterator[bytes]:
+    lines = []
+    for row in rows:
+        lines.append(
+            json.dumps({field: _text_value(row[field]) for field in EXPORT_FIELDS})
+        )
+        if len(lines) == flush_rows:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+class _Drain:
+    """Write-only file object whose contents are taken out as they are written."""
+
+    closed = False
+
+    def __init__(self):
+        self._parts: list[bytes] = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+def _parquet_schema():
+    timestamp = pyarrow.timestamp("us", tz="UTC" if settings.USE_TZ else None)
+    return pyarrow.schema(
+        [
+            ("id", pyarrow.int64()),
+            ("scope", pyarrow.string()),
+            ("viewer_hash", pyarrow.string()),
+            ("ip_address_hash", pyarrow.string()),
+            ("first_seen", timestamp),
+            ("last_seen", timestamp),
+            ("count", pyarrow.int64()),
+            ("blocked", pyarrow.bool_()),
+        ]
+    )
+
+
+def _parquet_chunks(rows: Iterable[dict], flush_rows: int) -> Iterator[bytes]:
+    schema = _parquet_schema()
+    sink = _Drain()
+    writer = pyarrow.parquet.ParquetWriter(sink, schema)
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == flush_rows:
+            # One row group per batch keeps memory bounded.
+            writer.write_batch(pyarrow.RecordBatch.from_pylist(batch, schema=schema))
+            batch = []
+            yield sink.drain()
+    if batch:
+        writer.write_batch(pyarrow.RecordBatch.from_pylist(batch, schema=schema))
+    writer.close()
+    yield sink.drain()
+
+
+def export_events(
+    queryset: QuerySet,
+    export_format: str,
+    *,
+    chunk_size: int = DEFAULT_EXPORT_CHUNK_SIZE,
+    page_size: int = DEFAULT_EXPORT_PAGE_SIZE,
+) -> Iterator[bytes]:
+    """Return an iterator of encoded chunks of ``queryset`` in ``export_format``.
+
+    Memory use depends on ``chunk_size``, not on the number of events. Raises
+    ``ValueError`` for an unknown format and ``ImproperlyConfigured`` for
+    Parquet without pyarrow.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {export_format!r}")
+    if export_format == "parquet" and pyarrow is None:
+        raise ImproperlyConfigured("Parquet export requires pyarrow.")
+    writer = {
+        "csv": _csv_chunks,
+        "ndjson": _ndjson_chunks,
+        "parquet": _parquet_chunks,
+    }[export_format]
+    rows = iter_event_rows(queryset, chunk_size=chunk_size, page_size=page_size)
+    return (chunk for chunk in writer(rows, chunk_size) if chunk)
@@ -0,0 +1,27 @@
+from django.db import models
+
+
+class DigestField(models.BinaryField):
+    """Short binary digest stored in an indexable column.
+
+    ``BinaryField`` maps to ``longblob`` on MySQL, which cannot be part of a
+    regular index, so MySQL and Oracle get a bounded ``VARBINARY``/``RAW``
+    column instead. PostgreSQL (``bytea``) and SQLite (``BLOB``) keep the
+    default type.
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("max_length", 32)
+        super().__init__(*args, **kwargs)
+
+    def db_type(self, connection):
+        if connection.vendor == "mysql":
+            return f"varbinary({self.max_length})"
+        if connection.vendor == "oracle":
+            return f"RAW({self.max_length})"
+        return super().db_type(connection)
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return bytes(value)
@@ -0,0 +1,144 @@
+import hashlib
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+DEFAULT_HASHER = "sha256"
+DEFAULT_BLAKE2B_DIGEST_SIZE = 16
+SCOPE_HASH_CACHE_SIZE = 1024
+
+KEY_FORMAT_V1 = 1
+KEY_FORMAT_V2 = 2
+DEFAULT_KEY_FORMAT = KEY_FORMAT_V1
+
+# Cache key templates per format version. Version 1 keeps the original keys;
+# version 2 uses short prefixes and truncates the 64-char IP hash to 128 bits.
+KEY_FORMATS = {
+    KEY_FORMAT_V1: {
+        "views": "ads:views:{scope}:{viewer}",
+        "block": "ads:block:{scope}:{viewer}",
+        "ip_views": "ads:views:ip:{scope}:{ip}",
+        "ip_block": "ads:block:ip:{scope}:{ip}",
+        "site_views": "ads:views:site:{ip}",
+        "site_block": "ads:block:site:{ip}",
+        "override": "ads_throttle:override:{scope}:{viewer_id}:{user_id}:{ip}",
+        "viewer_override": "ads_throttle:override:{scope}:fp:{viewer}:{user_id}",
+        "override_generation": "ads_throttle:override_generation",
+        "override_sweep": "ads_throttle:override_sweep",
+        "user_overrides": "ads_throttle:user_overrides",
+        "profile_version": "ads_throttle:profile_version",
+        "event": "ads_throttle:event:{scope}:{viewer}:{blocked}",
+    },
+    KEY_FORMAT_V2: {
+        "views": "at2:v:{scope}:{viewer}",
+        "block": "at2:b:{scope}:{viewer}",
+        "ip_views": "at2:vi:{scope}:{ip:.32}",
+        "ip_block": "at2:bi:{scope}:{ip:.32}",
+        "site_views": "at2:vs:{ip:.32}",
+        "site_block": "at2:bs:{ip:.32}",
+        "override": "at2:o:{scope}:{viewer_id}:{user_id}:{ip:.32}",
+        "viewer_override": "at2:of:{scope}:{viewer}:{user_id}",
+        "override_generation": "at2:og",
+        "override_sweep": "at2:os",
+        "user_overrides": "at2:ou",
+        "profile_version": "at2:pv",
+        "event": "at2:e:{scope}:{viewer}:{blocked}",
+    },
+}
+
+
+class Sha256Hasher:
+    """Hex SHA-256 digests; the original hashing scheme."""
+
+    name = "sha256"
+
+    def hexdigest(self, value: str) -> str:
+        return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+class Blake2bHasher:
+    """Keyed BLAKE2b with a short digest.
+
+    The key defaults to ``SECRET_KEY``, so fingerprints cannot be brute-forced
+    from cache keys without it. ``digest_size`` is in bytes and is limited to 32
+    so viewer hashes still fit the event tables.
+    """
+
+    name = "blake2b"
+
+    def __init__(
+        self,
+        key: str | bytes | None = None,
+        digest_size: int = DEFAULT_BLAKE2B_DIGEST_SIZE,
+    ):
+        if not 8 <= digest_size <= 32:
+            raise ImproperlyConfigured(
+                "Blake2bHasher digest_size must be between 8 and 32 bytes."
+            )
+        if key is None:
+            key = settings.SECRET_KEY
+        if isinstance(key, str):
+            key = key.encode("utf-8")
+        if len(key) > hashlib.blake2b.MAX_KEY_SIZE:
+            key = hashlib.blake2b(key).digest()
+        # Copying a keyed state skips the key block on every call.
+        self._base = hashlib.blake2b(key=key, digest_size=digest_size)
+
+    def hexdigest(self, value: str) -> str:
+        state = self._base.copy()
+        state.update(value.encode("utf-8"))
+        return state.hexdigest()
+
+
+HASHERS = {
+    Sha256Hasher.name: Sha256Hasher,
+    Blake2bHasher.name: Blake2bHasher,
+}
+
+
+@lru_cache(maxsize=1)
+def get_hasher():
+    """Return the hasher configured by ``ADS_THROTTLE_HASHER``."""
+    name = getattr(settings, "ADS_THROTTLE_HASHER", DEFAULT_HASHER) or DEFAULT_HASHER
+    options = getattr(settings, "ADS_THROTTLE_HASHER_OPTIONS", {})
+    try:
+        hasher_class = HASHERS.get(name) or import_string(name)
+        return hasher_class(**options)
+    except (ImportError, TypeError) as exc:
+        raise ImproperlyConfigured(
+            f"Cannot build ADS_THROTTLE_HASHER {name!r}: {exc}"
+        ) from exc
+
+
+def hash_viewer(fingerprint: str) -> str:
+    """Return the hex hash of a viewer fingerprint."""
+    return get_hasher().hexdigest(fingerprint)
+
+
+@lru_cache(maxsize=SCOPE_HASH_CACHE_SIZE)
+def hash_scope(scope: str) -> str:
+    """Return the memoized hex hash of a scope; scopes are few and repeat."""
+    return get_hasher().hexdigest(scope)
+
+
+def get_key_formats() -> dict[str, str]:
+    """Return the cache key templates for ``ADS_THROTTLE_KEY_FORMAT``."""
+    version = getattr(settings, "ADS_THROTTLE_KEY_FORMAT", DEFAULT_KEY_FORMAT)
+    try:
+        return KEY_FORMATS[version]
+    except KeyError:
+        raise ImproperlyConfigured(
+            f"Unknown ADS_THROTTLE_KEY_FORMAT {version!r}; "
+            f"use one of {sorted(KEY_FORMATS)}."
+        ) from None
+
+
+@receiver(setting_changed)
+def _reset_hashers(*, setting: str, **kwargs) -> None:
+    if setting in {"ADS_THROTTLE_HASHER", "ADS_THROTTLE_HASHER_OPTIONS", "SECRET_KEY"}:
+        get_hasher.cache_clear()
+        hash_scope.cache_clear()
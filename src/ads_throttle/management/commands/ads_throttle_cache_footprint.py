@@ -0,0 +1,275 @@
+import os
+import pickle
+import time
+from collections import Counter
+from collections.abc import Iterator
+
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.core.cache.backends.db import DatabaseCache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, models, router
+
+from ads_throttle.counters import _redis_client
+from ads_throttle.hashing import KEY_FORMATS
+from ads_throttle.shared_memory import RECORD, SharedMemoryCache
+
+DEFAULT_SAMPLE_SIZE = 100_000
+SCAN_BATCH_SIZE = 1000
+FILE_CACHE_FAMILY = "(file cache, hashed names)"
+SHARED_MEMORY_FAMILY = "(shared memory, hashed keys)"
+OTHER_FAMILY = "(other)"
+TTL_BUCKETS = (
+    (60, "<1m"),
+    (600, "1m-10m"),
+    (3600, "10m-1h"),
+    (86400, "1h-1d"),
+)
+
+# Static prefixes of every key format, longest first so that ``ads:views:ip:``
+# wins over ``ads:views:``.
+FAMILY_PREFIXES = sorted(
+    {
+        template.split("{", 1)[0]
+        for formats in KEY_FORMATS.values()
+        for template in formats.values()
+    }
+    | {"ads_throttle:settings"},
+    key=len,
+    reverse=True,
+)
+
+
+def key_family(key: str) -> str:
+    """Return the throttle key family of an unprefixed cache key."""
+    for prefix in FAMILY_PREFIXES:
+        if key.startswith(prefix):
+            return f"{prefix}*:hot" if key.endswith(":hot") else prefix
+    return OTHER_FAMILY
+
+
+def _ttl_bucket(ttl: float | None) -> str:
+    if ttl is None:
+        return "none"
+    for limit, label in TTL_BUCKETS:
+        if ttl < limit:
+            return label
+    return ">1d"
+
+
+def _scan_locmem(cache: LocMemCache, limit: int) -> Iterator[tuple]:
+    now = time.time()
+    with cache._lock:
+        items = list(cache._cache.items())[:limit]
+        expires = dict(cache._expire_info)
+    for key, value in items:
+        expiry = expires.get(key)
+        yield key, len(value), None, None if expiry is None else expiry - now
+
+
+def _database_table(cache: DatabaseCache):
+    connection = connections[router.db_for_read(cache.cache_model_class)]
+    return connection, connection.ops.quote_name(cache._table)
+
+
+def _count_database(cache: DatabaseCache) -> int:
+    connection, table = _database_table(cache)
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT COUNT(*) FROM {table}")
+        return cursor.fetchone()[0]
+
+
+def _scan_database(cache: DatabaseCache, limit: int) -> Iterator[tuple]:
+    connection, table = _database_table(cache)
+    # Same conversion DatabaseCache applies to the ``expires`` column.
+    expression = models.Expression(output_field=models.DateTimeField())
+    converters = connection.ops.get_db_converters(
+        expression
+    ) + expression.get_db_converters(connection)
+    now = time.time()
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT cache_key, value, expires FROM {table}")
+        for key, value, expires in cursor.fetchmany(limit):
+            for converter in converters:
+                expires = converter(expires, expression, connection)
+            yield key, len(value), None, expires.timestamp() - now
+
+
+def _scan_files(cache: FileBasedCache, limit: int) -> Iterator[tuple]:
+    now = time.time()
+    for path in cache._list_cache_files()[:limit]:
+        try:
+            with open(path, "rb") as handle:
+                expiry = pickle.load(handle)
+            size = os.path.getsize(path)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            continue
+        yield None, size, None, None if expiry is None else expiry - now
+
+
+def _scan_shared_memory(ttls: list[float | None], limit: int) -> Iterator[tuple]:
+    for ttl in ttls[:limit]:
+        yield None, RECORD.size, None, ttl
+
+
+def _scan_redis(client, cache, limit: int) -> Iterator[tuple]:
+    marker = cache.make_key("")
+    scanned = 0
+    batch = []
+    for key in client.scan_iter(match=f"{marker}*", count=SCAN_BATCH_SIZE):
+        batch.append(key)
+        scanned += 1
+        if len(batch) >= SCAN_BATCH_SIZE or scanned >= limit:
+            yield from _describe_redis_keys(client, batch)
+            batch = []
+        if scanned >= limit:
+            return
+    yield from _describe_redis_keys(client, batch)
+
+
+def _describe_redis_keys(client, keys: list) -> Iterator[tuple]:
+    if not keys:
+        return
+    pipeline = client.pipeline(transaction=False)
+    for key in keys:
+        pipeline.strlen(key)
+        pipeline.pttl(key)
+        pipeline.memory_usage(key)
+    results = pipeline.execute(raise_on_error=False)
+    for index, key in enumerate(keys):
+        size, pttl, memory = results[3 * index : 3 * index + 3]
+        if isinstance(size, Exception):
+            size = 0
+        if isinstance(memory, Exception):
+            memory = None
+        ttl = pttl / 1000 if isinstance(pttl, int) and pttl >= 0 else None
+        if isinstance(key, bytes):
+            key = key.decode("utf-8", "replace")
+        yield key, size, memory, ttl
+
+
+class Command(BaseCommand):
+    help = (
+        "Sample the cache keyspace and report key counts, sizes and TTLs per "
+        "throttle key family."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--cache",
+            default=DEFAULT_CACHE_ALIAS,
+            help="Cache alias to analyze.",
+        )
+        parser.add_argument(
+            "--sample",
+            type=int,
+            default=DEFAULT_SAMPLE_SIZE,
+            help="Maximum number of keys to inspect.",
+        )
+        parser.add_argument(
+            "--project-viewers",
+            type=int,
+            help=(
+                "Project memory for this many active viewer/scope pairs per "
+                "window, scaled from the sampled per-viewer counters."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        cache = caches[options["cache"]]
+        limit = max(options["sample"], 1)
+        keys, total = self._scan(cache, limit)
+        marker = cache.make_key("")
+        unlisted_family = (
+            SHARED_MEMORY_FAMILY
+            if isinstance(cache, SharedMemoryCache)
+            else FILE_CACHE_FAMILY
+        )
+        stats: dict[str, dict] = {}
+        for key, value_bytes, memory, ttl in keys:
+            if key is None:
+                family, key_bytes = unlisted_family, 0
+            else:
+                key_bytes = len(key.encode("utf-8"))
+                if not key.startswith(marker):
+                    family = OTHER_FAMILY
+                else:
+                    family = key_family(key[len(marker) :])
+            family_stats = stats.setdefault(
+                family,
+                {"count": 0, "key": 0, "value": 0, "memory": 0, "ttl": Counter()},
+            )
+            family_stats["count"] += 1
+            family_stats["key"] += key_bytes
+            family_stats["value"] += value_bytes
+            family_stats["memory"] += (
+                memory if memory is not None else key_bytes + value_bytes
+            )
+            family_stats["ttl"][_ttl_bucket(ttl)] += 1
+        sampled = sum(family_stats["count"] for family_stats in stats.values())
+        # Counts and memory are extrapolated only when the sample was cut short.
+        scale = total / sampled if total and sampled >= limit else 1
+        self.stdout.write(
+            f"backend={cache.__class__.__name__} sampled={sampled} "
+            f"total={total if total is not None else 'unknown'}"
+        )
+        for family, family_stats in sorted(stats.items()):
+            count = family_stats["count"]
+            ttl = ", ".join(
+                f"{bucket}={amount}"
+                for bucket, amount in family_stats["ttl"].most_common()
+            )
+            self.stdout.write(
+                f"{family:32} keys={round(count * scale)} "
+                f"avg_key={family_stats['key'] / count:.0f}B "
+                f"avg_value={family_stats['value'] / count:.0f}B "
+                f"avg_memory={family_stats['memory'] / count:.0f}B "
+                f"memory={family_stats['memory'] * scale / 1024 / 1024:.2f}MiB "
+                f"ttl[{ttl}]"
+            )
+        if options["project_viewers"]:
+            self._project(stats, options["project_viewers"])
+
+    def _scan(self, cache, limit: int) -> tuple[Iterator[tuple], int | None]:
+        """Return sampled ``(key, value_bytes, memory, ttl)`` rows and the total."""
+        client = _redis_client(cache)
+        if client is not None:
+            return _scan_redis(client, cache, limit), client.dbsize()
+        if isinstance(cache, LocMemCache):
+            return _scan_locmem(cache, limit), len(cache._cache)
+        if isinstance(cache, FileBasedCache):
+            return _scan_files(cache, limit), len(cache._list_cache_files())
+        if isinstance(cache, DatabaseCache):
+            return _scan_database(cache, limit), _count_database(cache)
+        if isinstance(cache, SharedMemoryCache):
+            ttls = list(cache.live_records())
+            return _scan_shared_memory(ttls, limit), len(ttls)
+        raise CommandError(
+            f"{cache.__class__.__name__} cannot list its keys; "
+            "use Redis, file, database, shared-memory or local-memory caches."
+        )
+
+    def _project(self, stats: dict[str, dict], viewers: int) -> None:
+        per_viewer = [
+            family_stats["count"]
+            for family, family_stats in stats.items()
+            if family in {"ads:views:", "at2:v:"}
+        ]
+        if not sum(per_viewer):
+            self.stdout.write(
+                self.style.WARNING(
+                    "No per-viewer counters sampled; cannot project memory."
+                )
+            )
+            return
+        factor = viewers / sum(per_viewer)
+        projected = sum(
+            family_stats["memory"] * factor
+            for family, family_stats in stats.items()
+            if family not in {OTHER_FAMILY, FILE_CACHE_FAMILY, SHARED_MEMORY_FAMILY}
+        )
+        self.stdout.write(
+            f"projected memory for {viewers} viewer/scope pairs: "
+            f"{projected / 1024 / 1024:.1f}MiB"
+        )
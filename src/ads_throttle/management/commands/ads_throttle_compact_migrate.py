@@ -0,0 +1,160 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from ads_throttle.models import (
+    AdsThrottleCompactEvent,
+    AdsThrottleCompactOverride,
+    AdsThrottleEvent,
+    AdsThrottleOverride,
+    CompactMigrationCheckpoint,
+    hex_to_digest,
+    scope_digest,
+)
+
+DEFAULT_BATCH_SIZE = 1000
+OVERRIDE_KEY_FIELDS = (
+    "scope_hash",
+    "viewer_id",
+    "user_id",
+    "ip_address_digest",
+    "force_show",
+    "force_block",
+    "expires_at",
+)
+
+
+def _copy_events(batch: list[AdsThrottleEvent]) -> None:
+    incoming = {}
+    for event in batch:
+        row = AdsThrottleCompactEvent(
+            scope=event.scope,
+            scope_hash=scope_digest(event.scope),
+            viewer_digest=hex_to_digest(event.viewer_hash),
+            ip_address_digest=hex_to_digest(event.ip_address_hash),
+            first_seen=event.first_seen,
+            last_seen=event.last_seen,
+            count=event.count,
+            blocked=event.blocked,
+        )
+        incoming[(row.scope_hash, row.viewer_digest)] = row
+    # Rows written in compact mode while the copy runs are merged, not replaced.
+    existing = AdsThrottleCompactEvent.objects.select_for_update().filter(
+        viewer_digest__in={viewer_digest for _, viewer_digest in incoming}
+    )
+    to_update = []
+    for current in existing:
+        row = incoming.pop((current.scope_hash, current.viewer_digest), None)
+        if row is None:
+            continue
+        current.count += row.count
+        current.first_seen = min(current.first_seen, row.first_seen)
+        current.last_seen = max(current.last_seen, row.last_seen)
+        current.blocked = current.blocked or row.blocked
+        current.ip_address_digest = current.ip_address_digest or row.ip_address_digest
+        to_update.append(current)
+    AdsThrottleCompactEvent.objects.bulk_update(
+        to_update, ["count", "first_seen", "last_seen", "blocked", "ip_address_digest"]
+    )
+    AdsThrottleCompactEvent.objects.bulk_create(incoming.values())
+
+
+def _copy_overrides(batch: list[AdsThrottleOverride]) -> None:
+    rows = {}
+    for override in batch:
+        row = AdsThrottleCompactOverride(
+            scope=override.scope,
+            scope_hash=scope_digest(override.scope or ""),
+            viewer_id=override.viewer_id,
+            user_id=override.user_id,
+            ip_address_digest=hex_to_digest(override.ip_address_hash),
+            force_show=override.force_show,
+            force_block=override.force_block,
+            expires_at=override.expires_at,
+        )
+        rows.setdefault(_override_key(row), row)
+    # Overrides already in the compact table (copied by an earlier run, or
+    # created in compact mode) are not inserted again.
+    existing = AdsThrottleCompactOverride.objects.filter(
+        scope_hash__in={row.scope_hash for row in rows.values()}
+    )
+    for current in existing.only(*OVERRIDE_KEY_FIELDS):
+        rows.pop(_override_key(current), None)
+    AdsThrottleCompactOverride.objects.bulk_create(rows.values())
+
+
+def _override_key(row: AdsThrottleCompactOverride) -> tuple:
+    return tuple(
+        bytes(value) if isinstance(value, memoryview) else value
+        for value in (getattr(row, field) for field in OVERRIDE_KEY_FIELDS)
+    )
+
+
+MIGRATIONS = {
+    "events": (AdsThrottleEvent, _copy_events),
+    "overrides": (AdsThrottleOverride, _copy_overrides),
+}
+
+
+def _saved_checkpoint(name: str) -> int | None:
+    checkpoint = CompactMigrationCheckpoint.objects.filter(name=name).first()
+    return checkpoint.last_pk if checkpoint is not None else None
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy AdsThrottleEvent and AdsThrottleOverride rows into the compact "
+        "schema tables in resumable batches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--models",
+            nargs="+",
+            choices=sorted(MIGRATIONS),
+            default=sorted(MIGRATIONS),
+            help="Tables to copy.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help="Rows copied per transaction.",
+        )
+        parser.add_argument(
+            "--start-after",
+            type=int,
+            help="Copy rows with a primary key greater than this value.",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Ignore the saved checkpoint and start from the first row.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(options["batch_size"], 1)
+        for name in options["models"]:
+            source, copy_batch = MIGRATIONS[name]
+            last_pk = options["start_after"]
+            if last_pk is None and not options["restart"]:
+                last_pk = _saved_checkpoint(name)
+            last_pk = last_pk or 0
+            copied = 0
+            while True:
+                batch = list(
+                    source.objects.filter(pk__gt=last_pk).order_by("pk")[:batch_size]
+                )
+                if not batch:
+                    break
+                last_pk = batch[-1].pk
+                with transaction.atomic():
+                    copy_batch(batch)
+                    # Committed together with the batch, so it is never re-copied.
+                    CompactMigrationCheckpoint.objects.update_or_create(
+                        name=name, defaults={"last_pk": last_pk}
+                    )
+                copied += len(batch)
+                self.stdout.write(f"{name}: copied {copied} rows (last id {last_pk})")
+            self.stdout.write(
+                self.style.SUCCESS(f"{name}: done, {copied} rows copied.")
+            )
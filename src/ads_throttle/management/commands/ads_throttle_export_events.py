@@ -0,0 +1,82 @@
+from datetime import datetime, time
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from ads_throttle.export import (
+    DEFAULT_EXPORT_CHUNK_SIZE,
+    EXPORT_FORMATS,
+    event_queryset,
+    export_events,
+)
+
+
+def _parse_moment(value: str, option: str) -> datetime:
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise CommandError(f"{option} must be an ISO date or datetime.")
+        moment = datetime.combine(day, time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+class Command(BaseCommand):
+    help = "Stream throttle events as CSV, NDJSON or Parquet."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=EXPORT_FORMATS, default="csv")
+        parser.add_argument("--scope", help="Export only events in this scope.")
+        parser.add_argument(
+            "--since", help="Export events last seen at or after this ISO date."
+        )
+        parser.add_argument(
+            "--until", help="Export events last seen before this ISO date."
+        )
+        blocked = parser.add_mutually_exclusive_group()
+        blocked.add_argument(
+            "--blocked", action="store_true", dest="blocked", default=None
+        )
+        blocked.add_argument("--unblocked", action="store_false", dest="blocked")
+        parser.add_argument(
+            "--output",
+            help="Write to this file; required for Parquet. Defaults to stdout.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=DEFAULT_EXPORT_CHUNK_SIZE,
+        )
+
+    def handle(self, *args, **options):
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be positive.")
+        if options["format"] == "parquet" and not options["output"]:
+            raise CommandError("--output is required for Parquet.")
+        queryset = event_queryset(
+            scope=options["scope"],
+            since=options["since"] and _parse_moment(options["since"], "--since"),
+            until=options["until"] and _parse_moment(options["until"], "--until"),
+            blocked=options["blocked"],
+        )
+        try:
+            chunks = export_events(
+                queryset, options["format"], chunk_size=options["chunk_size"]
+            )
+        except ImproperlyConfigured as exc:
+            raise CommandError(str(exc)) from exc
+        if not options["output"]:
+            for chunk in chunks:
+                self.stdout.write(chunk.decode("utf-8"), ending="")
+            return
+        try:
+            output = open(options["output"], "wb")
+        except OSError as exc:
+            raise CommandError(f"Cannot open {options['output']}: {exc}") from exc
+        with output:
+            for chunk in chunks:
+                output.write(chunk)
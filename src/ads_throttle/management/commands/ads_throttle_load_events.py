@@ -0,0 +1,186 @@
+from datetime import datetime, timezone as dt_timezone
+from functools import partial
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, models, transaction
+
+from ads_throttle.models import (
+    AdsThrottleCompactEvent,
+    AdsThrottleEvent,
+    hex_to_digest,
+    scope_digest,
+)
+from ads_throttle.sinks import (
+    DEFAULT_FILE_SINK_MAX_SECONDS,
+    closed_event_files,
+    read_event_file,
+)
+
+DEFAULT_CHUNK_SIZE = 1000
+MERGE_ATTEMPTS = 3
+LOADED_DIRECTORY = "loaded"
+
+
+def _event_row(event: dict, seen: datetime, compact: bool):
+    common = {
+        "first_seen": seen,
+        "last_seen": seen,
+        "count": 1,
+        "blocked": bool(event.get("b")),
+    }
+    if compact:
+        return AdsThrottleCompactEvent(
+            scope=event["s"],
+            scope_hash=scope_digest(event["s"]),
+            viewer_digest=hex_to_digest(event["v"]),
+            ip_address_digest=hex_to_digest(event.get("i", "")),
+            **common,
+        )
+    return AdsThrottleEvent(
+        scope=event["s"],
+        viewer_hash=event["v"],
+        ip_address_hash=event.get("i", ""),
+        **common,
+    )
+
+
+def _merge_chunk(events: list[dict], compact: bool = False) -> int:
+    """Merge a chunk of NDJSON events into event rows."""
+    if compact:
+        model, key_fields = AdsThrottleCompactEvent, ("scope_hash", "viewer_digest")
+        ip_field = "ip_address_digest"
+    else:
+        model, key_fields = AdsThrottleEvent, ("scope", "viewer_hash")
+        ip_field = "ip_address_hash"
+
+    def row_key(row):
+        return tuple(getattr(row, field) for field in key_fields)
+
+    merged: dict[tuple, models.Model] = {}
+    for event in events:
+        seen = datetime.fromtimestamp(event["t"], tz=dt_timezone.utc)
+        incoming = _event_row(event, seen, compact)
+        row = merged.setdefault(row_key(incoming), incoming)
+        if row is incoming:
+            continue
+        row.count += 1
+        row.first_seen = min(row.first_seen, seen)
+        row.last_seen = max(row.last_seen, seen)
+        row.blocked = row.blocked or incoming.blocked
+        setattr(row, ip_field, getattr(row, ip_field) or getattr(incoming, ip_field))
+
+    for _ in range(MERGE_ATTEMPTS):
+        _merge_existing(model, key_fields, ip_field, merged)
+        try:
+            with transaction.atomic():
+                model.objects.bulk_create(merged.values())
+        except IntegrityError:
+            # Another loader inserted some of these keys; merge into them.
+            continue
+        break
+    else:
+        raise CommandError("Could not merge events inserted concurrently.")
+    return len(events)
+
+
+def _merge_existing(model, key_fields, ip_field, merged: dict) -> None:
+    """Add merged rows whose keys already exist to the stored rows."""
+    existing = model.objects.select_for_update().filter(
+        **{f"{key_fields[1]}__in": {key[1] for key in merged}}
+    )
+    to_update = []
+    for current in existing:
+        incoming = merged.pop(
+            tuple(getattr(current, field) for field in key_fields), None
+        )
+        if incoming is None:
+            continue
+        current.count += incoming.count
+        current.first_seen = min(current.first_seen, incoming.first_seen)
+        current.last_seen = max(current.last_seen, incoming.last_seen)
+        current.blocked = current.blocked or incoming.blocked
+        setattr(
+            current,
+            ip_field,
+            getattr(current, ip_field) or getattr(incoming, ip_field),
+        )
+        to_update.append(current)
+    model.objects.bulk_update(
+        to_update, ["count", "first_seen", "last_seen", "blocked", ip_field]
+    )
+
+
+def _move_loaded(path: Path) -> None:
+    """Move a loaded file out of the way so later runs do not load it again."""
+    loaded = path.parent / LOADED_DIRECTORY
+    loaded.mkdir(exist_ok=True)
+    path.rename(loaded / path.name)
+
+
+class Command(BaseCommand):
+    help = "Load rotated NDJSON event files written by FileEventSink."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "directory",
+            nargs="?",
+            help="Event directory. Defaults to ADS_THROTTLE_EVENT_SINK_OPTIONS.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help="Number of events merged per bulk operation.",
+        )
+        parser.add_argument(
+            "--stale-seconds",
+            type=float,
+            help=(
+                "Also load active files not written for this long, or left by "
+                "dead processes. Defaults to the sink's max_seconds."
+            ),
+        )
+        parser.add_argument(
+            "--keep",
+            action="store_true",
+            help=(
+                f"Move files to {LOADED_DIRECTORY}/ after loading instead of "
+                "deleting them."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        sink_options = getattr(settings, "ADS_THROTTLE_EVENT_SINK_OPTIONS", {})
+        directory = options["directory"] or sink_options.get("directory")
+        if not directory:
+            raise CommandError("Provide an event directory.")
+        if not Path(directory).is_dir():
+            raise CommandError(f"{directory} is not a directory.")
+        chunk_size = max(options["chunk_size"], 1)
+        compact = getattr(settings, "ADS_THROTTLE_COMPACT_SCHEMA", False)
+        total = 0
+        stale_seconds = options["stale_seconds"]
+        if stale_seconds is None:
+            stale_seconds = sink_options.get(
+                "max_seconds", DEFAULT_FILE_SINK_MAX_SECONDS
+            )
+        for path in closed_event_files(directory, stale_seconds):
+            loaded = 0
+            with transaction.atomic():
+                chunk = []
+                for event in read_event_file(path):
+                    chunk.append(event)
+                    if len(chunk) >= chunk_size:
+                        loaded += _merge_chunk(chunk, compact)
+                        chunk = []
+                if chunk:
+                    loaded += _merge_chunk(chunk, compact)
+                if options["keep"]:
+                    transaction.on_commit(partial(_move_loaded, path))
+                else:
+                    transaction.on_commit(path.unlink)
+            total += loaded
+            self.stdout.write(f"{path.name}: {loaded} events")
+        self.stdout.write(self.style.SUCCESS(f"Loaded {total} events."))
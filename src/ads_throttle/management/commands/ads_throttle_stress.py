@@ -0,0 +1,299 @@
+import logging
+import multiprocessing
+import os
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from types import SimpleNamespace
+
+from django.apps import apps
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import RequestFactory
+
+from ads_throttle.counters import hot_key_marker, shard_keys
+from ads_throttle.hashing import get_key_formats, hash_scope, hash_viewer
+from ads_throttle.models import AdsThrottleCompactEvent, AdsThrottleEvent, scope_digest
+from ads_throttle.sharding import ShardedCache
+from ads_throttle.throttling import (
+    _counter_cache,
+    _counter_keys,
+    _get_client_ip,
+    _get_settings_values,
+    _hash_ip,
+    _override_cache_key,
+    _shard_count,
+    _viewer_fingerprint,
+    _viewer_id,
+    should_show_ads,
+)
+
+DEFAULT_THREADS = 4
+DEFAULT_VIEWERS = 20
+DEFAULT_REQUESTS_PER_VIEWER = 100
+
+
+class _ErrorCounter(logging.Handler):
+    """Count warnings logged by the app; decisions swallow their exceptions."""
+
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.count = 0
+        self.messages = Counter()
+
+    def emit(self, record):
+        self.count += 1
+        message = record.getMessage()
+        if record.exc_info and record.exc_info[1] is not None:
+            message = f"{message}: {record.exc_info[1]!r}"
+        self.messages[message] += 1
+
+
+def _build_request(scope: str, viewer: int):
+    ip_address = ".".join(str(viewer >> shift & 255) for shift in (16, 8, 0))
+    request = RequestFactory().get(
+        scope,
+        REMOTE_ADDR=f"10.{ip_address}",
+        HTTP_USER_AGENT="ads-throttle-stress",
+    )
+    request.user = AnonymousUser()
+    request.session = SimpleNamespace(session_key=f"stress{viewer:026d}")
+    return request
+
+
+def _run_thread(scope: str, viewers: int, requests: int, offset: int) -> Counter:
+    shown = Counter()
+    for index in range(requests):
+        viewer = (offset + index) % viewers
+        if should_show_ads(_build_request(scope, viewer), scope=scope):
+            shown[viewer] += 1
+    return shown
+
+
+def _run_worker(scope: str, viewers: int, threads: int, requests: int, seed: int):
+    """Run ``threads`` threads in this process; each sends ``requests`` requests."""
+    if not apps.ready:
+        import django
+
+        django.setup()
+    errors = _ErrorCounter()
+    logger = logging.getLogger("ads_throttle")
+    logger.addHandler(errors)
+    try:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            futures = [
+                executor.submit(
+                    _run_thread, scope, viewers, requests, seed * threads + index
+                )
+                for index in range(threads)
+            ]
+            shown = Counter()
+            for future in futures:
+                shown.update(future.result())
+    finally:
+        logger.removeHandler(errors)
+        connections.close_all()
+    return dict(shown), errors.count, dict(errors.messages)
+
+
+def _clean_up_phase(scope: str, viewers: int, settings_values: dict) -> None:
+    """Delete the events and cache keys a phase wrote for its scope."""
+    formats = get_key_formats()
+    scope_hash = hash_scope(scope)
+    shard_count = max(_shard_count(), 1)
+    counter_keys = []
+    cache_keys = []
+    for viewer in range(viewers):
+        request = _build_request(scope, viewer)
+        viewer_hash = hash_viewer(_viewer_fingerprint(request))
+        ip_address_hash = _hash_ip(_get_client_ip(request))
+        for count_key, block_key, _ in _counter_keys(
+            scope_hash, viewer_hash, ip_address_hash, settings_values
+        ):
+            counter_keys += shard_keys(count_key, shard_count)
+            counter_keys += [hot_key_marker(count_key), block_key]
+        cache_keys += [
+            formats["event"].format(scope=scope_hash, viewer=viewer_hash, blocked=0),
+            formats["event"].format(scope=scope_hash, viewer=viewer_hash, blocked=1),
+            _override_cache_key(
+                "", _viewer_id(request), ip_address_hash, scope, viewer_hash
+            ),
+        ]
+    _counter_cache().delete_many(counter_keys)
+    cache.delete_many(cache_keys)
+    AdsThrottleEvent.objects.filter(scope=scope).delete()
+    AdsThrottleCompactEvent.objects.filter(scope_hash=scope_digest(scope)).delete()
+
+
+def _cache_shards(backend) -> list:
+    if isinstance(backend, ShardedCache):
+        return [caches[alias] for alias in backend.aliases]
+    return [backend]
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive should_show_ads from several processes and threads against the "
+        "configured cache and check counter invariants. Each phase deletes the "
+        "events and cache keys it wrote when it ends."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--processes",
+            nargs="+",
+            type=int,
+            default=[1, os.cpu_count() or 1],
+            help="Process counts to run, one phase each. 1 runs in this process.",
+        )
+        parser.add_argument(
+            "--threads",
+            type=int,
+            default=DEFAULT_THREADS,
+            help="Threads per process.",
+        )
+        parser.add_argument(
+            "--viewers",
+            type=int,
+            default=DEFAULT_VIEWERS,
+            help="Distinct viewers shared by all workers.",
+        )
+        parser.add_argument(
+            "--requests-per-viewer",
+            type=int,
+            default=DEFAULT_REQUESTS_PER_VIEWER,
+            help="Requests sent for each viewer in each phase.",
+        )
+        parser.add_argument(
+            "--slack",
+            type=int,
+            default=0,
+            help="Impressions allowed above the threshold per viewer.",
+        )
+
+    def handle(self, *args, **options):
+        threads = max(options["threads"], 1)
+        viewers = max(options["viewers"], 1)
+        per_viewer = max(options["requests_per_viewer"], 1)
+        backend = _counter_cache()
+        settings_values = _get_settings_values()
+        threshold = settings_values["view_repeat_threshold"]
+        window = settings_values["view_repeat_window_seconds"]
+        self.stdout.write(
+            f"backend={backend.__class__.__name__} threshold={threshold} "
+            f"window={window}s viewers={viewers} requests/viewer={per_viewer}"
+        )
+        failed = False
+        for processes in options["processes"]:
+            processes = max(processes, 1)
+            if processes > 1 and any(
+                isinstance(shard, LocMemCache) for shard in _cache_shards(backend)
+            ):
+                raise CommandError(
+                    "LocMemCache is not shared between processes; "
+                    "use --processes 1 or a shared cache backend."
+                )
+            scope = f"/ads-throttle-stress/{uuid.uuid4().hex}/"
+            workers = processes * threads
+            requests = -(-viewers * per_viewer // workers)
+            started = time.monotonic()
+            try:
+                results = self._run_phase(scope, viewers, processes, threads, requests)
+                elapsed = time.monotonic() - started
+                failed |= not self._check_phase(
+                    scope,
+                    results,
+                    processes,
+                    threads,
+                    viewers,
+                    requests,
+                    elapsed,
+                    settings_values,
+                    options["slack"],
+                )
+            finally:
+                _clean_up_phase(scope, viewers, settings_values)
+        if failed:
+            raise CommandError("Invariant violations found.")
+
+    def _run_phase(self, scope, viewers, processes, threads, requests):
+        if processes == 1:
+            return [_run_worker(scope, viewers, threads, requests, 0)]
+        connections.close_all()
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in methods else None)
+        with ProcessPoolExecutor(max_workers=processes, mp_context=context) as pool:
+            futures = [
+                pool.submit(_run_worker, scope, viewers, threads, requests, seed)
+                for seed in range(processes)
+            ]
+            return [future.result() for future in futures]
+
+    def _check_phase(
+        self,
+        scope,
+        results,
+        processes,
+        threads,
+        viewers,
+        requests,
+        elapsed,
+        settings_values,
+        slack,
+    ) -> bool:
+        threshold = settings_values["view_repeat_threshold"]
+        shown = Counter()
+        errors = 0
+        messages = Counter()
+        for worker_shown, worker_errors, worker_messages in results:
+            shown.update(worker_shown)
+            errors += worker_errors
+            messages.update(worker_messages)
+        total = processes * threads * requests
+        # Every thread walks the viewers in order, so each viewer gets at least
+        # this many requests.
+        min_per_viewer = processes * threads * (requests // viewers)
+        over = {
+            viewer: count
+            for viewer, count in shown.items()
+            if count > threshold + slack
+        }
+        unblocked = []
+        if min_per_viewer > threshold:
+            for viewer in range(viewers):
+                request = _build_request(scope, viewer)
+                _, block_key, _ = _counter_keys(
+                    hash_scope(scope),
+                    hash_viewer(_viewer_fingerprint(request)),
+                    _hash_ip(_get_client_ip(request)),
+                    settings_values,
+                )[0]
+                if not _counter_cache().get(block_key):
+                    unblocked.append(viewer)
+        self.stdout.write(
+            f"processes={processes} threads={threads} requests={total} "
+            f"elapsed={elapsed:.2f}s rps={total / elapsed if elapsed else 0:.0f} "
+            f"max_shown={max(shown.values(), default=0)} errors={errors}"
+        )
+        problems = []
+        if errors:
+            problems.append(f"{errors} decisions failed")
+            problems.extend(f"  {count}x {text}" for text, count in messages.items())
+        if over:
+            problems.append(
+                f"{len(over)} viewers shown more than {threshold + slack} times: "
+                f"{dict(sorted(over.items())[:10])}"
+            )
+        if unblocked:
+            problems.append(f"{len(unblocked)} viewers over the threshold not blocked")
+        if elapsed > settings_values["view_repeat_window_seconds"]:
+            problems.append("phase outlasted the counting window")
+        for problem in problems:
+            self.stdout.write(self.style.ERROR(problem))
+        if not problems:
+            self.stdout.write(self.style.SUCCESS("invariants hold"))
+        return not problems
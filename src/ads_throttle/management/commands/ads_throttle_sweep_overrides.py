@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ads_throttle.overrides import DEFAULT_SWEEP_BATCH_SIZE, sweep_expired_overrides
+
+
+class Command(BaseCommand):
+    help = "Archive and delete expired overrides in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_SWEEP_BATCH_SIZE,
+        )
+        parser.add_argument(
+            "--max-batches",
+            type=int,
+            help="Stop after this many batches; by default sweep everything.",
+        )
+        parser.add_argument(
+            "--grace-seconds",
+            type=int,
+            default=0,
+            help="Keep overrides that expired less than this many seconds ago.",
+        )
+        parser.add_argument(
+            "--archive",
+            help="Append deleted overrides to this NDJSON file.",
+        )
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be positive.")
+        sweep_options = {
+            "batch_size": options["batch_size"],
+            "max_batches": options["max_batches"],
+            "grace_seconds": options["grace_seconds"],
+        }
+        if options["archive"]:
+            try:
+                archive = open(options["archive"], "a", encoding="utf-8")
+            except OSError as exc:
+                raise CommandError(f"Cannot open {options['archive']}: {exc}") from exc
+            with archive:
+                deleted = sweep_expired_overrides(archive=archive, **sweep_options)
+        else:
+            deleted = sweep_expired_overrides(**sweep_options)
+        self.stdout.write(f"deleted={deleted}")
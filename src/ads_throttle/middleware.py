@@ -0,0 +1,217 @@
+import secrets
+import time
+from collections.abc import Callable
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core import signing
+from django.http import HttpRequest, HttpResponse
+from django.utils.cache import patch_vary_headers
+
+DEFAULT_BLOCK_TOKEN_COOKIE = "ads_throttle_block"
+DEFAULT_BLOCK_TOKEN_SECONDS = 300
+BLOCK_TOKEN_SALT = "ads_throttle.block_token"
+BLOCK_TOKEN_MAX_SCOPES = 20
+# Scope hashes are shortened in the token to keep the cookie small.
+BLOCK_TOKEN_HASH_LENGTH = 16
+DEFAULT_VIEWER_COOKIE = "ads_throttle_viewer"
+DEFAULT_VIEWER_COOKIE_SECONDS = 365 * 24 * 60 * 60
+VIEWER_COOKIE_SALT = "ads_throttle.viewer"
+SERVER_TIMING_MAX_ENTRIES = 30
+
+
+def token_scope(scope_hash: str) -> str:
+    """Return the form of a scope hash stored in block tokens."""
+    return scope_hash[:BLOCK_TOKEN_HASH_LENGTH]
+
+
+def _cookie_name() -> str:
+    return getattr(
+        settings, "ADS_THROTTLE_BLOCK_TOKEN_COOKIE", DEFAULT_BLOCK_TOKEN_COOKIE
+    )
+
+
+def _load_token(value: str | None, now: float) -> dict[str, int]:
+    if not value:
+        return {}
+    try:
+        blocks = signing.loads(value, salt=BLOCK_TOKEN_SALT)
+    except signing.BadSignature:
+        return {}
+    if not isinstance(blocks, dict):
+        return {}
+    return {
+        scope: expires
+        for scope, expires in blocks.items()
+        if isinstance(expires, int) and expires > now
+    }
+
+
+class BlockTokenMiddleware:
+    """Remember block decisions in a signed cookie.
+
+    While the cookie holds an unexpired entry for a scope, ``should_show_ads``
+    answers "blocked" without touching the cache. The cookie can only make the
+    decision stricter: a missing or tampered cookie falls back to the normal
+    cache lookups.
+    """
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]):
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        now = time.time()
+        blocked = _load_token(request.COOKIES.get(_cookie_name()), now)
+        request._ads_throttle_blocked_scopes = blocked
+        request._ads_throttle_new_blocks = {}
+        response = self.get_response(request)
+        if request._ads_throttle_new_blocks:
+            self._set_token(
+                request, response, {**blocked, **request._ads_throttle_new_blocks}, now
+            )
+        return response
+
+    def _set_token(
+        self,
+        request: HttpRequest,
+        response: HttpResponse,
+        blocks: dict[str, int],
+        now: float,
+    ) -> None:
+        latest = dict(
+            sorted(blocks.items(), key=lambda item: item[1])[-BLOCK_TOKEN_MAX_SCOPES:]
+        )
+        response.set_cookie(
+            _cookie_name(),
+            signing.dumps(latest, salt=BLOCK_TOKEN_SALT),
+            max_age=max(latest.values()) - int(now),
+            secure=request.is_secure(),
+            httponly=True,
+            samesite="Lax",
+        )
+        patch_vary_headers(response, ("Cookie",))
+
+
+def remember_block(request: HttpRequest, scope_hash: str, block_seconds: int) -> None:
+    """Add a blocked scope to the token set by ``BlockTokenMiddleware``."""
+    new_blocks = getattr(request, "_ads_throttle_new_blocks", None)
+    if new_blocks is None:
+        return
+    seconds = min(
+        getattr(
+            settings, "ADS_THROTTLE_BLOCK_TOKEN_SECONDS", DEFAULT_BLOCK_TOKEN_SECONDS
+        ),
+        block_seconds,
+    )
+    if seconds > 0:
+        new_blocks[token_scope(scope_hash)] = int(time.time()) + seconds
+
+
+def has_block_token(request: HttpRequest, scope_hash: str) -> bool:
+    """Return whether the request carries a valid block token for the scope."""
+    blocked = getattr(request, "_ads_throttle_blocked_scopes", None)
+    return bool(blocked) and token_scope(scope_hash) in blocked
+
+
+def _viewer_cookie_name() -> str:
+    return getattr(settings, "ADS_THROTTLE_VIEWER_COOKIE", DEFAULT_VIEWER_COOKIE)
+
+
+def _load_viewer(value: str | None) -> str:
+    if not value:
+        return ""
+    try:
+        return signing.Signer(salt=VIEWER_COOKIE_SALT).unsign(value)
+    except signing.BadSignature:
+        return ""
+
+
+class ViewerCookieMiddleware:
+    """Identify viewers by a signed cookie instead of the session.
+
+    Used with ``ADS_THROTTLE_IDENTITY_MODE = "signed_cookie"``. A viewer without
+    a valid cookie gets a random id; the cookie is only set on responses where
+    the throttle actually read that id.
+    """
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]):
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        viewer = _load_viewer(request.COOKIES.get(_viewer_cookie_name()))
+        request._ads_throttle_viewer = viewer or secrets.token_urlsafe(16)
+        request._ads_throttle_viewer_used = False
+        response = self.get_response(request)
+        if not viewer and request._ads_throttle_viewer_used:
+            response.set_cookie(
+                _viewer_cookie_name(),
+                signing.Signer(salt=VIEWER_COOKIE_SALT).sign(
+                    request._ads_throttle_viewer
+                ),
+                max_age=getattr(
+                    settings,
+                    "ADS_THROTTLE_VIEWER_COOKIE_SECONDS",
+                    DEFAULT_VIEWER_COOKIE_SECONDS,
+                ),
+                secure=request.is_secure(),
+                httponly=True,
+                samesite="Lax",
+            )
+            patch_vary_headers(response, ("Cookie",))
+        return response
+
+
+def viewer_cookie_id(request: HttpRequest) -> str:
+    """Return the signed-cookie viewer id, or an empty string if there is none."""
+    viewer = getattr(request, "_ads_throttle_viewer", None)
+    if viewer is None:
+        return _load_viewer(request.COOKIES.get(_viewer_cookie_name()))
+    request._ads_throttle_viewer_used = True
+    return viewer
+
+
+# Printable ASCII except "%"; everything else in a description is
+# percent-encoded so that decoded paths cannot inject header lines.
+_TIMING_DESC_SAFE = "".join(chr(code) for code in range(0x20, 0x7F) if code != 0x25)
+
+
+def _timing_entry(name: str, duration_ns: int, description: str = "") -> str:
+    entry = f"{name};dur={duration_ns / 1_000_000:.3f}"
+    if description:
+        escaped = quote(description, safe=_TIMING_DESC_SAFE)
+        escaped = escaped.replace("\\", "\\\\").replace('"', '\\"')
+        entry += f';desc="{escaped}"'
+    return entry
+
+
+class ServerTimingMiddleware:
+    """Report ad decision timings in the ``Server-Timing`` response header.
+
+    Each ``should_show_ads`` call adds an ``ads-throttle`` entry with its scope.
+    Traces from ``explain_should_show_ads`` made during the request add one
+    ``ads-throttle-<stage>`` entry per stage.
+    """
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]):
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        request._ads_throttle_timings = []
+        request._ads_throttle_traces = []
+        response = self.get_response(request)
+        entries = [
+            _timing_entry("ads-throttle", duration, scope)
+            for scope, duration in request._ads_throttle_timings
+        ]
+        for trace in request._ads_throttle_traces:
+            entries += [
+                _timing_entry(f"ads-throttle-{stage}", duration, trace["scope"])
+                for stage, duration in trace["timings_ns"].items()
+            ]
+        if entries:
+            entries = entries[:SERVER_TIMING_MAX_ENTRIES]
+            existing = response.headers.get("Server-Timing")
+            response.headers["Server-Timing"] = ", ".join(
+                [existing, *entries] if existing else entries
+            )
+        return response
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.9 on 2026-10-19 09:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ads_throttle", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="sitesetting",
+            name="ip_repeat_threshold",
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text="How many ad impressions are allowed per IP address within a page window before blocking. 0 disables the per-IP counter.",
+                verbose_name="IP threshold",
+            ),
+        ),
+        migrations.AddField(
+            model_name="sitesetting",
+            name="site_ip_repeat_threshold",
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text="How many ad impressions are allowed per IP address across the whole site within the window before blocking. 0 disables the counter.",
+                verbose_name="Site-wide IP threshold",
+            ),
+        ),
+    ]
@@ -0,0 +1,179 @@
+# Generated by Django 6.1.2 on 2026-10-19 09:21
+
+import ads_throttle.fields
+import ads_throttle.models
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ads_throttle", "0002_sitesetting_ip_thresholds"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AdsThrottleCompactEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "scope_hash",
+                    ads_throttle.fields.DigestField(
+                        max_length=32, verbose_name="Scope hash"
+                    ),
+                ),
+                ("scope", models.TextField(verbose_name="Scope")),
+                (
+                    "viewer_digest",
+                    ads_throttle.fields.DigestField(
+                        max_length=32, verbose_name="Viewer hash"
+                    ),
+                ),
+                (
+                    "ip_address_digest",
+                    ads_throttle.fields.DigestField(
+                        blank=True,
+                        default=b"",
+                        max_length=32,
+                        verbose_name="IP address hash",
+                    ),
+                ),
+                ("first_seen", models.DateTimeField(verbose_name="First seen")),
+                ("last_seen", models.DateTimeField(verbose_name="Last seen")),
+                ("count", models.PositiveIntegerField(default=0, verbose_name="Count")),
+                ("blocked", models.BooleanField(default=False, verbose_name="Blocked")),
+            ],
+            options={
+                "verbose_name": "Ads throttle event (compact)",
+                "verbose_name_plural": "Ads throttle events (compact)",
+                "indexes": [
+                    models.Index(
+                        fields=["scope_hash", "blocked", "last_seen"],
+                        name="ads_thrott_cev_scope_idx",
+                    ),
+                    models.Index(
+                        fields=["viewer_digest"], name="ads_thrott_cev_viewer_idx"
+                    ),
+                    models.Index(
+                        fields=["ip_address_digest"], name="ads_thrott_cev_ip_idx"
+                    ),
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("scope_hash", "viewer_digest"),
+                        name="ads_thrott_cev_scope_view_uniq",
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="AdsThrottleCompactOverride",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "scope",
+                    models.CharField(
+                        blank=True,
+                        help_text="Page path or empty to apply site-wide.",
+                        max_length=512,
+                        verbose_name="Scope",
+                    ),
+                ),
+                (
+                    "scope_hash",
+                    ads_throttle.fields.DigestField(
+                        max_length=32, verbose_name="Scope hash"
+                    ),
+                ),
+                (
+                    "viewer_id",
+                    models.CharField(
+                        blank=True,
+                        help_text="Format: user:<id> or session:<key>.",
+                        max_length=255,
+                        verbose_name="Viewer ID",
+                    ),
+                ),
+                (
+                    "ip_address_digest",
+                    ads_throttle.fields.DigestField(
+                        blank=True,
+                        default=b"",
+                        max_length=32,
+                        verbose_name="IP address hash",
+                    ),
+                ),
+                (
+                    "force_show",
+                    models.BooleanField(default=False, verbose_name="Force show"),
+                ),
+                (
+                    "force_block",
+                    models.BooleanField(default=False, verbose_name="Force block"),
+                ),
+                (
+                    "expires_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Expires at"
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Created at"),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="Updated at"),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="ads_throttle_compact_overrides",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="User",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Ads throttle override (compact)",
+                "verbose_name_plural": "Ads throttle overrides (compact)",
+                "indexes": [
+                    models.Index(
+                        fields=["scope_hash", "viewer_id", "expires_at"],
+                        name="ads_thrott_cov_viewer_idx",
+                    ),
+                    models.Index(
+                        fields=["scope_hash", "ip_address_digest", "expires_at"],
+                        name="ads_thrott_cov_ip_idx",
+                    ),
+                    models.Index(
+                        fields=["scope_hash", "user", "expires_at"],
+                        name="ads_thrott_cov_user_idx",
+                    ),
+                ],
+            },
+            bases=(ads_throttle.models.OverrideMixin, models.Model),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 6.1.2 on 2026-10-19 09:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ads_throttle", "0003_compact_schema"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="adsthrottlecompactoverride",
+            index=models.Index(
+                condition=models.Q(("expires_at__isnull", False)),
+                fields=["expires_at"],
+                name="ads_thrott_cov_expiry_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="adsthrottleoverride",
+            index=models.Index(
+                condition=models.Q(("expires_at__isnull", False)),
+                fields=["expires_at"],
+                name="ads_thrott_ov_expiry_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,87 @@
+# Generated by Django 6.1.2 on 2026-10-19 09:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ads_throttle", "0004_override_expiry_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ScopeProfile",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "scope",
+                    models.CharField(
+                        help_text="Page path, or the start of the paths for a prefix profile.",
+                        max_length=512,
+                        verbose_name="Scope",
+                    ),
+                ),
+                (
+                    "match",
+                    models.CharField(
+                        choices=[("exact", "Exact path"), ("prefix", "Path prefix")],
+                        default="exact",
+                        max_length=8,
+                        verbose_name="Match",
+                    ),
+                ),
+                (
+                    "view_repeat_window_seconds",
+                    models.PositiveIntegerField(
+                        blank=True, null=True, verbose_name="View window (seconds)"
+                    ),
+                ),
+                (
+                    "view_repeat_threshold",
+                    models.PositiveIntegerField(
+                        blank=True, null=True, verbose_name="View threshold"
+                    ),
+                ),
+                (
+                    "block_seconds",
+                    models.PositiveIntegerField(
+                        blank=True, null=True, verbose_name="Block duration (seconds)"
+                    ),
+                ),
+                (
+                    "ip_repeat_threshold",
+                    models.PositiveIntegerField(
+                        blank=True, null=True, verbose_name="IP threshold"
+                    ),
+                ),
+                (
+                    "site_ip_repeat_threshold",
+                    models.PositiveIntegerField(
+                        blank=True, null=True, verbose_name="Site-wide IP threshold"
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="Updated at"),
+                ),
+            ],
+            options={
+                "verbose_name": "Ads throttle scope profile",
+                "verbose_name_plural": "Ads throttle scope profiles",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("scope", "match"), name="ads_thrott_profile_scope_uniq"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 6.1.2 on 2026-10-19 10:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ads_throttle", "0005_scope_profile"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CompactMigrationCheckpoint",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "name",
+                    models.CharField(max_length=32, unique=True, verbose_name="Table"),
+                ),
+                (
+                    "last_pk",
+                    models.BigIntegerField(default=0, verbose_name="Last copied ID"),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="Updated at"),
+                ),
+            ],
+            options={
+                "verbose_name": "Compact migration checkpoint",
+                "verbose_name_plural": "Compact migration checkpoints",
+            },
+        ),
+    ]
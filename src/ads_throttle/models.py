@@ -1,9 +1,26 @@
+import hashlib
+
 from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.db import models
 from django.utils import timezone
 from django.utils.translation import gettext as gettext
 from django.utils.translation import gettext_lazy as _
 
+from .fields import DigestField
+
+
+def scope_digest(scope: str) -> bytes:
+    """Return the fixed-width digest used to index a scope."""
+    return hashlib.sha256(scope.encode("utf-8")).digest()
+
+
+def hex_to_digest(value: str) -> bytes:
+    """Convert a hex hash into the binary form used by compact models."""
+    if not value:
+        return b""
+    return bytes.fromhex(value)
+
 
 class SiteSetting(models.Model):
     view_repeat_window_seconds = models.PositiveIntegerField(
@@ -25,6 +42,22 @@ class SiteSetting(models.Model):
             "How long to block ads after the threshold is reached, in seconds."
         ),
     )
+    ip_repeat_threshold = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_("IP threshold"),
+        help_text=_(
+            "How many ad impressions are allowed per IP address within a page "
+            "window before blocking. 0 disables the per-IP counter."
+        ),
+    )
+    site_ip_repeat_threshold = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_("Site-wide IP threshold"),
+        help_text=_(
+            "How many ad impressions are allowed per IP address across the whole "
+            "site within the window before blocking. 0 disables the counter."
+        ),
+    )
     event_record_seconds = models.PositiveIntegerField(
         default=60,
         verbose_name=_("Event record interval (seconds)"),
@@ -53,13 +86,113 @@ class SiteSetting(models.Model):
             "view_repeat_window_seconds": instance.view_repeat_window_seconds,
             "view_repeat_threshold": instance.view_repeat_threshold,
             "block_seconds": instance.block_seconds,
+            "ip_repeat_threshold": instance.ip_repeat_threshold,
+            "site_ip_repeat_threshold": instance.site_ip_repeat_threshold,
             "event_record_seconds": instance.event_record_seconds,
         }
         cache.set(cache_key, data, timeout=timeout)
         return data
 
 
-class AdsThrottleOverride(models.Model):
+class ScopeProfile(models.Model):
+    """Throttle limits for one scope or scope prefix.
+
+    Blank limits fall back to ``SiteSetting`` and the Django settings.
+    """
+
+    MATCH_EXACT = "exact"
+    MATCH_PREFIX = "prefix"
+    MATCH_CHOICES = (
+        (MATCH_EXACT, _("Exact path")),
+        (MATCH_PREFIX, _("Path prefix")),
+    )
+    LIMIT_FIELDS = (
+        "view_repeat_window_seconds",
+        "view_repeat_threshold",
+        "block_seconds",
+        "ip_repeat_threshold",
+        "site_ip_repeat_threshold",
+    )
+
+    scope = models.CharField(
+        max_length=512,
+        verbose_name=_("Scope"),
+        help_text=_("Page path, or the start of the paths for a prefix profile."),
+    )
+    match = models.CharField(
+        max_length=8,
+        choices=MATCH_CHOICES,
+        default=MATCH_EXACT,
+        verbose_name=_("Match"),
+    )
+    view_repeat_window_seconds = models.PositiveIntegerField(
+        null=True, blank=True, verbose_name=_("View window (seconds)")
+    )
+    view_repeat_threshold = models.PositiveIntegerField(
+        null=True, blank=True, verbose_name=_("View threshold")
+    )
+    block_seconds = models.PositiveIntegerField(
+        null=True, blank=True, verbose_name=_("Block duration (seconds)")
+    )
+    ip_repeat_threshold = models.PositiveIntegerField(
+        null=True, blank=True, verbose_name=_("IP threshold")
+    )
+    site_ip_repeat_threshold = models.PositiveIntegerField(
+        null=True, blank=True, verbose_name=_("Site-wide IP threshold")
+    )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name=_("Updated at"))
+
+    class Meta:
+        verbose_name = _("Ads throttle scope profile")
+        verbose_name_plural = _("Ads throttle scope profiles")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["scope", "match"], name="ads_thrott_profile_scope_uniq"
+            )
+        ]
+
+    def __str__(self):
+        if self.match == self.MATCH_PREFIX:
+            return f"{self.scope}*"
+        return self.scope
+
+    def clean(self):
+        if not self.scope.startswith("/"):
+            raise ValidationError(
+                {"scope": _("Scope must start with '/'. Example: /articles/.")}
+            )
+
+    def limits(self) -> dict[str, int]:
+        """Return the limits set on this profile."""
+        return {
+            field: getattr(self, field)
+            for field in self.LIMIT_FIELDS
+            if getattr(self, field) is not None
+        }
+
+
+class OverrideMixin:
+    def __str__(self):
+        target = (
+            self.viewer_id
+            or (self.user.username if self.user_id else None)
+            or self.ip_address_hash
+        )
+        if not target:
+            target = gettext("all viewers")
+        scope = self.scope or gettext("all scopes")
+        return gettext("Override for %(target)s (%(scope)s)") % {
+            "target": target,
+            "scope": scope,
+        }
+
+    def is_active(self):
+        if not self.expires_at:
+            return True
+        return self.expires_at > timezone.now()
+
+
+class AdsThrottleOverride(OverrideMixin, models.Model):
     scope = models.CharField(
         max_length=512,
         blank=True,
@@ -110,27 +243,14 @@ class AdsThrottleOverride(models.Model):
                 fields=["scope", "user", "expires_at"],
                 name="ads_thrott_scope_f40e50_idx",
             ),
+            # Only rows that can expire; used by the expired-override sweeper.
+            models.Index(
+                fields=["expires_at"],
+                condition=models.Q(expires_at__isnull=False),
+                name="ads_thrott_ov_expiry_idx",
+            ),
         ]
 
-    def __str__(self):
-        target = (
-            self.viewer_id
-            or (self.user.username if self.user_id else None)
-            or self.ip_address_hash
-        )
-        if not target:
-            target = gettext("all viewers")
-        scope = self.scope or gettext("all scopes")
-        return gettext("Override for %(target)s (%(scope)s)") % {
-            "target": target,
-            "scope": scope,
-        }
-
-    def is_active(self):
-        if not self.expires_at:
-            return True
-        return self.expires_at > timezone.now()
-
 
 class AdsThrottleEvent(models.Model):
     scope = models.CharField(max_length=512, verbose_name=_("Scope"))
@@ -156,3 +276,151 @@ class AdsThrottleEvent(models.Model):
     def __str__(self):
         scope = self.scope or gettext("all scopes")
         return gettext("Ads throttle event (%(scope)s)") % {"scope": scope}
+
+
+class AdsThrottleCompactOverride(OverrideMixin, models.Model):
+    """Override stored with binary scope and IP digests.
+
+    Used instead of ``AdsThrottleOverride`` when
+    ``ADS_THROTTLE_COMPACT_SCHEMA`` is enabled.
+    """
+
+    scope = models.CharField(
+        max_length=512,
+        blank=True,
+        verbose_name=_("Scope"),
+        help_text=_("Page path or empty to apply site-wide."),
+    )
+    scope_hash = DigestField(verbose_name=_("Scope hash"))
+    viewer_id = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name=_("Viewer ID"),
+        help_text=_("Format: user:<id> or session:<key>."),
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        verbose_name=_("User"),
+        related_name="ads_throttle_compact_overrides",
+    )
+    ip_address_digest = DigestField(
+        blank=True, default=b"", verbose_name=_("IP address hash")
+    )
+    force_show = models.BooleanField(default=False, verbose_name=_("Force show"))
+    force_block = models.BooleanField(default=False, verbose_name=_("Force block"))
+    expires_at = models.DateTimeField(
+        null=True, blank=True, verbose_name=_("Expires at")
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name=_("Created at"))
+    updated_at = models.DateTimeField(auto_now=True, verbose_name=_("Updated at"))
+
+    class Meta:
+        verbose_name = _("Ads throttle override (compact)")
+        verbose_name_plural = _("Ads throttle overrides (compact)")
+        indexes = [
+            models.Index(
+                fields=["scope_hash", "viewer_id", "expires_at"],
+                name="ads_thrott_cov_viewer_idx",
+            ),
+            models.Index(
+                fields=["scope_hash", "ip_address_digest", "expires_at"],
+                name="ads_thrott_cov_ip_idx",
+            ),
+            models.Index(
+                fields=["scope_hash", "user", "expires_at"],
+                name="ads_thrott_cov_user_idx",
+            ),
+            models.Index(
+                fields=["expires_at"],
+                condition=models.Q(expires_at__isnull=False),
+                name="ads_thrott_cov_expiry_idx",
+            ),
+        ]
+
+    @property
+    def ip_address_hash(self) -> str:
+        return bytes(self.ip_address_digest or b"").hex()
+
+    @ip_address_hash.setter
+    def ip_address_hash(self, value: str) -> None:
+        self.ip_address_digest = hex_to_digest(value)
+
+    def save(self, *args, **kwargs):
+        self.scope_hash = scope_digest(self.scope or "")
+        super().save(*args, **kwargs)
+
+
+class AdsThrottleCompactEvent(models.Model):
+    """Event stored with binary digests and a fixed-width scope hash.
+
+    Used instead of ``AdsThrottleEvent`` when ``ADS_THROTTLE_COMPACT_SCHEMA`` is
+    enabled. The readable scope is kept for display but is not indexed.
+    """
+
+    scope_hash = DigestField(verbose_name=_("Scope hash"))
+    scope = models.TextField(verbose_name=_("Scope"))
+    viewer_digest = DigestField(verbose_name=_("Viewer hash"))
+    ip_address_digest = DigestField(
+        blank=True, default=b"", verbose_name=_("IP address hash")
+    )
+    first_seen = models.DateTimeField(verbose_name=_("First seen"))
+    last_seen = models.DateTimeField(verbose_name=_("Last seen"))
+    count = models.PositiveIntegerField(default=0, verbose_name=_("Count"))
+    blocked = models.BooleanField(default=False, verbose_name=_("Blocked"))
+
+    class Meta:
+        verbose_name = _("Ads throttle event (compact)")
+        verbose_name_plural = _("Ads throttle events (compact)")
+        indexes = [
+            models.Index(
+                fields=["scope_hash", "blocked", "last_seen"],
+                name="ads_thrott_cev_scope_idx",
+            ),
+            models.Index(fields=["viewer_digest"], name="ads_thrott_cev_viewer_idx"),
+            models.Index(fields=["ip_address_digest"], name="ads_thrott_cev_ip_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["scope_hash", "viewer_digest"],
+                name="ads_thrott_cev_scope_view_uniq",
+            )
+        ]
+
+    def __str__(self):
+        scope = self.scope or gettext("all scopes")
+        return gettext("Ads throttle event (%(scope)s)") % {"scope": scope}
+
+    @property
+    def viewer_hash(self) -> str:
+        return bytes(self.viewer_digest).hex()
+
+    @property
+    def ip_address_hash(self) -> str:
+        return bytes(self.ip_address_digest or b"").hex()
+
+    def save(self, *args, **kwargs):
+        if not self.scope_hash:
+            self.scope_hash = scope_digest(self.scope)
+        super().save(*args, **kwargs)
+
+
+class CompactMigrationCheckpoint(models.Model):
+    """Last row copied by ``ads_throttle_compact_migrate`` for each table.
+
+    Saved in the transaction that copies the batch, so a resumed run never
+    copies a committed batch twice.
+    """
+
+    name = models.CharField(max_length=32, unique=True, verbose_name=_("Table"))
+    last_pk = models.BigIntegerField(default=0, verbose_name=_("Last copied ID"))
+    updated_at = models.DateTimeField(auto_now=True, verbose_name=_("Updated at"))
+
+    class Meta:
+        verbose_name = _("Compact migration checkpoint")
+        verbose_name_plural = _("Compact migration checkpoints")
+
+    def __str__(self):
+        return f"{self.name}: {self.last_pk}"
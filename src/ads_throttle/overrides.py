@@ -0,0 +1,221 @@
+import json
+import logging
+import threading
+import time
+from collections.abc import Iterable
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import TextIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import request_finished
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .hashing import get_key_formats
+from .models import (
+    AdsThrottleCompactOverride,
+    AdsThrottleOverride,
+    hex_to_digest,
+    scope_digest,
+)
+
+DEFAULT_IMPORT_CHUNK_SIZE = 1000
+DEFAULT_SWEEP_BATCH_SIZE = 1000
+FINGERPRINT_PREFIX = "fingerprint:"
+
+logger = logging.getLogger("ads_throttle")
+
+_batch = threading.local()
+# Monotonic time before which this process does not try to sweep again.
+_next_sweep_at = 0.0
+
+
+def fingerprint_viewer_id(viewer_hash: str) -> str:
+    """Return the override ``viewer_id`` that matches a viewer hash."""
+    return f"{FINGERPRINT_PREFIX}{viewer_hash}"
+
+
+def get_override_generation():
+    """Return the current override generation, or ``None`` if never bumped."""
+    return cache.get(get_key_formats()["override_generation"])
+
+
+def bump_override_generation() -> None:
+    """Invalidate every cached override decision at once."""
+    cache.set(get_key_formats()["override_generation"], time.time_ns(), timeout=None)
+
+
+@contextmanager
+def batched_invalidation():
+    """Bump the override generation once, after commit, for all changes inside."""
+    depth = getattr(_batch, "depth", 0)
+    _batch.depth = depth + 1
+    try:
+        yield
+    finally:
+        _batch.depth = depth
+        if not depth:
+            transaction.on_commit(bump_override_generation)
+
+
+@contextmanager
+def _unchanged_decisions():
+    """Skip invalidation for changes inside that no lookup can observe."""
+    depth = getattr(_batch, "depth", 0)
+    _batch.depth = depth + 1
+    try:
+        yield
+    finally:
+        _batch.depth = depth
+
+
+@receiver(post_save, sender=AdsThrottleOverride)
+@receiver(post_delete, sender=AdsThrottleOverride)
+@receiver(post_save, sender=AdsThrottleCompactOverride)
+@receiver(post_delete, sender=AdsThrottleCompactOverride)
+def _invalidate_override_decisions(**kwargs) -> None:
+    if not getattr(_batch, "depth", 0):
+        transaction.on_commit(bump_override_generation)
+
+
+def create_overrides(
+    *,
+    ip_address_hashes: Iterable[str] = (),
+    viewer_ids: Iterable[str] = (),
+    scope: str = "",
+    force_block: bool = True,
+    expires_at: datetime | None = None,
+    chunk_size: int = DEFAULT_IMPORT_CHUNK_SIZE,
+) -> int:
+    """Insert overrides for many IP hashes and viewer ids; return rows created.
+
+    Targets that already have an active override with the same scope and action
+    are skipped. Rows are written with ``bulk_create`` in chunks and cached
+    decisions are invalidated once.
+    """
+    compact = getattr(settings, "ADS_THROTTLE_COMPACT_SCHEMA", False)
+    if compact:
+        model = AdsThrottleCompactOverride
+        scope_fields = {"scope": scope, "scope_hash": scope_digest(scope)}
+        scope_filter = {"scope_hash": scope_fields["scope_hash"]}
+        ip_field = "ip_address_digest"
+        ip_values = [hex_to_digest(value) for value in dict.fromkeys(ip_address_hashes)]
+    else:
+        model = AdsThrottleOverride
+        scope_fields = scope_filter = {"scope": scope}
+        ip_field = "ip_address_hash"
+        ip_values = list(dict.fromkeys(ip_address_hashes))
+    flags = {"force_block": force_block, "force_show": not force_block}
+    active = Q(expires_at__isnull=True) | Q(expires_at__gt=timezone.now())
+    created = 0
+    with transaction.atomic(), batched_invalidation():
+        for field, values in (
+            (ip_field, [value for value in ip_values if value]),
+            ("viewer_id", [value for value in dict.fromkeys(viewer_ids) if value]),
+        ):
+            for start in range(0, len(values), chunk_size):
+                chunk = values[start : start + chunk_size]
+                existing = set(
+                    model.objects.filter(
+                        active, **scope_filter, **flags, **{f"{field}__in": chunk}
+                    ).values_list(field, flat=True)
+                )
+                rows = [
+                    model(
+                        **scope_fields,
+                        **flags,
+                        expires_at=expires_at,
+                        **{field: value},
+                    )
+                    for value in chunk
+                    if value not in existing
+                ]
+                model.objects.bulk_create(rows, batch_size=chunk_size)
+                created += len(rows)
+    return created
+
+
+def _archive_row(override) -> dict:
+    return {
+        "model": override._meta.label,
+        "id": override.pk,
+        "scope": override.scope,
+        "viewer_id": override.viewer_id,
+        "user_id": override.user_id,
+        "ip_address_hash": override.ip_address_hash,
+        "force_show": override.force_show,
+        "force_block": override.force_block,
+        "expires_at": override.expires_at.isoformat(),
+        "created_at": override.created_at.isoformat(),
+    }
+
+
+def sweep_expired_overrides(
+    *,
+    batch_size: int = DEFAULT_SWEEP_BATCH_SIZE,
+    max_batches: int | None = None,
+    grace_seconds: int = 0,
+    archive: TextIO | None = None,
+) -> int:
+    """Delete overrides that expired ``grace_seconds`` ago; return rows deleted.
+
+    Rows are deleted in primary-key batches, each in its own transaction, so a
+    large backlog never holds long locks. With ``archive`` every deleted row is
+    written to it as an NDJSON line first. Expired rows never match a lookup,
+    so deleting them leaves the override generation alone.
+    """
+    cutoff = timezone.now() - timedelta(seconds=grace_seconds)
+    deleted = batches = 0
+    for model in (AdsThrottleOverride, AdsThrottleCompactOverride):
+        while max_batches is None or batches < max_batches:
+            with transaction.atomic(), _unchanged_decisions():
+                rows = list(
+                    model.objects.select_for_update()
+                    .filter(expires_at__lte=cutoff)
+                    .order_by("expires_at", "pk")[:batch_size]
+                )
+                if not rows:
+                    break
+                if archive is not None:
+                    archive.writelines(
+                        json.dumps(_archive_row(row)) + "\n" for row in rows
+                    )
+                model.objects.filter(pk__in=[row.pk for row in rows]).delete()
+            deleted += len(rows)
+            batches += 1
+            if len(rows) < batch_size:
+                break
+    return deleted
+
+
+@receiver(request_finished)
+def _sweep_periodically(**kwargs) -> None:
+    """Sweep one batch at most every ``ADS_THROTTLE_OVERRIDE_SWEEP_SECONDS``.
+
+    A local timer keeps most requests from touching the cache; the cache key
+    then picks one process per interval.
+    """
+    global _next_sweep_at
+    interval = getattr(settings, "ADS_THROTTLE_OVERRIDE_SWEEP_SECONDS", 0)
+    if not interval:
+        return
+    now = time.monotonic()
+    if now < _next_sweep_at:
+        return
+    _next_sweep_at = now + interval
+    try:
+        if not cache.add(get_key_formats()["override_sweep"], 1, timeout=interval):
+            return
+        archive_path = getattr(settings, "ADS_THROTTLE_OVERRIDE_ARCHIVE_PATH", "")
+        if archive_path:
+            with open(archive_path, "a", encoding="utf-8") as archive:
+                sweep_expired_overrides(max_batches=1, archive=archive)
+        else:
+            sweep_expired_overrides(max_batches=1)
+    except Exception:
+        logger.warning("ads_throttle override sweep failed", exc_info=True)
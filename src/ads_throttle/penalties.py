@@ -0,0 +1,108 @@
+from typing import NamedTuple
+
+from django.conf import settings
+
+DEFAULT_ESCALATION_FACTOR = 1
+DEFAULT_ESCALATION_MAX_SECONDS = 86400
+DEFAULT_ESCALATION_DECAY_SECONDS = 86400
+
+# A packed penalty is one integer: the block end (seconds since PENALTY_EPOCH),
+# the decay delay after it and the strike count, so that integer-only counter
+# caches can hold it.
+PENALTY_EPOCH = 1_700_000_000
+_STRIKE_BITS = 8
+_DECAY_BITS = 24
+MAX_STRIKES = (1 << _STRIKE_BITS) - 1
+MAX_DECAY_SECONDS = (1 << _DECAY_BITS) - 1
+
+
+class Penalty(NamedTuple):
+    strikes: int
+    block_until: int
+    decay_until: int
+
+
+def pack_penalty(penalty: Penalty) -> int:
+    decay = min(max(penalty.decay_until - penalty.block_until, 0), MAX_DECAY_SECONDS)
+    return (
+        ((penalty.block_until - PENALTY_EPOCH) << (_DECAY_BITS + _STRIKE_BITS))
+        | (decay << _STRIKE_BITS)
+        | min(penalty.strikes, MAX_STRIKES)
+    )
+
+
+def unpack_penalty(value) -> Penalty | None:
+    """Return the penalty stored in a block key, or ``None`` for a plain flag."""
+    if isinstance(value, bool) or not isinstance(value, int) or value <= 1:
+        return None
+    block_until = (value >> (_DECAY_BITS + _STRIKE_BITS)) + PENALTY_EPOCH
+    decay = (value >> _STRIKE_BITS) & MAX_DECAY_SECONDS
+    return Penalty(value & MAX_STRIKES, block_until, block_until + decay)
+
+
+def is_blocking(value, now: float) -> bool:
+    """Return whether a block key value blocks the viewer at ``now``."""
+    penalty = unpack_penalty(value)
+    if penalty is None:
+        return bool(value)
+    return penalty.block_until > now
+
+
+def escalation_enabled() -> bool:
+    return (
+        getattr(settings, "ADS_THROTTLE_ESCALATION_FACTOR", DEFAULT_ESCALATION_FACTOR)
+        > 1
+    )
+
+
+def next_penalty(previous, now: float, block_seconds: int) -> Penalty:
+    """Return the penalty for a new block, escalated from ``previous``.
+
+    The block lasts ``block_seconds * factor ** (strikes - 1)``, capped at
+    ``ADS_THROTTLE_ESCALATION_MAX_SECONDS``. Strikes reset once the previous
+    penalty has decayed, ``ADS_THROTTLE_ESCALATION_DECAY_SECONDS`` after its
+    block ended.
+    """
+    factor = getattr(
+        settings, "ADS_THROTTLE_ESCALATION_FACTOR", DEFAULT_ESCALATION_FACTOR
+    )
+    cap = getattr(
+        settings, "ADS_THROTTLE_ESCALATION_MAX_SECONDS", DEFAULT_ESCALATION_MAX_SECONDS
+    )
+    decay_seconds = getattr(
+        settings,
+        "ADS_THROTTLE_ESCALATION_DECAY_SECONDS",
+        DEFAULT_ESCALATION_DECAY_SECONDS,
+    )
+    previous = unpack_penalty(previous)
+    strikes = 1
+    if previous is not None and previous.decay_until > now:
+        strikes = min(previous.strikes + 1, MAX_STRIKES)
+    duration = block_seconds
+    for _ in range(strikes - 1):
+        if duration >= cap:
+            break
+        duration *= factor
+    duration = max(min(duration, cap), block_seconds)
+    block_until = int(now) + int(duration)
+    return Penalty(strikes, block_until, block_until + decay_seconds)
+
+
+def penalty_values(
+    block_keys, previous: dict, now: float, block_seconds: int
+) -> tuple[dict, int]:
+    """Return ``(values, timeout)`` to write for newly tripped block keys.
+
+    Without escalation the values are plain ``True`` flags that expire after
+    ``block_seconds``. With it, each key holds its packed penalty and lives
+    until the penalty decays.
+    """
+    if not escalation_enabled():
+        return dict.fromkeys(block_keys, True), block_seconds
+    values = {}
+    timeout = block_seconds
+    for block_key in block_keys:
+        penalty = next_penalty(previous.get(block_key), now, block_seconds)
+        values[block_key] = pack_penalty(penalty)
+        timeout = max(timeout, int(penalty.decay_until - now))
+    return values, timeout
@@ -0,0 +1,132 @@
+import asyncio
+from collections.abc import Callable, Iterable
+from functools import lru_cache
+
+from asgiref.sync import (
+    async_to_sync,
+    iscoroutinefunction,
+    markcoroutinefunction,
+    sync_to_async,
+)
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import HttpRequest, HttpResponse
+from django.utils.module_loading import import_string
+
+from .throttling import (
+    IDENTITY_MODE_SESSION,
+    _identity_mode,
+    _user_overrides_exist,
+    should_show_ads,
+)
+
+
+@lru_cache(maxsize=8)
+def _scope_resolver(path: str) -> Callable[[HttpRequest], Iterable[str]]:
+    return import_string(path)
+
+
+def _prefetch_scopes(request: HttpRequest) -> list[str]:
+    """Return the scopes to decide up front; none unless configured.
+
+    A prefetched decision counts an impression whether or not the page renders
+    the scope, so only opted-in paths, or the scopes a resolver returns for
+    the request, are prefetched.
+    """
+    configured = getattr(settings, "ADS_THROTTLE_PREFETCH_SCOPES", None)
+    if isinstance(configured, str):
+        configured = _scope_resolver(configured)(request)
+    elif not request.path.startswith(
+        tuple(getattr(settings, "ADS_THROTTLE_PREFETCH_PATH_PREFIXES", ()))
+    ):
+        return []
+    elif configured is None:
+        return [request.path]
+    return list(dict.fromkeys(scope or request.path for scope in configured))
+
+
+def _uses_user() -> bool:
+    return bool(
+        _identity_mode() == IDENTITY_MODE_SESSION
+        or getattr(settings, "ADS_THROTTLE_EXEMPT_USER_ATTRIBUTES", ())
+        or getattr(settings, "ADS_THROTTLE_EXEMPT_GROUPS", ())
+        or _user_overrides_exist()
+    )
+
+
+def _resolve_identity(request: HttpRequest) -> None:
+    """Load the lazy user, and with it the session, on the request thread.
+
+    Sessions are not thread-safe; loading them from a prefetch thread while the
+    view writes to them could lose the view's changes.
+    """
+    user = getattr(request, "user", None)
+    if user is not None and _uses_user():
+        user.is_authenticated
+
+
+def _decide(request: HttpRequest, scope: str) -> bool:
+    try:
+        return should_show_ads(request, scope)
+    finally:
+        # Runs outside the request thread, so request_finished never closes it.
+        close_old_connections()
+
+
+class DecisionPrefetchMiddleware:
+    """Start ad decisions as soon as an async request arrives.
+
+    Under ASGI the decisions for ``ADS_THROTTLE_PREFETCH_SCOPES`` on paths under
+    ``ADS_THROTTLE_PREFETCH_PATH_PREFIXES`` (or for the scopes a resolver
+    returns) run in worker threads while the view executes; ``show_ads``,
+    the ``should_show_ads`` filter and the ``ads`` context processor then use
+    the finished result. The user and session are loaded before the decisions
+    start. Only GET requests are prefetched. Under WSGI the middleware passes
+    requests through unchanged.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        if request.method == "GET":
+            await sync_to_async(_resolve_identity)(request)
+            decide = sync_to_async(_decide, thread_sensitive=False)
+            request._ads_throttle_prefetch = {
+                scope: asyncio.ensure_future(decide(request, scope))
+                for scope in _prefetch_scopes(request)
+            }
+        return await self.get_response(request)
+
+
+async def _wait(task: asyncio.Future) -> bool:
+    return await task
+
+
+def prefetched_decision(request: HttpRequest | None, scope_value: str) -> bool | None:
+    """Return the prefetched decision for a scope, or ``None`` if there is none.
+
+    A prefetched scope is never decided twice: when the decision is still
+    running and cannot be awaited from the event loop thread, the fail-open
+    decision is returned instead.
+    """
+    task = getattr(request, "_ads_throttle_prefetch", {}).get(scope_value)
+    if task is None:
+        return None
+    if task.done():
+        return task.result()
+    try:
+        return async_to_sync(_wait)(task)
+    except RuntimeError:
+        # Called from the event loop thread itself; the task cannot be awaited.
+        return getattr(settings, "ADS_THROTTLE_FAIL_OPEN_DECISION", True)
@@ -0,0 +1,95 @@
+import time
+from collections.abc import Callable, Iterable
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .hashing import get_key_formats
+from .models import ScopeProfile
+
+
+class ProfileTable:
+    """Scope profiles compiled for lookups without cache or database access.
+
+    An exact profile wins; otherwise the longest matching prefix applies.
+    """
+
+    def __init__(self, profiles: Iterable[ScopeProfile] = ()):
+        self._exact: dict[str, dict[str, int]] = {}
+        self._prefixes: dict[str, dict[str, int]] = {}
+        for profile in profiles:
+            target = (
+                self._prefixes
+                if profile.match == ScopeProfile.MATCH_PREFIX
+                else self._exact
+            )
+            target[profile.scope] = profile.limits()
+        self._prefix_lengths = sorted(
+            {len(prefix) for prefix in self._prefixes}, reverse=True
+        )
+
+    def lookup(self, scope_value: str) -> dict[str, int]:
+        """Return the limits of the profile matching a scope (empty if none)."""
+        limits = self._exact.get(scope_value)
+        if limits is not None:
+            return limits
+        for length in self._prefix_lengths:
+            if length <= len(scope_value):
+                limits = self._prefixes.get(scope_value[:length])
+                if limits is not None:
+                    return limits
+        return {}
+
+    def apply(self, settings_values: dict[str, int], scope_value: str) -> dict:
+        """Return ``settings_values`` with the scope's profile applied."""
+        limits = self.lookup(scope_value)
+        return {**settings_values, **limits} if limits else settings_values
+
+
+EMPTY_TABLE = ProfileTable()
+
+# (version, table) of the last compiled table in this process.
+_compiled: tuple[object, ProfileTable] = (None, EMPTY_TABLE)
+
+
+def load_profile_table() -> ProfileTable:
+    return ProfileTable(ScopeProfile.objects.all())
+
+
+def bump_profile_version() -> int:
+    """Make every process recompile its profile table."""
+    version = time.time_ns()
+    cache.set(get_key_formats()["profile_version"], version, timeout=None)
+    return version
+
+
+def get_profile_table(
+    version, load: Callable[[], ProfileTable | None] = load_profile_table
+) -> ProfileTable:
+    """Return the compiled table for ``version``, loading it on first use.
+
+    ``version`` is the cached profile version read alongside the site settings.
+    When it is missing (never set or evicted), a new one is stored so that all
+    processes reload. If ``load`` fails, the previous table is kept.
+    """
+    global _compiled
+    if version is None:
+        key = get_key_formats()["profile_version"]
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    compiled_version, table = _compiled
+    if version is not None and version == compiled_version:
+        return table
+    loaded = load()
+    if loaded is None:
+        return table
+    _compiled = (version, loaded)
+    return loaded
+
+
+@receiver(post_save, sender=ScopeProfile)
+@receiver(post_delete, sender=ScopeProfile)
+def _invalidate_profiles(**kwargs) -> None:
+    transaction.on_commit(bump_profile_version)
@@ -0,0 +1,81 @@
+import ipaddress
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.http import HttpRequest
+
+IPAddress = ipaddress.IPv4Address | ipaddress.IPv6Address
+IPNetwork = ipaddress.IPv4Network | ipaddress.IPv6Network
+
+
+@lru_cache(maxsize=1)
+def trusted_networks() -> tuple[IPNetwork, ...]:
+    """Return ``ADS_THROTTLE_TRUSTED_PROXIES`` parsed into network objects."""
+    values = getattr(settings, "ADS_THROTTLE_TRUSTED_PROXIES", None) or ()
+    if isinstance(values, str):
+        values = [values]
+    try:
+        return tuple(
+            ipaddress.ip_network(value.strip(), strict=False) for value in values
+        )
+    except ValueError as error:
+        raise ImproperlyConfigured(
+            f"Invalid ADS_THROTTLE_TRUSTED_PROXIES entry: {error}"
+        ) from error
+
+
+@lru_cache(maxsize=4096)
+def _parse_ip(value: str) -> IPAddress | None:
+    try:
+        address = ipaddress.ip_address(value)
+    except ValueError:
+        return None
+    if address.version == 6 and address.ipv4_mapped:
+        return address.ipv4_mapped
+    return address
+
+
+@lru_cache(maxsize=1024)
+def is_trusted_proxy(value: str) -> bool:
+    address = _parse_ip(value)
+    return address is not None and any(
+        address in network for network in trusted_networks()
+    )
+
+
+def resolve_client_ip(request: HttpRequest, header_name: str = "") -> str:
+    """Return the client IP as seen by the outermost trusted proxy.
+
+    Forwarding headers are only read when ``REMOTE_ADDR`` is a trusted proxy.
+    The chain is then walked from the right, skipping trusted proxies; the first
+    other address is the client. Entries left of it are set by the client and
+    ignored, so spoofed headers cannot create new identities.
+    """
+    remote_addr = request.META.get("REMOTE_ADDR", "").strip()
+    if not is_trusted_proxy(remote_addr):
+        return remote_addr
+    forwarded = (
+        (header_name and request.META.get(f"HTTP_{header_name}"))
+        or request.META.get("HTTP_X_FORWARDED_FOR")
+        or request.META.get("HTTP_X_REAL_IP")
+        or ""
+    )
+    client = remote_addr
+    for hop in reversed(forwarded.split(",")):
+        address = _parse_ip(hop.strip())
+        if address is None:
+            break
+        client = str(address)
+        if not is_trusted_proxy(client):
+            break
+    return client
+
+
+@receiver(setting_changed)
+def _reset_trusted_networks(*, setting: str, **kwargs) -> None:
+    if setting == "ADS_THROTTLE_TRUSTED_PROXIES":
+        trusted_networks.cache_clear()
+        is_trusted_proxy.cache_clear()
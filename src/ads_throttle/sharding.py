@@ -0,0 +1,123 @@
+import bisect
+import hashlib
+from collections.abc import Mapping, Sequence
+from functools import lru_cache
+
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+# Points per alias on the ring; more points spread keys more evenly.
+RING_POINTS_PER_ALIAS = 160
+# Counter sub-keys end in a short shard index; hashes are at least 16 chars.
+MAX_SUB_KEY_DIGITS = 4
+
+
+def _ring_hash(value: str) -> int:
+    return int.from_bytes(
+        hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big"
+    )
+
+
+def routing_token(key: str) -> str:
+    """Return the part of a throttle key that picks its shard.
+
+    This is the last key segment (the viewer or IP hash), ignoring the suffixes
+    of hot-key markers and counter sub-keys, so that a counter, its block flag
+    and its sub-keys always share a shard.
+    """
+    parts = key.split(":")
+    while len(parts) > 1 and (
+        parts[-1] == "hot"
+        or (parts[-1].isdigit() and len(parts[-1]) <= MAX_SUB_KEY_DIGITS)
+    ):
+        parts.pop()
+    return parts[-1]
+
+
+class HashRing:
+    """Consistent-hash ring over cache aliases.
+
+    Adding an alias moves only the keys that now hash to it, about
+    ``1 / len(aliases)`` of them.
+    """
+
+    def __init__(self, aliases: Sequence[str]):
+        points = sorted(
+            (_ring_hash(f"{alias}#{index}"), alias)
+            for alias in aliases
+            for index in range(RING_POINTS_PER_ALIAS)
+        )
+        self._hashes = [point for point, _ in points]
+        self._aliases = [alias for _, alias in points]
+
+    def alias_for(self, key: str) -> str:
+        index = bisect.bisect(self._hashes, _ring_hash(routing_token(key)))
+        return self._aliases[index % len(self._aliases)]
+
+
+@lru_cache(maxsize=8)
+def get_ring(aliases: tuple[str, ...]) -> HashRing:
+    return HashRing(aliases)
+
+
+class ShardedCache:
+    """Spread throttle keys over several cache aliases.
+
+    Implements the part of the cache API the throttle uses. Batched calls make
+    one ``get_many``/``set_many`` per shard instead of one call per key.
+    """
+
+    def __init__(self, aliases: Sequence[str]):
+        self.aliases = tuple(aliases) or (DEFAULT_CACHE_ALIAS,)
+        self._ring = get_ring(self.aliases)
+
+    def shard_for(self, key: str) -> BaseCache:
+        return caches[self._ring.alias_for(key)]
+
+    def partition(self, keys: Sequence[str]) -> list[tuple[BaseCache, list[int]]]:
+        """Group key positions by shard, keeping the order within each shard."""
+        groups: dict[str, list[int]] = {}
+        for index, key in enumerate(keys):
+            groups.setdefault(self._ring.alias_for(key), []).append(index)
+        return [(caches[alias], indexes) for alias, indexes in groups.items()]
+
+    def get(self, key, default=None):
+        return self.shard_for(key).get(key, default)
+
+    def get_many(self, keys: Sequence[str]) -> dict:
+        keys = list(keys)
+        values = {}
+        for shard, indexes in self.partition(keys):
+            values.update(shard.get_many([keys[index] for index in indexes]))
+        return values
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT):
+        self.shard_for(key).set(key, value, timeout=timeout)
+
+    def set_many(self, data: Mapping, timeout=DEFAULT_TIMEOUT) -> list:
+        keys = list(data)
+        failed = []
+        for shard, indexes in self.partition(keys):
+            failed += shard.set_many(
+                {keys[index]: data[keys[index]] for index in indexes},
+                timeout=timeout,
+            )
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT):
+        return self.shard_for(key).add(key, value, timeout=timeout)
+
+    def incr(self, key, delta=1):
+        return self.shard_for(key).incr(key, delta)
+
+    def delete(self, key):
+        return self.shard_for(key).delete(key)
+
+    def delete_many(self, keys: Sequence[str]) -> None:
+        keys = list(keys)
+        for shard, indexes in self.partition(keys):
+            shard.delete_many([keys[index] for index in indexes])
+
+    def clear(self) -> None:
+        for alias in self.aliases:
+            caches[alias].clear()
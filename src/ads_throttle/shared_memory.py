@@ -0,0 +1,300 @@
+import hashlib
+import math
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from multiprocessing import resource_tracker, shared_memory
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.exceptions import ImproperlyConfigured
+
+DEFAULT_SEGMENT_NAME = "ads_throttle"
+DEFAULT_SLOTS = 65536
+DEFAULT_STRIPES = 64
+DEFAULT_PROBE_LENGTH = 16
+ATTACH_TIMEOUT_SECONDS = 1.0
+MAGIC = b"ATSHM001"
+# Magic, slot count, stripe count.
+HEADER = struct.Struct("<8sII")
+# Key digest (0 = empty), expires at (0 = never), value, last used.
+RECORD = struct.Struct("<Qdqd")
+
+_segments: dict[str, "_Segment"] = {}
+_segments_lock = threading.Lock()
+
+
+def _reset_after_fork() -> None:
+    global _segments_lock
+    _segments_lock = threading.Lock()
+    _segments.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _open_memory(name: str, create: bool, size: int) -> shared_memory.SharedMemory:
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name, create=create, size=size, track=False)
+    memory = shared_memory.SharedMemory(name, create=create, size=size)
+    # Otherwise the first worker to exit would unlink the segment for everyone.
+    resource_tracker.unregister(memory._name, "shared_memory")
+    return memory
+
+
+class _Segment:
+    """One process's attachment to a table plus its stripe locks."""
+
+    def __init__(self, name: str, slots: int, stripes: int, lock_path: str):
+        size = HEADER.size + RECORD.size * slots
+        try:
+            self.memory = _open_memory(name, create=True, size=size)
+        except FileExistsError:
+            self.memory = self._attach(name, size, slots, stripes)
+        else:
+            HEADER.pack_into(self.memory.buf, 0, MAGIC, slots, stripes)
+        self.layout = (slots, stripes)
+        self.lock_fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        # fcntl locks belong to the whole process, so threads take turns: a
+        # process waiting for one stripe while another of its threads holds a
+        # different one would look like a deadlock to the kernel (EDEADLK).
+        self.thread_lock = threading.Lock()
+
+    @staticmethod
+    def _attach(name: str, size: int, slots: int, stripes: int):
+        deadline = time.monotonic() + ATTACH_TIMEOUT_SECONDS
+        while True:
+            try:
+                memory = _open_memory(name, create=False, size=0)
+            except ValueError:
+                # The creator has not sized the segment yet.
+                memory = None
+            if memory is not None:
+                header = HEADER.unpack_from(memory.buf, 0)
+                if header == (MAGIC, slots, stripes) and memory.size >= size:
+                    return memory
+                if header[0] != bytes(len(MAGIC)):
+                    memory.close()
+                    raise ImproperlyConfigured(
+                        f"Shared memory segment {name!r} has a different layout; "
+                        "unlink it or use another LOCATION."
+                    )
+                memory.close()
+            if time.monotonic() > deadline:
+                raise ImproperlyConfigured(
+                    f"Shared memory segment {name!r} was never initialized."
+                )
+            time.sleep(0.001)
+
+
+class SharedMemoryCache(BaseCache):
+    """Integer-only cache kept in a shared memory segment on one host.
+
+    Meant to hold the throttle counters and block flags (see
+    ``ADS_THROTTLE_COUNTER_CACHE``): every worker process on the host attaches
+    to the same fixed-size open-addressing table, so counters are exact without
+    a network hop. Keys are stored as 64-bit digests and cannot be listed.
+    When every slot in a key's probe sequence is live, the least recently used
+    one is reused. Requires ``fcntl`` (POSIX).
+
+    ``LOCATION`` names the segment. ``OPTIONS`` accepts ``slots``, ``stripes``
+    (lock stripes; must divide ``slots``), ``probe_length`` and ``lock_file``.
+    """
+
+    def __init__(self, name: str, params: dict):
+        super().__init__(params)
+        if fcntl is None:
+            raise ImproperlyConfigured("SharedMemoryCache requires fcntl (POSIX).")
+        options = params.get("OPTIONS", {})
+        self._name = name or DEFAULT_SEGMENT_NAME
+        self._slots = int(options.get("slots", DEFAULT_SLOTS))
+        self._stripes = int(options.get("stripes", DEFAULT_STRIPES))
+        if self._slots < 1 or self._stripes < 1 or self._slots % self._stripes:
+            raise ImproperlyConfigured(
+                "SharedMemoryCache slots must be a positive multiple of stripes."
+            )
+        self._region = self._slots // self._stripes
+        self._probe_length = min(
+            int(options.get("probe_length", DEFAULT_PROBE_LENGTH)), self._region
+        )
+        self._lock_path = options.get("lock_file") or os.path.join(
+            tempfile.gettempdir(), f"{self._name}.lock"
+        )
+
+    def _segment(self) -> _Segment:
+        segment = _segments.get(self._name)
+        if segment is None:
+            with _segments_lock:
+                segment = _segments.get(self._name)
+                if segment is None:
+                    segment = _Segment(
+                        self._name, self._slots, self._stripes, self._lock_path
+                    )
+                    _segments[self._name] = segment
+        if segment.layout != (self._slots, self._stripes):
+            raise ImproperlyConfigured(
+                f"Shared memory segment {self._name!r} has a different layout; "
+                "unlink it or use another LOCATION."
+            )
+        return segment
+
+    @contextmanager
+    def _locked(self, stripe: int):
+        segment = self._segment()
+        with segment.thread_lock:
+            fcntl.lockf(segment.lock_fd, fcntl.LOCK_EX, 1, stripe)
+            try:
+                yield segment.memory.buf
+            finally:
+                fcntl.lockf(segment.lock_fd, fcntl.LOCK_UN, 1, stripe)
+
+    def _locate(self, key: str) -> tuple[int, int, list[int]]:
+        """Return the key digest, its lock stripe and its probe offsets."""
+        digest = int.from_bytes(
+            hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little"
+        )
+        digest = digest or 1
+        stripe = digest % self._stripes
+        start = digest // self._stripes
+        base = stripe * self._region
+        offsets = [
+            HEADER.size + RECORD.size * (base + (start + step) % self._region)
+            for step in range(self._probe_length)
+        ]
+        return digest, stripe, offsets
+
+    @staticmethod
+    def _find(buf, digest: int, offsets: list[int], now: float):
+        """Return ``(live offset or None, offset to write to)`` for ``digest``."""
+        free = None
+        oldest, oldest_used = offsets[0], math.inf
+        for offset in offsets:
+            slot_digest, expires, _, used = RECORD.unpack_from(buf, offset)
+            live = slot_digest and (not expires or expires > now)
+            if not live:
+                if free is None:
+                    free = offset
+            elif slot_digest == digest:
+                return offset, offset
+            elif used < oldest_used:
+                oldest, oldest_used = offset, used
+        return None, oldest if free is None else free
+
+    def _expiry(self, timeout) -> float:
+        expires = self.get_backend_timeout(timeout)
+        return 0.0 if expires is None else expires
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        value = int(value)
+        digest, stripe, offsets = self._locate(key)
+        now = time.time()
+        with self._locked(stripe) as buf:
+            found, slot = self._find(buf, digest, offsets, now)
+            if found is not None:
+                return False
+            RECORD.pack_into(buf, slot, digest, self._expiry(timeout), value, now)
+            return True
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        digest, stripe, offsets = self._locate(key)
+        now = time.time()
+        with self._locked(stripe) as buf:
+            found, _ = self._find(buf, digest, offsets, now)
+            if found is None:
+                return default
+            _, expires, value, _ = RECORD.unpack_from(buf, found)
+            RECORD.pack_into(buf, found, digest, expires, value, now)
+            return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        value = int(value)
+        digest, stripe, offsets = self._locate(key)
+        now = time.time()
+        with self._locked(stripe) as buf:
+            found, slot = self._find(buf, digest, offsets, now)
+            RECORD.pack_into(buf, slot, digest, self._expiry(timeout), value, now)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        digest, stripe, offsets = self._locate(key)
+        now = time.time()
+        with self._locked(stripe) as buf:
+            found, _ = self._find(buf, digest, offsets, now)
+            if found is None:
+                return False
+            _, _, value, _ = RECORD.unpack_from(buf, found)
+            RECORD.pack_into(buf, found, digest, self._expiry(timeout), value, now)
+            return True
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        digest, stripe, offsets = self._locate(key)
+        now = time.time()
+        with self._locked(stripe) as buf:
+            found, _ = self._find(buf, digest, offsets, now)
+            if found is None:
+                raise ValueError(f"Key '{key}' not found")
+            _, expires, value, _ = RECORD.unpack_from(buf, found)
+            value += delta
+            RECORD.pack_into(buf, found, digest, expires, value, now)
+            return value
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        digest, stripe, offsets = self._locate(key)
+        with self._locked(stripe) as buf:
+            found, _ = self._find(buf, digest, offsets, time.time())
+            if found is None:
+                return False
+            RECORD.pack_into(buf, found, 0, 0.0, 0, 0.0)
+            return True
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        digest, stripe, offsets = self._locate(key)
+        with self._locked(stripe) as buf:
+            return self._find(buf, digest, offsets, time.time())[0] is not None
+
+    def clear(self):
+        empty = bytes(RECORD.size * self._region)
+        for stripe in range(self._stripes):
+            start = HEADER.size + RECORD.size * self._region * stripe
+            with self._locked(stripe) as buf:
+                buf[start : start + len(empty)] = empty
+
+    def live_records(self) -> Iterator[float | None]:
+        """Yield the remaining TTL of every live record (``None``: no expiry)."""
+        now = time.time()
+        for stripe in range(self._stripes):
+            start = HEADER.size + RECORD.size * self._region * stripe
+            with self._locked(stripe) as buf:
+                records = [
+                    RECORD.unpack_from(buf, start + RECORD.size * index)
+                    for index in range(self._region)
+                ]
+            for digest, expires, _, _ in records:
+                if digest and (not expires or expires > now):
+                    yield expires - now if expires else None
+
+    def unlink(self) -> None:
+        """Remove the segment from the host; attached processes keep their copy."""
+        with _segments_lock:
+            segment = _segments.pop(self._name, None)
+        if segment is None:
+            segment = _Segment(self._name, self._slots, self._stripes, self._lock_path)
+        os.close(segment.lock_fd)
+        segment.memory.unlink()
+        segment.memory.close()
@@ -0,0 +1,264 @@
+import atexit
+import json
+import os
+import socket
+import threading
+import time
+from collections.abc import Iterator
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+DEFAULT_FILE_SINK_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_FILE_SINK_MAX_SECONDS = 3600
+DEFAULT_FILE_SINK_BUFFER_BYTES = 64 * 1024
+DEFAULT_FILE_SINK_FLUSH_SECONDS = 1.0
+
+ACTIVE_SUFFIX = ".part"
+CLOSED_SUFFIX = ".ndjson"
+
+
+class EventSink:
+    """Destination for throttle events recorded on the request path."""
+
+    def record(
+        self,
+        scope_value: str,
+        viewer_hash: str,
+        ip_address_hash: str,
+        blocked: bool,
+    ) -> None:
+        raise NotImplementedError
+
+    def flush(self) -> None:
+        """Persist buffered events, if the sink buffers them."""
+
+    def close(self) -> None:
+        """Flush and release resources held by the sink."""
+        self.flush()
+
+
+class FileEventSink(EventSink):
+    """Append compact NDJSON events to rotating per-process files.
+
+    Events are buffered in memory and written when the buffer reaches
+    ``buffer_bytes`` or ``flush_seconds`` have passed since the last write; a
+    timer flushes what an idle process still holds after ``flush_seconds``. The
+    active file is named ``events-<pid>-<started>.part`` and is renamed to
+    ``.ndjson`` once it exceeds ``max_bytes`` or ``max_seconds``, so loaders only
+    ever read complete files.
+    """
+
+    def __init__(
+        self,
+        directory: str | os.PathLike,
+        max_bytes: int = DEFAULT_FILE_SINK_MAX_BYTES,
+        max_seconds: float = DEFAULT_FILE_SINK_MAX_SECONDS,
+        buffer_bytes: int = DEFAULT_FILE_SINK_BUFFER_BYTES,
+        flush_seconds: float = DEFAULT_FILE_SINK_FLUSH_SECONDS,
+    ):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.buffer_bytes = buffer_bytes
+        self.flush_seconds = flush_seconds
+        self._lock = threading.Lock()
+        self._buffer: list[bytes] = []
+        self._buffered = 0
+        self._last_flush = time.monotonic()
+        self._pid = os.getpid()
+        self._file = None
+        self._path: Path | None = None
+        self._opened_at = 0.0
+        self._written = 0
+        self._timer: threading.Timer | None = None
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def record(
+        self,
+        scope_value: str,
+        viewer_hash: str,
+        ip_address_hash: str,
+        blocked: bool,
+    ) -> None:
+        line = json.dumps(
+            {
+                "s": scope_value,
+                "v": viewer_hash,
+                "i": ip_address_hash,
+                "b": int(blocked),
+                "t": round(time.time(), 3),
+            },
+            separators=(",", ":"),
+            ensure_ascii=False,
+        ).encode("utf-8")
+        with self._lock:
+            if os.getpid() != self._pid:
+                self._reset_after_fork()
+            self._buffer.append(line + b"\n")
+            self._buffered += len(line) + 1
+            if (
+                self._buffered >= self.buffer_bytes
+                or time.monotonic() - self._last_flush >= self.flush_seconds
+            ):
+                self._flush_locked()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.flush_seconds, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_locked()
+            self._rotate_locked()
+
+    def _flush_locked(self) -> None:
+        self._last_flush = time.monotonic()
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._file is not None and (
+            self._written >= self.max_bytes
+            or time.monotonic() - self._opened_at >= self.max_seconds
+            or not self._path.exists()
+        ):
+            self._rotate_locked()
+        if not self._buffer:
+            return
+        if self._file is None:
+            self._open_locked()
+        data = b"".join(self._buffer)
+        self._file.write(data)
+        self._file.flush()
+        self._written += len(data)
+        self._buffer.clear()
+        self._buffered = 0
+
+    def _open_locked(self) -> None:
+        started = time.time_ns()
+        self._path = self.directory / (
+            f"events-{socket.gethostname()}-{self._pid}-{started}{ACTIVE_SUFFIX}"
+        )
+        self._file = open(self._path, "ab")
+        self._opened_at = time.monotonic()
+        self._written = 0
+
+    def _rotate_locked(self) -> None:
+        if self._file is None:
+            return
+        self._file.close()
+        try:
+            self._path.rename(self._path.with_suffix(CLOSED_SUFFIX))
+        except FileNotFoundError:
+            pass  # Already claimed as stale by a loader.
+        self._file = None
+        self._path = None
+
+    def _reset_after_fork(self) -> None:
+        # The parent process owns the inherited buffer and file handle.
+        self._pid = os.getpid()
+        self._buffer = []
+        self._buffered = 0
+        self._file = None
+        self._path = None
+        self._timer = None
+
+
+def closed_event_files(
+    directory: str | os.PathLike, stale_seconds: float | None = None
+) -> list[Path]:
+    """Return rotated event files ready to be loaded, oldest first.
+
+    With ``stale_seconds``, active files not written for that long, or written
+    by a process that no longer runs on this host, are closed first.
+    """
+    if stale_seconds is not None:
+        for path in Path(directory).glob(f"*{ACTIVE_SUFFIX}"):
+            if _is_stale(path, stale_seconds):
+                try:
+                    path.rename(path.with_suffix(CLOSED_SUFFIX))
+                except FileNotFoundError:
+                    pass  # Rotated or claimed meanwhile.
+    return sorted(Path(directory).glob(f"*{CLOSED_SUFFIX}"))
+
+
+def _is_stale(path: Path, stale_seconds: float) -> bool:
+    try:
+        if time.time() - path.stat().st_mtime >= stale_seconds:
+            return True
+    except FileNotFoundError:
+        return False
+    parts = path.stem.rsplit("-", 2)
+    if len(parts) != 3 or not parts[1].isdigit():
+        return False
+    host = parts[0].removeprefix("events-")
+    return host == socket.gethostname() and not _pid_running(int(parts[1]))
+
+
+def _pid_running(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def read_event_file(path: Path) -> Iterator[dict]:
+    """Yield decoded events from an NDJSON file, skipping damaged lines."""
+    with open(path, "rb") as handle:
+        for line in handle:
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(event, dict) and {"s", "v", "t"} <= event.keys():
+                yield event
+
+
+_event_sink_lock = threading.Lock()
+
+
+@lru_cache(maxsize=1)
+def get_event_sink() -> EventSink | None:
+    """Return the configured event sink, or ``None`` for direct DB writes."""
+    # lru_cache does not serialize misses; concurrent first calls would each
+    # build and register a sink.
+    with _event_sink_lock:
+        return _build_event_sink()
+
+
+@lru_cache(maxsize=1)
+def _build_event_sink() -> EventSink | None:
+    sink_path = getattr(settings, "ADS_THROTTLE_EVENT_SINK", None)
+    if not sink_path:
+        return None
+    options = getattr(settings, "ADS_THROTTLE_EVENT_SINK_OPTIONS", {})
+    try:
+        sink = import_string(sink_path)(**options)
+    except (ImportError, TypeError) as exc:
+        raise ImproperlyConfigured(
+            f"Cannot build ADS_THROTTLE_EVENT_SINK {sink_path!r}: {exc}"
+        ) from exc
+    atexit.register(sink.close)
+    return sink
+
+
+@receiver(setting_changed)
+def _reset_event_sink(*, setting: str, **kwargs) -> None:
+    if setting in {"ADS_THROTTLE_EVENT_SINK", "ADS_THROTTLE_EVENT_SINK_OPTIONS"}:
+        sink = get_event_sink() if get_event_sink.cache_info().currsize else None
+        get_event_sink.cache_clear()
+        _build_event_sink.cache_clear()
+        if sink is not None:
+            sink.close()
@@ -0,0 +1,176 @@
+/*
+ * Fill ad slots after asking the decision endpoint, so the page itself stays
+ * identical for all viewers and can be cached.
+ *
+ *   <div data-ads-throttle-scope="/landing/">
+ *     <template><!-- ad markup --></template>
+ *   </div>
+ *   <script src="{% static 'ads_throttle/ads_throttle.js' %}"
+ *           data-url="{% url 'ads_throttle:decision' %}" defer></script>
+ *
+ * An empty scope means the current path. Slots stay empty when ads are
+ * throttled or the request fails.
+ *
+ * Beacon mode (ADS_THROTTLE_COUNT_MODE = "beacon"): add
+ * data-beacon-url="{% url 'ads_throttle:beacon' %}" to the script tag. Filled
+ * slots and server-rendered elements marked with data-ads-throttle-beacon are
+ * counted once, when at least half of the ad becomes visible.
+ */
+(function () {
+  "use strict";
+
+  // Scopes per decision request; matches MAX_SCOPES in views.py.
+  var MAX_SCOPES = 10;
+  var script = document.currentScript;
+  var url = script && script.dataset.url;
+  var beaconUrl = script && script.dataset.beaconUrl;
+  var pending = [];
+  var flushTimer = null;
+  var observer = null;
+
+  function flush() {
+    clearTimeout(flushTimer);
+    flushTimer = null;
+    if (!pending.length) {
+      return;
+    }
+    while (pending.length) {
+      send(pending.splice(0, MAX_SCOPES));
+    }
+  }
+
+  function send(scopes) {
+    var body = new URLSearchParams();
+    scopes.forEach(function (scope) {
+      body.append("scope", scope);
+    });
+    if (!(navigator.sendBeacon && navigator.sendBeacon(beaconUrl, body))) {
+      fetch(beaconUrl, {
+        method: "POST",
+        body: body,
+        credentials: "same-origin",
+        keepalive: true,
+      }).catch(function () {});
+    }
+  }
+
+  function count(scope) {
+    pending.push(scope);
+    if (!flushTimer) {
+      flushTimer = setTimeout(flush, 1000);
+    }
+  }
+
+  function watch(element, scope) {
+    if (!beaconUrl || element.dataset.adsThrottleCounted) {
+      return;
+    }
+    element.dataset.adsThrottleCounted = "pending";
+    element.dataset.adsThrottleBeaconScope = scope;
+    if (!observer) {
+      count(scope);
+      return;
+    }
+    observer.observe(element);
+  }
+
+  function scopeOf(slot) {
+    return slot.dataset.adsThrottleScope || window.location.pathname;
+  }
+
+  function fill(slot, show) {
+    var template = slot.querySelector("template");
+    if (show && template) {
+      slot.replaceChildren(document.importNode(template.content, true));
+      watch(slot, scopeOf(slot));
+    }
+    slot.dataset.adsThrottleDecision = show ? "show" : "hide";
+  }
+
+  function watchRendered() {
+    if (!beaconUrl) {
+      return;
+    }
+    if ("IntersectionObserver" in window) {
+      observer = new IntersectionObserver(
+        function (entries) {
+          entries.forEach(function (entry) {
+            if (entry.isIntersecting) {
+              observer.unobserve(entry.target);
+              entry.target.dataset.adsThrottleCounted = "sent";
+              count(entry.target.dataset.adsThrottleBeaconScope);
+            }
+          });
+        },
+        { threshold: 0.5 }
+      );
+    }
+    document.addEventListener("visibilitychange", function () {
+      if (document.visibilityState === "hidden") {
+        flush();
+      }
+    });
+    document
+      .querySelectorAll("[data-ads-throttle-beacon]")
+      .forEach(function (element) {
+        watch(
+          element,
+          element.dataset.adsThrottleBeacon || window.location.pathname
+        );
+      });
+  }
+
+  function run() {
+    watchRendered();
+    var slots = Array.prototype.slice.call(
+      document.querySelectorAll("[data-ads-throttle-scope]")
+    );
+    if (!url || !slots.length) {
+      return;
+    }
+    var scopes = [];
+    slots.forEach(function (slot) {
+      var scope = scopeOf(slot);
+      if (scopes.indexOf(scope) === -1) {
+        scopes.push(scope);
+      }
+    });
+    var requests = [];
+    for (var start = 0; start < scopes.length; start += MAX_SCOPES) {
+      requests.push(decide(scopes.slice(start, start + MAX_SCOPES)));
+    }
+    Promise.all(requests).then(function (results) {
+      var decisions = Object.assign.apply(null, [{}].concat(results));
+      slots.forEach(function (slot) {
+        fill(slot, decisions[scopeOf(slot)] === true);
+      });
+    });
+  }
+
+  function decide(scopes) {
+    var query = scopes
+      .map(function (scope) {
+        return "scope=" + encodeURIComponent(scope);
+      })
+      .join("&");
+    return fetch(url + "?" + query, {
+      credentials: "same-origin",
+      headers: { Accept: "application/json" },
+    })
+      .then(function (response) {
+        return response.ok ? response.json() : { decisions: {} };
+      })
+      .catch(function () {
+        return { decisions: {} };
+      })
+      .then(function (data) {
+        return data.decisions || {};
+      });
+  }
+
+  if (document.readyState === "loading") {
+    document.addEventListener("DOMContentLoaded", run);
+  } else {
+    run();
+  }
+})();
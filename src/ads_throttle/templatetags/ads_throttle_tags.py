@@ -4,6 +4,7 @@ from typing import cast
 from django import template
 from django.http import HttpRequest
 
+from ads_throttle.prefetch import prefetched_decision
 from ads_throttle.throttling import should_show_ads
 
 register = template.Library()
@@ -21,7 +22,9 @@ def _should_show_ads_cached(
         setattr(request, "_ads_throttle_cache", cache)
     if scope_value in cache:
         return cache[scope_value]
-    decision = should_show_ads(request, scope)
+    decision = prefetched_decision(request, scope_value)
+    if decision is None:
+        decision = should_show_ads(request, scope)
     cache[scope_value] = decision
     return decision
 
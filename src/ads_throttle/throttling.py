@@ -1,34 +1,153 @@
 import hashlib
+import logging
+import math
+import time
+from collections.abc import Callable
+from typing import TypeVar
 
 from django.conf import settings
 from django.contrib.auth.models import AbstractBaseUser, AnonymousUser
-from django.core.cache import cache
-from django.db import models
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.db import DatabaseError, models
 from django.db.models import Case, IntegerField, Max, Q, QuerySet, When
 from django.http import HttpRequest
 from django.utils import timezone
 
-from .models import AdsThrottleEvent, AdsThrottleOverride, SiteSetting
+from .breaker import get_breaker
+from .classifiers import (
+    ACTION_COUNT,
+    ACTION_HIDE,
+    ACTION_SHOW,
+    ACTION_UNCOUNTED,
+    get_request_action,
+)
+from .counters import hot_key_marker, incr_many, is_sampled, promote_hot_keys
+from .hashing import get_key_formats, hash_scope, hash_viewer
+from .middleware import has_block_token, remember_block, viewer_cookie_id
+from .models import (
+    AdsThrottleCompactEvent,
+    AdsThrottleCompactOverride,
+    AdsThrottleEvent,
+    AdsThrottleOverride,
+    SiteSetting,
+    hex_to_digest,
+    scope_digest,
+)
+from .overrides import fingerprint_viewer_id
+from .penalties import (
+    escalation_enabled,
+    is_blocking,
+    penalty_values,
+    unpack_penalty,
+)
+from .profiles import ProfileTable, get_profile_table, load_profile_table
+from .proxies import resolve_client_ip, trusted_networks
+from .sharding import ShardedCache
+from .sinks import get_event_sink
 
 DEFAULT_VIEW_REPEAT_WINDOW_SECONDS = 600
 DEFAULT_VIEW_REPEAT_THRESHOLD = 20
 DEFAULT_BLOCK_SECONDS = 3600
+DEFAULT_IP_REPEAT_THRESHOLD = 0
+DEFAULT_SITE_IP_REPEAT_THRESHOLD = 0
 DEFAULT_SETTINGS_CACHE_SECONDS = 300
 DEFAULT_EVENT_RECORD_SECONDS = 60
+DEFAULT_COUNTER_SHARDS = 0
+DEFAULT_HOT_KEY_THRESHOLD = 100
+DEFAULT_HOT_KEY_FRACTION = 0.5
+DEFAULT_SAMPLE_BUCKET_SECONDS = 1
+SETTINGS_CACHE_KEY = "ads_throttle:settings"
+
+COUNT_MODE_DECISION = "decision"
+COUNT_MODE_BEACON = "beacon"
+
+IDENTITY_MODE_SESSION = "session"
+IDENTITY_MODE_COOKIE = "cookie"
+IDENTITY_MODE_SIGNED_COOKIE = "signed_cookie"
+ANONYMOUS_VIEWER_ID = "anonymous"
 
 UserIdentity = AbstractBaseUser | AnonymousUser
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+
+def _call_db(func: Callable[..., T], *args, **kwargs) -> T | None:
+    """Run a database call behind the ``db`` circuit breaker.
+
+    Returns ``None`` when the breaker is open or the call fails.
+    """
+    breaker = get_breaker("db")
+    if not breaker.allow():
+        return None
+    started = time.monotonic()
+    try:
+        result = func(*args, **kwargs)
+    except DatabaseError:
+        breaker.record_failure()
+        logger.warning("ads_throttle database call failed", exc_info=True)
+        return None
+    breaker.record_success(time.monotonic() - started)
+    return result
+
+
+def _counter_cache():
+    """Return the cache holding counters, block flags and hot-key markers.
+
+    A list of aliases spreads the keys over them with consistent hashing.
+    """
+    alias = getattr(settings, "ADS_THROTTLE_COUNTER_CACHE", DEFAULT_CACHE_ALIAS)
+    if isinstance(alias, (list, tuple)):
+        return ShardedCache(alias)
+    return caches[alias]
+
+
+class _TimedCache:
+    """Proxy to a counter cache that adds up the time spent in its calls.
+
+    The ``cache`` breaker is charged with this time only, so slow override
+    queries or event writes do not open it.
+    """
+
+    def __init__(self, backend):
+        self._backend = backend
+        self.elapsed = 0.0
+
+    def __getattr__(self, name):
+        attr = getattr(self._backend, name)
+        if not callable(attr):
+            return attr
 
+        def timed(*args, **kwargs):
+            started = time.monotonic()
+            try:
+                return attr(*args, **kwargs)
+            finally:
+                self.elapsed += time.monotonic() - started
 
-def _get_settings_values() -> dict[str, int]:
-    """Return throttle configuration values merged from cache and defaults."""
-    cache_key = "ads_throttle:settings"
+        return timed
+
+
+def _compact_schema() -> bool:
+    return getattr(settings, "ADS_THROTTLE_COMPACT_SCHEMA", False)
+
+
+def _over_budget(deadline: float | None) -> bool:
+    return deadline is not None and time.monotonic() > deadline
+
+
+def _settings_and_profiles() -> tuple[dict[str, int], ProfileTable]:
+    """Return the global throttle configuration and the compiled scope profiles.
+
+    The settings and the profile version are read with one cache call; the
+    profile table itself lives in process memory until the version changes.
+    """
+    cache_key = SETTINGS_CACHE_KEY
+    version_key = get_key_formats()["profile_version"]
     cache_ttl = getattr(
         settings, "ADS_THROTTLE_SETTINGS_CACHE_SECONDS", DEFAULT_SETTINGS_CACHE_SECONDS
     )
-    stored = SiteSetting.get_cached(cache, cache_key, cache_ttl)
-    if stored:
-        return stored
-    return {
+    defaults = {
         "view_repeat_window_seconds": getattr(
             settings,
             "ADS_VIEW_REPEAT_WINDOW_SECONDS",
@@ -38,16 +157,58 @@ def _get_settings_values() -> dict[str, int]:
             settings, "ADS_VIEW_REPEAT_THRESHOLD", DEFAULT_VIEW_REPEAT_THRESHOLD
         ),
         "block_seconds": getattr(settings, "ADS_BLOCK_SECONDS", DEFAULT_BLOCK_SECONDS),
+        "ip_repeat_threshold": getattr(
+            settings, "ADS_IP_REPEAT_THRESHOLD", DEFAULT_IP_REPEAT_THRESHOLD
+        ),
+        "site_ip_repeat_threshold": getattr(
+            settings, "ADS_SITE_IP_REPEAT_THRESHOLD", DEFAULT_SITE_IP_REPEAT_THRESHOLD
+        ),
         "event_record_seconds": getattr(
             settings,
             "ADS_THROTTLE_EVENT_RECORD_SECONDS",
             DEFAULT_EVENT_RECORD_SECONDS,
         ),
     }
+    cached = cache.get_many([cache_key, version_key])
+    stored = cached.get(cache_key) or SiteSetting.get_cached(
+        cache, cache_key, cache_ttl
+    )
+    profiles = get_profile_table(
+        cached.get(version_key), lambda: _call_db(load_profile_table)
+    )
+    if stored:
+        return {**defaults, **stored}, profiles
+    return defaults, profiles
+
+
+def _get_settings_values(scope_value: str | None = None) -> dict[str, int]:
+    """Return throttle configuration values merged from cache and defaults.
+
+    With ``scope_value``, the matching scope profile is applied on top.
+    """
+    settings_values, profiles = _settings_and_profiles()
+    if scope_value is None:
+        return settings_values
+    return profiles.apply(settings_values, scope_value)
+
+
+def _identity_mode() -> str:
+    return getattr(settings, "ADS_THROTTLE_IDENTITY_MODE", IDENTITY_MODE_SESSION)
 
 
 def _viewer_id(request: HttpRequest) -> str:
-    """Build a stable identifier for the current viewer."""
+    """Build a stable identifier for the current viewer.
+
+    The cookie identity modes never touch ``request.user`` or the session, so
+    neither is loaded just to decide about ads.
+    """
+    mode = _identity_mode()
+    if mode == IDENTITY_MODE_COOKIE:
+        session_key = request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+        return f"session:{session_key}" if session_key else ANONYMOUS_VIEWER_ID
+    if mode == IDENTITY_MODE_SIGNED_COOKIE:
+        viewer = viewer_cookie_id(request)
+        return f"viewer:{viewer}" if viewer else ANONYMOUS_VIEWER_ID
     user = request.user
     session_key = request.session.session_key
     if not session_key:
@@ -56,7 +217,7 @@ def _viewer_id(request: HttpRequest) -> str:
         return f"user:{user.pk}"
     if session_key:
         return f"session:{session_key}"
-    return "anonymous"
+    return ANONYMOUS_VIEWER_ID
 
 
 def _viewer_fingerprint(request: HttpRequest) -> str:
@@ -71,6 +232,8 @@ def _get_client_ip(request: HttpRequest) -> str:
     """Determine the client IP address using trusted headers when present."""
     header_name = getattr(settings, "ADS_THROTTLE_IP_HEADER", "")
     header_name = header_name.strip().upper().replace("-", "_")
+    if trusted_networks():
+        return resolve_client_ip(request, header_name)
     if header_name:
         custom_ip = request.META.get(f"HTTP_{header_name}")
         if custom_ip:
@@ -88,6 +251,7 @@ def _hash_ip(ip_address: str) -> str:
     """Return a deterministic hash of the IP address for privacy."""
     if not ip_address:
         return ""
+    # Always SHA-256: IP hashes are stored in overrides entered through the admin.
     return hashlib.sha256(ip_address.strip().encode("utf-8")).hexdigest()
 
 
@@ -96,48 +260,141 @@ def _find_override(
     viewer_id: str,
     ip_address_hash: str,
     scope_value: str,
-) -> QuerySet[AdsThrottleOverride] | None:
+    viewer_hash: str = "",
+) -> QuerySet | None:
     """Find throttle overrides that match the supplied identifiers."""
-    scope_filter = Q(scope__isnull=True) | Q(scope="") | Q(scope=scope_value)
-    identifier_filter = Q(user__isnull=True, viewer_id="", ip_address_hash="")
+    if _compact_schema():
+        model = AdsThrottleCompactOverride
+        scope_filter = Q(scope_hash__in=[scope_digest(""), scope_digest(scope_value)])
+        identifier_filter = Q(user__isnull=True, viewer_id="", ip_address_digest=b"")
+        ip_filter = Q(ip_address_digest=hex_to_digest(ip_address_hash))
+    else:
+        model = AdsThrottleOverride
+        scope_filter = Q(scope__isnull=True) | Q(scope="") | Q(scope=scope_value)
+        identifier_filter = Q(user__isnull=True, viewer_id="", ip_address_hash="")
+        ip_filter = Q(ip_address_hash=ip_address_hash)
     if user and user.is_authenticated:
         identifier_filter |= Q(user=user)
-    if viewer_id:
-        identifier_filter |= Q(viewer_id=viewer_id)
+    viewer_ids = {viewer_id} if viewer_id else set()
+    if viewer_hash:
+        viewer_ids.add(fingerprint_viewer_id(viewer_hash))
+    if user and user.is_authenticated:
+        viewer_ids.add(f"user:{user.pk}")
+    if viewer_ids:
+        identifier_filter |= Q(viewer_id__in=sorted(viewer_ids))
     if ip_address_hash:
-        identifier_filter |= Q(ip_address_hash=ip_address_hash)
+        identifier_filter |= ip_filter
     if not identifier_filter:
         return None
     now = timezone.now()
-    return AdsThrottleOverride.objects.filter(
+    return model.objects.filter(
         scope_filter,
         identifier_filter,
         Q(expires_at__isnull=True) | Q(expires_at__gt=now),
     )
 
 
+def _user_overrides_exist() -> bool:
+    """Return whether any active override targets users, cached per generation."""
+    key_formats = get_key_formats()
+    flag_key = key_formats["user_overrides"]
+    generation_key = key_formats["override_generation"]
+    cached_values = cache.get_many([flag_key, generation_key])
+    generation = cached_values.get(generation_key)
+    cached = cached_values.get(flag_key)
+    if isinstance(cached, tuple) and cached[0] == generation:
+        return cached[1]
+    model = AdsThrottleCompactOverride if _compact_schema() else AdsThrottleOverride
+    exists = _call_db(
+        model.objects.filter(
+            Q(user__isnull=False) | Q(viewer_id__startswith="user:"),
+            Q(expires_at__isnull=True) | Q(expires_at__gt=timezone.now()),
+        ).exists
+    )
+    if exists is None:
+        return False
+    cache.set(
+        flag_key,
+        (generation, exists),
+        timeout=getattr(settings, "ADS_THROTTLE_OVERRIDE_CACHE_SECONDS", 60),
+    )
+    return exists
+
+
+def _override_user(request: HttpRequest) -> UserIdentity | None:
+    """Return the user to match overrides against.
+
+    In the cookie identity modes the user is only loaded while some override
+    targets users.
+    """
+    if _identity_mode() == IDENTITY_MODE_SESSION:
+        return request.user
+    if not _user_overrides_exist():
+        return None
+    return getattr(request, "user", None)
+
+
+def _override_cache_key(
+    user_id, viewer_id: str, ip_address_hash: str, scope_value: str, viewer_hash: str
+) -> str:
+    key_formats = get_key_formats()
+    if viewer_hash:
+        # The viewer hash already covers the viewer id and IP address.
+        return key_formats["viewer_override"].format(
+            scope=hash_scope(scope_value), viewer=viewer_hash, user_id=user_id
+        )
+    return key_formats["override"].format(
+        scope=hash_scope(scope_value),
+        viewer_id=viewer_id,
+        user_id=user_id,
+        ip=ip_address_hash,
+    )
+
+
+def _cached_override(cached, generation) -> tuple[bool, str | None]:
+    """Return ``(hit, decision)`` for a cached override decision."""
+    if isinstance(cached, tuple) and cached[0] == generation:
+        return True, None if cached[1] == "none" else cached[1]
+    # Plain strings were cached before generations existed.
+    if isinstance(cached, str) and generation is None:
+        return True, None if cached == "none" else cached
+    return False, None
+
+
 def _get_override_decision(
     user: UserIdentity | None,
     viewer_id: str,
     ip_address_hash: str,
     scope_value: str,
+    viewer_hash: str = "",
 ) -> str | None:
-    """Resolve an explicit override decision for a viewer."""
-    if not (viewer_id or ip_address_hash or (user and user.is_authenticated)):
+    """Resolve an explicit override decision for a viewer.
+
+    Cached decisions carry the override generation they were computed under,
+    so bumping the generation after an override change invalidates them all.
+    """
+    if not (
+        viewer_id or viewer_hash or ip_address_hash or (user and user.is_authenticated)
+    ):
         return None
-    scope_hash = hashlib.sha256(scope_value.encode("utf-8")).hexdigest()
     user_id = user.pk if user and user.is_authenticated else ""
-    cache_key = (
-        f"ads_throttle:override:{scope_hash}:{viewer_id}:{user_id}:{ip_address_hash}"
+    cache_key = _override_cache_key(
+        user_id, viewer_id, ip_address_hash, scope_value, viewer_hash
     )
+    generation_key = get_key_formats()["override_generation"]
     cache_ttl = getattr(settings, "ADS_THROTTLE_OVERRIDE_CACHE_SECONDS", 60)
-    cached = cache.get(cache_key)
-    if cached:
-        return None if cached == "none" else cached
-    override_qs = _find_override(user, viewer_id, ip_address_hash, scope_value)
+    cached_values = cache.get_many([cache_key, generation_key])
+    generation = cached_values.get(generation_key)
+    hit, decision = _cached_override(cached_values.get(cache_key), generation)
+    if hit:
+        return decision
+    override_qs = _find_override(
+        user, viewer_id, ip_address_hash, scope_value, viewer_hash
+    )
     if override_qs is None:
         return None
-    flags = override_qs.aggregate(
+    flags = _call_db(
+        override_qs.aggregate,
         force_block=Max(
             Case(When(force_block=True, then=1), default=0, output_field=IntegerField())
         ),
@@ -145,12 +402,14 @@ def _get_override_decision(
             Case(When(force_show=True, then=1), default=0, output_field=IntegerField())
         ),
     )
+    if flags is None:
+        return None
     decision = None
     if flags["force_block"]:
         decision = "block"
     elif flags["force_show"]:
         decision = "show"
-    cache.set(cache_key, decision or "none", timeout=cache_ttl)
+    cache.set(cache_key, (generation, decision or "none"), timeout=cache_ttl)
     return decision
 
 
@@ -162,15 +421,30 @@ def _record_event(
 ) -> None:
     """Upsert a throttle event record for analytics and auditing."""
     now = timezone.now()
-    event, created = AdsThrottleEvent.objects.get_or_create(
-        scope=scope_value,
-        viewer_hash=viewer_hash,
+    if _compact_schema():
+        model = AdsThrottleCompactEvent
+        lookup = {
+            "scope_hash": scope_digest(scope_value),
+            "viewer_digest": hex_to_digest(viewer_hash),
+        }
+        ip_field = "ip_address_digest"
+        ip_value = hex_to_digest(ip_address_hash)
+        extra = {"scope": scope_value}
+    else:
+        model = AdsThrottleEvent
+        lookup = {"scope": scope_value, "viewer_hash": viewer_hash}
+        ip_field = "ip_address_hash"
+        ip_value = ip_address_hash
+        extra = {}
+    event, created = model.objects.get_or_create(
+        **lookup,
         defaults={
             "first_seen": now,
             "last_seen": now,
             "count": 1,
             "blocked": blocked,
-            "ip_address_hash": ip_address_hash,
+            ip_field: ip_value,
+            **extra,
         },
     )
     if created:
@@ -178,9 +452,9 @@ def _record_event(
     update_fields = {"last_seen": now, "count": models.F("count") + 1}
     if blocked:
         update_fields["blocked"] = True
-    if ip_address_hash and not event.ip_address_hash:
-        update_fields["ip_address_hash"] = ip_address_hash
-    AdsThrottleEvent.objects.filter(pk=event.pk).update(**update_fields)
+    if ip_value and not getattr(event, ip_field):
+        update_fields[ip_field] = ip_value
+    model.objects.filter(pk=event.pk).update(**update_fields)
 
 
 def _should_record_event(
@@ -190,68 +464,442 @@ def _should_record_event(
     record_seconds: int,
 ) -> bool:
     """Rate-limit event recording for a viewer and scope."""
-    cache_key = f"ads_throttle:event:{scope_hash}:{viewer_hash}:{int(blocked)}"
+    cache_key = get_key_formats()["event"].format(
+        scope=scope_hash, viewer=viewer_hash, blocked=int(blocked)
+    )
     return cache.add(cache_key, True, timeout=record_seconds)
 
 
+def _record_blocked_event(
+    scope_value: str,
+    scope_hash: str,
+    viewer_hash: str,
+    ip_address_hash: str,
+    settings_values: dict[str, int],
+) -> None:
+    """Record a blocked impression unless one was recorded recently."""
+    if _should_record_event(
+        scope_hash,
+        viewer_hash,
+        True,
+        settings_values["event_record_seconds"],
+    ):
+        sink = get_event_sink()
+        if sink is not None:
+            try:
+                sink.record(scope_value, viewer_hash, ip_address_hash, True)
+            except Exception:
+                # Sinks are pluggable; losing an event must never change the
+                # decision or count against the cache breaker.
+                logger.warning("ads_throttle event sink failed", exc_info=True)
+            return
+        _call_db(_record_event, scope_value, viewer_hash, ip_address_hash, True)
+
+
+def _sample_rate(scope_value: str) -> int:
+    """Return N for scopes counted in 1-in-N sampled mode, otherwise 1."""
+    rates = getattr(settings, "ADS_THROTTLE_SAMPLED_SCOPES", {})
+    return max(int(rates.get(scope_value, 1)), 1)
+
+
+def _sample_amount(scope_value: str, viewer_hash: str) -> int:
+    """Return the counter increment for an impression; ``0`` skips counting.
+
+    A sampled impression stands for ``N`` impressions, which scales every
+    threshold by 1/N while aggregate counters stay in impressions.
+    """
+    sample_rate = _sample_rate(scope_value)
+    if sample_rate > 1 and not is_sampled(
+        viewer_hash,
+        sample_rate,
+        getattr(
+            settings,
+            "ADS_THROTTLE_SAMPLE_BUCKET_SECONDS",
+            DEFAULT_SAMPLE_BUCKET_SECONDS,
+        ),
+    ):
+        return 0
+    return sample_rate
+
+
+def _shard_count() -> int:
+    return getattr(settings, "ADS_THROTTLE_COUNTER_SHARDS", DEFAULT_COUNTER_SHARDS)
+
+
+def _count_mode() -> str:
+    return getattr(settings, "ADS_THROTTLE_COUNT_MODE", COUNT_MODE_DECISION)
+
+
+def _increment_levels(
+    counters,
+    impressions: list[tuple[list[tuple[str, str, int]], int]],
+    shards: dict[str, int],
+    window: int,
+    shard_count: int,
+    shared: set[str],
+) -> list[list[str]]:
+    """Count ``(levels, amount)`` impressions; return tripped block keys for each.
+
+    Impressions with the same amount share one ``incr_many`` batch. Only the
+    ``shared`` counters can be promoted to sharded mode.
+    """
+    by_amount: dict[int, list[int]] = {}
+    for index, (_, amount) in enumerate(impressions):
+        by_amount.setdefault(amount, []).append(index)
+    tripped: list[list[str]] = [[] for _ in impressions]
+    latest: dict[str, int] = {}
+    hot_thresholds: dict[str, int] = {}
+    for amount, indexes in by_amount.items():
+        count_keys = [
+            count_key for index in indexes for count_key, _, _ in impressions[index][0]
+        ]
+        counts = iter(
+            incr_many(counters, count_keys, window, shards=shards, amount=amount)
+        )
+        for index in indexes:
+            for count_key, block_key, threshold in impressions[index][0]:
+                count = next(counts)
+                if count_key in shared:
+                    latest[count_key] = max(count, latest.get(count_key, 0))
+                    hot_thresholds[count_key] = _hot_key_threshold(threshold)
+                if count > threshold:
+                    tripped[index].append(block_key)
+    if shard_count > 1:
+        promote_hot_keys(counters, latest, shards, shard_count, hot_thresholds, window)
+    return tripped
+
+
+def _remaining_block_seconds(state: dict, block_keys: list[str], now: float) -> int:
+    """Return how long the penalties stored at ``block_keys`` keep blocking.
+
+    Plain block flags carry no end time and give ``0``, so no token outlives
+    the block it stands for.
+    """
+    remaining = 0
+    for block_key in block_keys:
+        penalty = unpack_penalty(state.get(block_key))
+        if penalty is not None:
+            remaining = max(remaining, int(penalty.block_until - now))
+    return remaining
+
+
+def _shared_count_keys(levels: list[tuple[str, str, int]], viewer_id: str) -> list[str]:
+    """Return the count keys that many clients share and may turn hot.
+
+    IP and site-wide counters are shared by everyone behind an address, and so
+    is the viewer counter of visitors without a session or viewer cookie.
+    Counters of identified viewers are never sharded.
+    """
+    if viewer_id != ANONYMOUS_VIEWER_ID:
+        levels = levels[1:]
+    return [count_key for count_key, _, _ in levels]
+
+
+def _hot_key_threshold(level_threshold: int) -> int:
+    """Return the count that marks a counter hot.
+
+    A counter blocks once it passes its level threshold and is not incremented
+    further, so it must turn hot below that: at ``ADS_THROTTLE_HOT_KEY_FRACTION``
+    of the level threshold, capped by ``ADS_THROTTLE_HOT_KEY_THRESHOLD``.
+    """
+    fraction = getattr(
+        settings, "ADS_THROTTLE_HOT_KEY_FRACTION", DEFAULT_HOT_KEY_FRACTION
+    )
+    cap = getattr(settings, "ADS_THROTTLE_HOT_KEY_THRESHOLD", DEFAULT_HOT_KEY_THRESHOLD)
+    return max(min(cap, math.ceil(level_threshold * fraction)), 1)
+
+
+def _counter_keys(
+    scope_hash: str,
+    viewer_hash: str,
+    ip_address_hash: str,
+    settings_values: dict[str, int],
+) -> list[tuple[str, str, int]]:
+    """Return ``(count_key, block_key, threshold)`` for every enabled level."""
+    formats = get_key_formats()
+    values = {"scope": scope_hash, "viewer": viewer_hash, "ip": ip_address_hash}
+    levels = [
+        (
+            formats["views"].format(**values),
+            formats["block"].format(**values),
+            settings_values["view_repeat_threshold"],
+        )
+    ]
+    if not ip_address_hash:
+        return levels
+    if settings_values["ip_repeat_threshold"]:
+        levels.append(
+            (
+                formats["ip_views"].format(**values),
+                formats["ip_block"].format(**values),
+                settings_values["ip_repeat_threshold"],
+            )
+        )
+    if settings_values["site_ip_repeat_threshold"]:
+        levels.append(
+            (
+                formats["site_views"].format(**values),
+                formats["site_block"].format(**values),
+                settings_values["site_ip_repeat_threshold"],
+            )
+        )
+    return levels
+
+
 def should_show_ads(request: HttpRequest | None, scope: str | None = None) -> bool:
-    """Return whether ads should be shown for the current request."""
+    """Return whether ads should be shown for the current request.
+
+    Cache failures never propagate: the decision falls back to
+    ``ADS_THROTTLE_FAIL_OPEN_DECISION`` and the ``cache`` circuit breaker skips
+    the cache entirely after repeated failures or slow decisions.
+    """
     if not request:
         return True
+    timings = getattr(request, "_ads_throttle_timings", None)
+    if timings is None:
+        return _guarded_should_show_ads(request, scope)
+    started = time.perf_counter_ns()
+    try:
+        return _guarded_should_show_ads(request, scope)
+    finally:
+        timings.append((scope or request.path, time.perf_counter_ns() - started))
+
+
+def _guarded_should_show_ads(request: HttpRequest, scope: str | None) -> bool:
+    """Run ``_should_show_ads`` behind the breaker and latency budget.
+
+    Requests that a classifier decides never reach the cache, so they neither
+    depend on the breaker nor act as its half-open probe.
+    """
+    fail_open = getattr(settings, "ADS_THROTTLE_FAIL_OPEN_DECISION", True)
+    try:
+        action = get_request_action(request)
+    except Exception:
+        logger.warning("ads_throttle request classification failed", exc_info=True)
+        return fail_open
+    if action == ACTION_SHOW:
+        return True
+    if action == ACTION_HIDE:
+        return False
+    breaker = get_breaker("cache")
+    if not breaker.allow():
+        return fail_open
+    budget = getattr(settings, "ADS_THROTTLE_LATENCY_BUDGET_SECONDS", None)
+    deadline = time.monotonic() + budget if budget else None
+    counters = _TimedCache(_counter_cache())
+    try:
+        decision = _should_show_ads(
+            request,
+            scope,
+            deadline,
+            counted=action != ACTION_UNCOUNTED,
+            counters=counters,
+        )
+    except Exception:
+        breaker.record_failure()
+        logger.warning("ads_throttle decision failed", exc_info=True)
+        return fail_open
+    if decision is None:
+        breaker.record_failure()
+        return fail_open
+    breaker.record_success(counters.elapsed)
+    return decision
+
+
+def _should_show_ads(
+    request: HttpRequest,
+    scope: str | None,
+    deadline: float | None,
+    counted: bool = True,
+    counters=None,
+) -> bool | None:
+    """Compute the decision for a classified request.
+
+    ``None`` means the latency budget ran out.
+    """
+    if counters is None:
+        counters = _counter_cache()
     scope_value = scope or request.path
+    scope_hash = hash_scope(scope_value)
     viewer_fingerprint = _viewer_fingerprint(request)
-    viewer_hash = hashlib.sha256(viewer_fingerprint.encode("utf-8")).hexdigest()
-    scope_hash = hashlib.sha256(scope_value.encode("utf-8")).hexdigest()
+    viewer_hash = hash_viewer(viewer_fingerprint)
 
     viewer_id = _viewer_id(request)
     ip_address_hash = _hash_ip(_get_client_ip(request))
-    settings_values = _get_settings_values()
     override_decision = _get_override_decision(
-        request.user,
+        _override_user(request),
         viewer_id,
         ip_address_hash,
         scope_value,
+        viewer_hash,
     )
-    if override_decision == "block":
-        if _should_record_event(
-            scope_hash,
-            viewer_hash,
-            True,
-            settings_values["event_record_seconds"],
-        ):
-            _record_event(scope_value, viewer_hash, ip_address_hash, True)
-        return False
     if override_decision == "show":
         return True
+    # Checked after overrides so that an admin show override lifts the block.
+    if has_block_token(request, scope_hash):
+        return False
+    settings_values = _get_settings_values(scope_value)
+    if override_decision == "block":
+        if counted and not _over_budget(deadline):
+            _record_blocked_event(
+                scope_value, scope_hash, viewer_hash, ip_address_hash, settings_values
+            )
+        return False
+    if _over_budget(deadline):
+        return None
     ads_window_seconds = settings_values["view_repeat_window_seconds"]
-    ads_threshold = settings_values["view_repeat_threshold"]
     ads_block_seconds = settings_values["block_seconds"]
 
-    count_key = f"ads:views:{scope_hash}:{viewer_hash}"
-    block_key = f"ads:block:{scope_hash}:{viewer_hash}"
+    levels = _counter_keys(scope_hash, viewer_hash, ip_address_hash, settings_values)
+    count_keys = [count_key for count_key, _, _ in levels]
+    block_keys = [block_key for _, block_key, _ in levels]
+    shard_count = _shard_count()
+    shared = _shared_count_keys(levels, viewer_id) if shard_count > 1 else []
+    marker_keys = [hot_key_marker(key) for key in shared]
 
-    if cache.get(block_key):
-        if _should_record_event(
-            scope_hash,
-            viewer_hash,
-            True,
-            settings_values["event_record_seconds"],
-        ):
-            _record_event(scope_value, viewer_hash, ip_address_hash, True)
+    state = counters.get_many(block_keys + marker_keys)
+    now = time.time()
+    if any(is_blocking(state.get(block_key), now) for block_key in block_keys):
+        remember_block(
+            request, scope_hash, _remaining_block_seconds(state, block_keys, now)
+        )
+        if counted and not _over_budget(deadline):
+            _record_blocked_event(
+                scope_value, scope_hash, viewer_hash, ip_address_hash, settings_values
+            )
         return False
 
-    if cache.add(count_key, 1, timeout=ads_window_seconds):
+    if not counted:
+        return True
+    if _over_budget(deadline):
+        return None
+    if _count_mode() == COUNT_MODE_BEACON:
+        return True
+    amount = _sample_amount(scope_value, viewer_hash)
+    if not amount:
         return True
 
-    count = cache.incr(count_key)
-    if count > ads_threshold:
-        cache.set(block_key, True, timeout=ads_block_seconds)
-        if _should_record_event(
-            scope_hash,
-            viewer_hash,
-            True,
-            settings_values["event_record_seconds"],
-        ):
-            _record_event(scope_value, viewer_hash, ip_address_hash, True)
+    shards = {
+        count_key: state[hot_key_marker(count_key)]
+        for count_key in shared
+        if state.get(hot_key_marker(count_key))
+    }
+    [tripped] = _increment_levels(
+        counters,
+        [(levels, amount)],
+        shards,
+        ads_window_seconds,
+        shard_count,
+        set(shared),
+    )
+    if tripped:
+        values, timeout = penalty_values(tripped, state, now, ads_block_seconds)
+        counters.set_many(values, timeout=timeout)
+        remember_block(request, scope_hash, ads_block_seconds)
+        if not _over_budget(deadline):
+            _record_blocked_event(
+                scope_value, scope_hash, viewer_hash, ip_address_hash, settings_values
+            )
         return False
     return True
+
+
+def record_impressions(request: HttpRequest, scopes: list[str]) -> None:
+    """Count impressions reported by the beacon view for several scopes.
+
+    Like ``should_show_ads``, failures are logged and never propagate.
+    """
+    try:
+        if get_request_action(request) != ACTION_COUNT:
+            return
+    except Exception:
+        logger.warning("ads_throttle request classification failed", exc_info=True)
+        return
+    breaker = get_breaker("cache")
+    if not breaker.allow():
+        return
+    counters = _TimedCache(_counter_cache())
+    try:
+        _record_impressions(request, scopes, counters)
+    except Exception:
+        breaker.record_failure()
+        logger.warning("ads_throttle beacon failed", exc_info=True)
+        return
+    breaker.record_success(counters.elapsed)
+
+
+def _record_impressions(request: HttpRequest, scopes: list[str], counters) -> None:
+    viewer_hash = hash_viewer(_viewer_fingerprint(request))
+    viewer_id = _viewer_id(request)
+    ip_address_hash = _hash_ip(_get_client_ip(request))
+    base_values, profiles = _settings_and_profiles()
+    user = _override_user(request)
+    planned = []
+    for scope_value in scopes:
+        # Overridden viewers never reach the counters on the decision path.
+        if _get_override_decision(
+            user, viewer_id, ip_address_hash, scope_value, viewer_hash
+        ):
+            continue
+        amount = _sample_amount(scope_value, viewer_hash)
+        if not amount:
+            continue
+        settings_values = profiles.apply(base_values, scope_value)
+        scope_hash = hash_scope(scope_value)
+        levels = _counter_keys(
+            scope_hash, viewer_hash, ip_address_hash, settings_values
+        )
+        planned.append((scope_value, scope_hash, levels, amount, settings_values))
+    if not planned:
+        return
+    shard_count = _shard_count()
+    shared = set()
+    shards = {}
+    if shard_count > 1:
+        shared = {
+            count_key
+            for _, _, levels, _, _ in planned
+            for count_key in _shared_count_keys(levels, viewer_id)
+        }
+        markers = {hot_key_marker(count_key): count_key for count_key in shared}
+        shards = {
+            markers[marker]: value
+            for marker, value in counters.get_many(list(markers)).items()
+            if value
+        }
+    # Scopes with different profiles may use different windows and blocks.
+    groups: dict[tuple[int, int], list[tuple]] = {}
+    for entry in planned:
+        limits = (
+            entry[4]["view_repeat_window_seconds"],
+            entry[4]["block_seconds"],
+        )
+        groups.setdefault(limits, []).append(entry)
+    for (window, block_seconds), group in groups.items():
+        tripped = _increment_levels(
+            counters,
+            [(levels, amount) for _, _, levels, amount, _ in group],
+            shards,
+            window,
+            shard_count,
+            shared,
+        )
+        blocked = {
+            block_key: True for scope_tripped in tripped for block_key in scope_tripped
+        }
+        if not blocked:
+            continue
+        previous = counters.get_many(list(blocked)) if escalation_enabled() else {}
+        values, timeout = penalty_values(blocked, previous, time.time(), block_seconds)
+        counters.set_many(values, timeout=timeout)
+        for (scope_value, scope_hash, _, _, settings_values), scope_tripped in zip(
+            group, tripped
+        ):
+            if scope_tripped:
+                _record_blocked_event(
+                    scope_value,
+                    scope_hash,
+                    viewer_hash,
+                    ip_address_hash,
+                    settings_values,
+                )
@@ -0,0 +1,11 @@
+from django.urls import path
+
+from . import views
+
+app_name = "ads_throttle"
+
+urlpatterns = [
+    path("decision/", views.decision, name="decision"),
+    path("beacon/", views.beacon, name="beacon"),
+    path("slot/<slug:name>/", views.slot, name="slot"),
+]
@@ -0,0 +1,115 @@
+from django.conf import settings
+from django.http import Http404, HttpRequest, HttpResponse, JsonResponse
+from django.template.loader import render_to_string
+from django.utils.cache import patch_cache_control
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+
+from .throttling import (
+    COUNT_MODE_BEACON,
+    _count_mode,
+    record_impressions,
+    should_show_ads,
+)
+
+MAX_SCOPES = 10
+# Longest scope stored by AdsThrottleEvent.scope.
+MAX_SCOPE_LENGTH = 512
+
+
+def _private(response: HttpResponse) -> HttpResponse:
+    # Only this response is per viewer; the page around it stays cacheable.
+    patch_cache_control(response, private=True, no_store=True)
+    return response
+
+
+def _valid_scope(scope: str) -> bool:
+    return scope.startswith("/") and len(scope) <= MAX_SCOPE_LENGTH
+
+
+def _same_origin(request: HttpRequest) -> bool:
+    """Return whether a request was not sent by another site's page.
+
+    Browsers send ``Origin`` or ``Sec-Fetch-Site`` with cross-site requests,
+    including image and beacon requests. Requests without either header come
+    from edge servers (ESI) or other non-browser clients, which can only count
+    against their own IP address.
+    """
+    origin = request.META.get("HTTP_ORIGIN")
+    if origin is not None:
+        allowed = {
+            f"{request.scheme}://{request.get_host()}",
+            *getattr(settings, "CSRF_TRUSTED_ORIGINS", ()),
+        }
+        return origin in allowed
+    return request.META.get("HTTP_SEC_FETCH_SITE", "same-origin") in {
+        "same-origin",
+        "none",
+    }
+
+
+@require_GET
+def decision(request: HttpRequest) -> HttpResponse:
+    """Return ``{"decisions": {scope: bool}}`` for the ``scope`` parameters."""
+    if not _same_origin(request):
+        return _private(HttpResponse(status=403))
+    scopes = list(dict.fromkeys(request.GET.getlist("scope")))
+    if not scopes or len(scopes) > MAX_SCOPES:
+        return _private(
+            JsonResponse(
+                {"error": f"Pass 1 to {MAX_SCOPES} scope parameters."},
+                status=400,
+            )
+        )
+    if not all(_valid_scope(scope) for scope in scopes):
+        return _private(
+            JsonResponse(
+                {
+                    "error": "Scopes must start with '/' and be at most "
+                    f"{MAX_SCOPE_LENGTH} characters."
+                },
+                status=400,
+            )
+        )
+    decisions = {scope: should_show_ads(request, scope=scope) for scope in scopes}
+    return _private(JsonResponse({"decisions": decisions}))
+
+
+@require_GET
+def slot(request: HttpRequest, name: str) -> HttpResponse:
+    """Render an ad slot fragment for ESI, or an empty body when blocked."""
+    template_name = getattr(settings, "ADS_THROTTLE_SLOT_TEMPLATES", {}).get(name)
+    if template_name is None:
+        raise Http404("Unknown ad slot.")
+    if not _same_origin(request):
+        return _private(HttpResponse(status=403))
+    scope = request.GET.get("scope") or None
+    if scope is not None and not _valid_scope(scope):
+        return _private(HttpResponse(status=400))
+    if scope is None or not should_show_ads(request, scope=scope):
+        return _private(HttpResponse(""))
+    return _private(
+        HttpResponse(render_to_string(template_name, {"scope": scope}, request=request))
+    )
+
+
+@csrf_exempt
+@require_POST
+def beacon(request: HttpRequest) -> HttpResponse:
+    """Count rendered impressions sent with ``navigator.sendBeacon``.
+
+    Only active with ``ADS_THROTTLE_COUNT_MODE = "beacon"``; otherwise
+    decisions already count impressions and beacons are ignored. The view is
+    CSRF-exempt because beacons carry no token; cross-site beacons are refused
+    so that other sites cannot get a visitor's IP address blocked.
+    """
+    if not _same_origin(request):
+        return _private(HttpResponse(status=403))
+    scopes = [
+        scope
+        for scope in dict.fromkeys(request.POST.getlist("scope"))
+        if _valid_scope(scope)
+    ][:MAX_SCOPES]
+    if scopes and _count_mode() == COUNT_MODE_BEACON:
+        record_impressions(request, scopes)
+    return _private(HttpResponse(status=204))
@@ -1,6 +1,10 @@
+from unittest.mock import patch
+
 from django.contrib import admin
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
 from django.test import TestCase
+from django.utils import timezone
 
 from ads_throttle.admin import (
     AdsThrottleEventAdmin,
@@ -161,3 +165,53 @@ class AdminPermissionTests(TestCase):
 
         super_request = build_request(user=self.superuser)
         self.assertTrue(event_admin.has_delete_permission(super_request))
+
+
+class EventAdminBlockActionTests(TestCase):
+    def setUp(self):
+        self.admin = AdsThrottleEventAdmin(AdsThrottleEvent, admin.sites.AdminSite())
+        self.superuser = get_user_model().objects.create_superuser(
+            username="blocker",
+            password="pass",
+            email="blocker@example.com",
+        )
+        self.request = build_request(user=self.superuser)
+        now = timezone.now()
+        for viewer, ip in (("a" * 64, "1.1.1.1"), ("b" * 64, "1.1.1.1")):
+            AdsThrottleEvent.objects.create(
+                scope="/x/",
+                viewer_hash=viewer,
+                ip_address_hash=_hash_ip(ip),
+                first_seen=now,
+                last_seen=now,
+            )
+
+    def test_block_ip_addresses_dedupes_targets(self):
+        with patch.object(self.admin, "message_user") as message_user:
+            self.admin.block_ip_addresses(self.request, AdsThrottleEvent.objects.all())
+            self.admin.block_ip_addresses(self.request, AdsThrottleEvent.objects.all())
+        override = AdsThrottleOverride.objects.get()
+        self.assertEqual(override.ip_address_hash, _hash_ip("1.1.1.1"))
+        self.assertEqual(override.scope, "")
+        self.assertTrue(override.force_block)
+        self.assertIn("already blocked: 1", message_user.call_args[0][1])
+
+    def test_block_viewers_creates_fingerprint_overrides(self):
+        with patch.object(self.admin, "message_user"):
+            self.admin.block_viewers(self.request, AdsThrottleEvent.objects.all())
+        self.assertEqual(
+            set(AdsThrottleOverride.objects.values_list("viewer_id", flat=True)),
+            {f"fingerprint:{'a' * 64}", f"fingerprint:{'b' * 64}"},
+        )
+
+    def test_block_actions_require_add_override_permission(self):
+        staff = get_user_model().objects.create_user(
+            username="staff", password="pass", is_staff=True
+        )
+        request = build_request(user=staff)
+        self.assertNotIn("block_viewers", self.admin.get_actions(request))
+        staff.user_permissions.add(
+            Permission.objects.get(codename="add_adsthrottleoverride")
+        )
+        request = build_request(user=get_user_model().objects.get(pk=staff.pk))
+        self.assertIn("block_viewers", self.admin.get_actions(request))
@@ -0,0 +1,154 @@
+import time
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from ads_throttle.breaker import (
+    STATE_CLOSED,
+    STATE_HALF_OPEN,
+    STATE_OPEN,
+    CircuitBreaker,
+    get_breaker,
+    reset_breakers,
+)
+from ads_throttle.models import AdsThrottleEvent
+from ads_throttle.throttling import should_show_ads
+from tests.utils import build_request
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def test_opens_after_consecutive_failures(self):
+        breaker = CircuitBreaker("test", failure_threshold=2, reset_seconds=30)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, STATE_CLOSED)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, STATE_OPEN)
+        self.assertFalse(breaker.allow())
+
+    def test_success_resets_failure_count(self):
+        breaker = CircuitBreaker("test", failure_threshold=2)
+        breaker.record_failure()
+        breaker.record_success(0.0)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, STATE_CLOSED)
+
+    def test_slow_calls_count_as_failures(self):
+        breaker = CircuitBreaker("test", failure_threshold=1, slow_call_seconds=0.1)
+        breaker.record_success(0.5)
+        self.assertEqual(breaker.state, STATE_OPEN)
+
+    def test_half_open_allows_single_probe(self):
+        breaker = CircuitBreaker("test", failure_threshold=1, reset_seconds=10)
+        with patch("ads_throttle.breaker.time.monotonic", return_value=100.0):
+            breaker.record_failure()
+        with patch("ads_throttle.breaker.time.monotonic", return_value=111.0):
+            self.assertTrue(breaker.allow())
+            self.assertEqual(breaker.state, STATE_HALF_OPEN)
+            self.assertFalse(breaker.allow())
+        breaker.record_success(0.0)
+        self.assertEqual(breaker.state, STATE_CLOSED)
+        self.assertTrue(breaker.allow())
+
+    def test_failed_probe_reopens(self):
+        breaker = CircuitBreaker("test", failure_threshold=3, reset_seconds=10)
+        with patch("ads_throttle.breaker.time.monotonic", return_value=100.0):
+            for _ in range(3):
+                breaker.record_failure()
+        with patch("ads_throttle.breaker.time.monotonic", return_value=111.0):
+            self.assertTrue(breaker.allow())
+            breaker.record_failure()
+            self.assertEqual(breaker.state, STATE_OPEN)
+            self.assertFalse(breaker.allow())
+
+    @override_settings(ADS_THROTTLE_BREAKER_FAILURE_THRESHOLD=7)
+    def test_get_breaker_reads_settings(self):
+        self.assertEqual(get_breaker("cache").failure_threshold, 7)
+        self.assertIs(get_breaker("cache"), get_breaker("cache"))
+
+
+@override_settings(ADS_THROTTLE_BREAKER_FAILURE_THRESHOLD=2)
+class FailOpenTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        reset_breakers()
+
+    def tearDown(self):
+        reset_breakers()
+
+    def _request(self):
+        return build_request(
+            path="/fail/",
+            meta={"REMOTE_ADDR": "10.1.1.1", "HTTP_USER_AGENT": "ua"},
+        )
+
+    def test_cache_errors_fail_open_and_trip_breaker(self):
+        request = self._request()
+        with (
+            patch(
+                "ads_throttle.throttling.cache.get_many",
+                side_effect=ConnectionError("down"),
+            ) as get_many,
+            self.assertLogs("ads_throttle.throttling", "WARNING"),
+        ):
+            self.assertTrue(should_show_ads(request))
+            self.assertTrue(should_show_ads(request))
+            self.assertEqual(get_breaker("cache").state, STATE_OPEN)
+            self.assertTrue(should_show_ads(request))
+        self.assertEqual(get_many.call_count, 2)
+
+    @override_settings(ADS_THROTTLE_EXEMPT_PATH_PREFIXES=["/members/"])
+    def test_classified_requests_bypass_open_breaker(self):
+        breaker = get_breaker("cache")
+        breaker.record_failure()
+        breaker.record_failure()
+        self.assertFalse(should_show_ads(build_request("/members/x/")))
+        head = self._request()
+        head.method = "HEAD"
+        self.assertTrue(should_show_ads(head))
+        self.assertEqual(breaker.state, STATE_OPEN)
+        self.assertEqual(cache._cache, {})
+
+    @override_settings(ADS_THROTTLE_BREAKER_SLOW_CALL_SECONDS=0.01)
+    def test_slow_database_is_not_charged_to_cache_breaker(self):
+        def slow_override(*args):
+            time.sleep(0.02)
+
+        with patch(
+            "ads_throttle.throttling._get_override_decision", side_effect=slow_override
+        ):
+            self.assertTrue(should_show_ads(self._request()))
+            self.assertTrue(should_show_ads(self._request()))
+        self.assertEqual(get_breaker("cache").state, STATE_CLOSED)
+        self.assertEqual(get_breaker("cache").failures, 0)
+
+    @override_settings(ADS_THROTTLE_FAIL_OPEN_DECISION=False)
+    def test_fail_open_decision_is_configurable(self):
+        with (
+            patch(
+                "ads_throttle.throttling.cache.get_many",
+                side_effect=ConnectionError("down"),
+            ),
+            self.assertLogs("ads_throttle.throttling", "WARNING"),
+        ):
+            self.assertFalse(should_show_ads(self._request()))
+
+    @override_settings(ADS_VIEW_REPEAT_THRESHOLD=0)
+    def test_database_errors_skip_event_recording(self):
+        with (
+            patch(
+                "ads_throttle.throttling._record_event",
+                side_effect=DatabaseError("down"),
+            ),
+            self.assertLogs("ads_throttle.throttling", "WARNING"),
+        ):
+            self.assertFalse(should_show_ads(self._request()))
+        self.assertEqual(get_breaker("db").failures, 1)
+        self.assertEqual(get_breaker("cache").failures, 0)
+        self.assertFalse(AdsThrottleEvent.objects.exists())
+
+    @override_settings(ADS_THROTTLE_LATENCY_BUDGET_SECONDS=1e-9)
+    def test_exhausted_budget_skips_counting(self):
+        self.assertTrue(should_show_ads(self._request()))
+        self.assertFalse(any(":ads:views:" in key for key in cache._cache))
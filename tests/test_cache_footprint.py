@@ -0,0 +1,97 @@
+import tempfile
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from ads_throttle.management.commands.ads_throttle_cache_footprint import (
+    OTHER_FAMILY,
+    key_family,
+)
+from ads_throttle.throttling import should_show_ads
+from tests.utils import build_request
+
+
+class KeyFamilyTests(SimpleTestCase):
+    def test_longest_prefix_wins(self):
+        self.assertEqual(key_family("ads:views:abc:def"), "ads:views:")
+        self.assertEqual(key_family("ads:views:ip:abc:def"), "ads:views:ip:")
+        self.assertEqual(key_family("ads:block:site:abc"), "ads:block:site:")
+        self.assertEqual(key_family("at2:vs:abc"), "at2:vs:")
+        self.assertEqual(
+            key_family("ads_throttle:override:a:b::c"), "ads_throttle:override:"
+        )
+
+    def test_hot_markers_and_unknown_keys(self):
+        self.assertEqual(key_family("ads:views:abc:def:hot"), "ads:views:*:hot")
+        self.assertEqual(key_family("sessions:abc"), OTHER_FAMILY)
+
+
+@override_settings(
+    ADS_VIEW_REPEAT_WINDOW_SECONDS=600,
+    ADS_VIEW_REPEAT_THRESHOLD=1,
+    ADS_BLOCK_SECONDS=3600,
+)
+class CacheFootprintCommandTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def _footprint(self, *args):
+        stdout = StringIO()
+        call_command("ads_throttle_cache_footprint", *args, stdout=stdout)
+        return stdout.getvalue()
+
+    def test_reports_families_with_ttl(self):
+        for index in range(3):
+            request = build_request(meta={"REMOTE_ADDR": f"10.0.0.{index}"})
+            should_show_ads(request, scope="/a/")
+            should_show_ads(request, scope="/a/")
+        cache.set("unrelated", "x")
+        output = self._footprint()
+        self.assertIn("backend=LocMemCache", output)
+        views = next(
+            line for line in output.splitlines() if line.startswith("ads:views:")
+        )
+        self.assertIn("keys=3", views)
+        self.assertIn("1m-10m=3", views)
+        block = next(
+            line for line in output.splitlines() if line.startswith("ads:block:")
+        )
+        self.assertIn("10m-1h=3", block)
+        self.assertIn(OTHER_FAMILY, output)
+
+    def test_projects_memory_from_per_viewer_counters(self):
+        should_show_ads(build_request(), scope="/a/")
+        output = self._footprint("--project-viewers", "1000000")
+        self.assertIn("projected memory for 1000000 viewer/scope pairs", output)
+
+    def test_projection_needs_counters(self):
+        output = self._footprint("--project-viewers", "10")
+        self.assertIn("cannot project", output)
+
+    def test_file_cache_is_reported_without_families(self):
+        with tempfile.TemporaryDirectory() as location:
+            with override_settings(
+                CACHES={
+                    "default": {
+                        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                        "LOCATION": location,
+                    }
+                }
+            ):
+                cache.set("ads:views:a:b", 1, timeout=30)
+                output = self._footprint()
+        self.assertIn("(file cache, hashed names)", output)
+        self.assertIn("<1m=1", output)
+
+    @override_settings(
+        CACHES={
+            "default": {
+                "BACKEND": "django.core.cache.backends.dummy.DummyCache",
+            }
+        }
+    )
+    def test_backend_without_key_listing(self):
+        with self.assertRaisesMessage(CommandError, "DummyCache"):
+            self._footprint()
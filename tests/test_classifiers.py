@@ -0,0 +1,152 @@
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from ads_throttle.classifiers import (
+    ACTION_COUNT,
+    ACTION_HIDE,
+    ACTION_UNCOUNTED,
+    CLASS_BOT,
+    CLASS_HEAD,
+    CLASS_HEALTH_CHECK,
+    CLASS_PREFETCH,
+    _classify_user_agent,
+    classify_request,
+    get_request_action,
+)
+from ads_throttle.models import AdsThrottleEvent
+from ads_throttle.throttling import should_show_ads
+from tests.utils import build_request
+
+
+def classify_everything(request):
+    return "custom"
+
+
+class ClassifyRequestTests(SimpleTestCase):
+    def test_head_request(self):
+        request = build_request(with_session=False)
+        request.method = "HEAD"
+        self.assertEqual(classify_request(request), CLASS_HEAD)
+
+    def test_prefetch_request(self):
+        request = build_request(
+            with_session=False, meta={"HTTP_SEC_PURPOSE": "prefetch;prerender"}
+        )
+        self.assertEqual(classify_request(request), CLASS_PREFETCH)
+
+    def test_bot_user_agent(self):
+        request = build_request(
+            with_session=False,
+            meta={"HTTP_USER_AGENT": "Mozilla/5.0 (compatible; Googlebot/2.1)"},
+        )
+        self.assertEqual(classify_request(request), CLASS_BOT)
+
+    def test_crawler_tokens_are_bots(self):
+        for user_agent in (
+            "AdsBot-Google (+http://www.google.com/adsbot.html)",
+            "Mozilla/5.0 (compatible; bingbot/2.0)",
+            "Slackbot 1.0 (+https://api.slack.com/robots)",
+            "Googlebot",
+        ):
+            with self.subTest(user_agent=user_agent):
+                self.assertEqual(_classify_user_agent(user_agent), CLASS_BOT)
+
+    def test_cubot_phone_is_not_a_bot(self):
+        request = build_request(
+            with_session=False,
+            meta={
+                "HTTP_USER_AGENT": (
+                    "Mozilla/5.0 (Linux; Android 10; CUBOT X30) AppleWebKit/537.36 "
+                    "(KHTML, like Gecko) Chrome/120.0 Mobile Safari/537.36"
+                )
+            },
+        )
+        self.assertIsNone(classify_request(request))
+
+    def test_health_check_user_agent(self):
+        request = build_request(
+            with_session=False, meta={"HTTP_USER_AGENT": "kube-probe/1.29"}
+        )
+        self.assertEqual(classify_request(request), CLASS_HEALTH_CHECK)
+
+    def test_regular_browser_is_not_classified(self):
+        request = build_request(
+            with_session=False,
+            meta={"HTTP_USER_AGENT": "Mozilla/5.0 (X11; Linux x86_64) Firefox/130.0"},
+        )
+        self.assertIsNone(classify_request(request))
+        self.assertEqual(get_request_action(request), ACTION_COUNT)
+
+    def test_user_agent_verdict_is_memoized(self):
+        _classify_user_agent.cache_clear()
+        _classify_user_agent("SomeCrawler/1.0")
+        _classify_user_agent("SomeCrawler/1.0")
+        self.assertEqual(_classify_user_agent.cache_info().hits, 1)
+
+    @override_settings(ADS_THROTTLE_BOT_USER_AGENTS=[r"^custom-agent"])
+    def test_patterns_follow_settings(self):
+        self.assertEqual(_classify_user_agent("custom-agent/2"), CLASS_BOT)
+        self.assertIsNone(_classify_user_agent("Googlebot/2.1"))
+
+    @override_settings(
+        ADS_THROTTLE_REQUEST_CLASSIFIERS=["tests.test_classifiers.classify_everything"],
+        ADS_THROTTLE_CLASS_ACTIONS={"custom": ACTION_HIDE},
+    )
+    def test_custom_classifier_and_action(self):
+        request = build_request(with_session=False)
+        self.assertEqual(classify_request(request), "custom")
+        self.assertEqual(get_request_action(request), ACTION_HIDE)
+
+    @override_settings(ADS_THROTTLE_CLASS_ACTIONS={CLASS_BOT: "unknown"})
+    def test_unknown_action_falls_back_to_count(self):
+        request = build_request(
+            with_session=False, meta={"HTTP_USER_AGENT": "Googlebot/2.1"}
+        )
+        self.assertEqual(get_request_action(request), ACTION_COUNT)
+
+
+@override_settings(
+    ADS_VIEW_REPEAT_WINDOW_SECONDS=60,
+    ADS_VIEW_REPEAT_THRESHOLD=1,
+    ADS_BLOCK_SECONDS=60,
+)
+class ShouldShowAdsClassificationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_show_action_skips_cache_and_database(self):
+        request = build_request(path="/head/", with_session=False)
+        request.method = "HEAD"
+        with self.assertNumQueries(0):
+            for _ in range(3):
+                self.assertTrue(should_show_ads(request))
+        self.assertEqual(cache._cache, {})
+
+    @override_settings(ADS_THROTTLE_CLASS_ACTIONS={CLASS_BOT: ACTION_HIDE})
+    def test_hide_action_returns_false(self):
+        request = build_request(
+            path="/bot/", with_session=False, meta={"HTTP_USER_AGENT": "Googlebot"}
+        )
+        self.assertFalse(should_show_ads(request))
+        self.assertEqual(cache._cache, {})
+
+    def test_uncounted_action_does_not_increment(self):
+        meta = {"REMOTE_ADDR": "10.0.0.9", "HTTP_USER_AGENT": "Googlebot/2.1"}
+        request = build_request(path="/crawl/", with_session=False, meta=meta)
+        for _ in range(3):
+            self.assertTrue(should_show_ads(request))
+        self.assertFalse(AdsThrottleEvent.objects.exists())
+
+    def test_uncounted_action_honours_existing_block(self):
+        meta = {"REMOTE_ADDR": "10.0.0.10", "HTTP_USER_AGENT": "ua"}
+        request = build_request(path="/prefetch/", with_session=False, meta=meta)
+        self.assertTrue(should_show_ads(request))
+        self.assertFalse(should_show_ads(request))
+
+        prefetch = build_request(
+            path="/prefetch/",
+            with_session=False,
+            meta={**meta, "HTTP_SEC_PURPOSE": "prefetch"},
+        )
+        self.assertEqual(get_request_action(prefetch), ACTION_UNCOUNTED)
+        self.assertFalse(should_show_ads(prefetch))
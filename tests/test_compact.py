@@ -0,0 +1,228 @@
+from io import StringIO
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from ads_throttle.admin import (
+    AdsThrottleCompactEventAdmin,
+    AdsThrottleCompactOverrideAdmin,
+    AdsThrottleCompactOverrideAdminForm,
+)
+from ads_throttle.fields import DigestField
+from ads_throttle.models import (
+    AdsThrottleCompactEvent,
+    AdsThrottleCompactOverride,
+    AdsThrottleEvent,
+    AdsThrottleOverride,
+    CompactMigrationCheckpoint,
+    hex_to_digest,
+    scope_digest,
+)
+from ads_throttle.throttling import _hash_ip, _record_event, should_show_ads
+from tests.utils import build_request
+
+
+class DigestFieldTests(SimpleTestCase):
+    def test_mysql_uses_bounded_varbinary(self):
+        connection = SimpleNamespace(vendor="mysql")
+        self.assertEqual(DigestField().db_type(connection), "varbinary(32)")
+
+
+@override_settings(ADS_THROTTLE_COMPACT_SCHEMA=True)
+class CompactThrottlingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_records_events_in_compact_table(self):
+        viewer_hash = "ab" * 32
+        ip_hash = _hash_ip("10.3.3.3")
+        _record_event("/compact/", viewer_hash, "", False)
+        _record_event("/compact/", viewer_hash, ip_hash, True)
+        event = AdsThrottleCompactEvent.objects.get()
+        self.assertEqual(event.scope, "/compact/")
+        self.assertEqual(event.scope_hash, scope_digest("/compact/"))
+        self.assertEqual(event.viewer_hash, viewer_hash)
+        self.assertEqual(event.ip_address_hash, ip_hash)
+        self.assertEqual(event.count, 2)
+        self.assertTrue(event.blocked)
+        self.assertFalse(AdsThrottleEvent.objects.exists())
+
+    def test_compact_ip_override_blocks(self):
+        AdsThrottleCompactOverride.objects.create(
+            scope="", ip_address_hash=_hash_ip("10.3.3.4"), force_block=True
+        )
+        request = build_request(
+            path="/anything/",
+            meta={"REMOTE_ADDR": "10.3.3.4", "HTTP_USER_AGENT": "ua"},
+        )
+        self.assertFalse(should_show_ads(request))
+        self.assertEqual(AdsThrottleCompactEvent.objects.get().count, 1)
+
+    def test_compact_scope_override_shows(self):
+        AdsThrottleCompactOverride.objects.create(scope="/promo/", force_show=True)
+        request = build_request(path="/promo/", meta={"REMOTE_ADDR": "10.3.3.5"})
+        with self.settings(ADS_VIEW_REPEAT_THRESHOLD=0):
+            self.assertTrue(should_show_ads(request))
+
+
+class CompactAdminTests(TestCase):
+    def setUp(self):
+        self.admin_site = admin.sites.AdminSite()
+        self.superuser = get_user_model().objects.create_superuser(
+            username="compact-admin", password="pass", email="c@example.com"
+        )
+        self.request = build_request(user=self.superuser)
+        now = timezone.now()
+        self.event = AdsThrottleCompactEvent.objects.create(
+            scope="/a/",
+            viewer_digest=hex_to_digest("cd" * 32),
+            ip_address_digest=hex_to_digest(_hash_ip("10.4.4.4")),
+            first_seen=now,
+            last_seen=now,
+            count=1,
+        )
+        AdsThrottleCompactEvent.objects.create(
+            scope="/b/",
+            viewer_digest=hex_to_digest("ef" * 32),
+            first_seen=now,
+            last_seen=now,
+            count=1,
+        )
+
+    def _search(self, term):
+        event_admin = AdsThrottleCompactEventAdmin(
+            AdsThrottleCompactEvent, self.admin_site
+        )
+        queryset, _ = event_admin.get_search_results(
+            self.request, AdsThrottleCompactEvent.objects.all(), term
+        )
+        return list(queryset)
+
+    def test_search_by_raw_ip(self):
+        self.assertEqual(self._search("10.4.4.4"), [self.event])
+
+    def test_search_by_hex_digest(self):
+        self.assertEqual(self._search("cd" * 32), [self.event])
+
+    def test_save_ip_override_stores_digest(self):
+        override_admin = AdsThrottleCompactOverrideAdmin(
+            AdsThrottleCompactOverride, self.admin_site
+        )
+        form = AdsThrottleCompactOverrideAdminForm(
+            data={
+                "apply_to": "ip",
+                "action": "block",
+                "scope": "/x/",
+                "raw_ip": "1.2.3.4",
+            }
+        )
+        self.assertTrue(form.is_valid(), form.errors)
+        obj = form.save(commit=False)
+        override_admin.save_model(self.request, obj, form, change=False)
+        obj.refresh_from_db()
+        self.assertEqual(obj.ip_address_digest, hex_to_digest(_hash_ip("1.2.3.4")))
+        self.assertEqual(obj.scope_hash, scope_digest("/x/"))
+
+
+class CompactMigrateCommandTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        now = timezone.now()
+        for index in range(3):
+            AdsThrottleEvent.objects.create(
+                scope=f"/{index}/",
+                viewer_hash=f"{index:064x}",
+                ip_address_hash=_hash_ip("10.5.5.5"),
+                first_seen=now,
+                last_seen=now,
+                count=2,
+                blocked=True,
+            )
+        AdsThrottleOverride.objects.create(
+            scope="/o/", ip_address_hash=_hash_ip("10.5.5.6"), force_block=True
+        )
+
+    def test_copies_in_batches_and_resumes(self):
+        call_command(
+            "ads_throttle_compact_migrate",
+            "--models",
+            "events",
+            "--batch-size",
+            "2",
+            stdout=StringIO(),
+        )
+        self.assertEqual(AdsThrottleCompactEvent.objects.count(), 3)
+        AdsThrottleEvent.objects.create(
+            scope="/new/",
+            viewer_hash="ff" * 32,
+            first_seen=timezone.now(),
+            last_seen=timezone.now(),
+            count=1,
+        )
+        call_command(
+            "ads_throttle_compact_migrate", "--models", "events", stdout=StringIO()
+        )
+        self.assertEqual(AdsThrottleCompactEvent.objects.count(), 4)
+        self.assertEqual(
+            AdsThrottleCompactEvent.objects.get(scope="/0/").count,
+            2,
+        )
+
+    def test_merges_into_rows_written_in_compact_mode(self):
+        now = timezone.now()
+        AdsThrottleCompactEvent.objects.create(
+            scope="/0/",
+            viewer_digest=hex_to_digest(f"{0:064x}"),
+            first_seen=now,
+            last_seen=now,
+            count=5,
+        )
+        call_command("ads_throttle_compact_migrate", stdout=StringIO())
+        event = AdsThrottleCompactEvent.objects.get(scope="/0/")
+        self.assertEqual(event.count, 7)
+        self.assertTrue(event.blocked)
+        override = AdsThrottleCompactOverride.objects.get()
+        self.assertEqual(override.scope_hash, scope_digest("/o/"))
+        self.assertEqual(override.ip_address_hash, _hash_ip("10.5.5.6"))
+
+    def test_checkpoint_survives_cache_loss(self):
+        call_command("ads_throttle_compact_migrate", stdout=StringIO())
+        cache.clear()
+        call_command("ads_throttle_compact_migrate", stdout=StringIO())
+        self.assertEqual(
+            CompactMigrationCheckpoint.objects.get(name="events").last_pk,
+            AdsThrottleEvent.objects.latest("pk").pk,
+        )
+        self.assertEqual(AdsThrottleCompactEvent.objects.get(scope="/0/").count, 2)
+        self.assertEqual(AdsThrottleCompactOverride.objects.count(), 1)
+
+    def test_failed_batch_keeps_checkpoint(self):
+        with (
+            patch(
+                "ads_throttle.management.commands.ads_throttle_compact_migrate"
+                ".CompactMigrationCheckpoint.objects.update_or_create",
+                side_effect=RuntimeError("crash"),
+            ),
+            self.assertRaises(RuntimeError),
+        ):
+            call_command(
+                "ads_throttle_compact_migrate", "--models", "events", stdout=StringIO()
+            )
+        self.assertFalse(AdsThrottleCompactEvent.objects.exists())
+
+    def test_restart_does_not_duplicate_overrides(self):
+        for _ in range(2):
+            call_command(
+                "ads_throttle_compact_migrate",
+                "--models",
+                "overrides",
+                "--restart",
+                stdout=StringIO(),
+            )
+        self.assertEqual(AdsThrottleCompactOverride.objects.count(), 1)
@@ -0,0 +1,154 @@
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from ads_throttle.counters import (
+    hot_key_marker,
+    incr_many,
+    is_sampled,
+    promote_hot_keys,
+    shard_keys,
+)
+
+
+class FakePipeline:
+    def __init__(self, store):
+        self.store = store
+        self.commands = []
+
+    def set(self, key, value, ex=None, nx=False):
+        self.commands.append(("set", key, value, nx))
+
+    def incr(self, key, amount=1):
+        self.commands.append(("incr", key, amount))
+
+    def get(self, key):
+        self.commands.append(("get", key))
+
+    def execute(self):
+        results = []
+        for command in self.commands:
+            if command[0] == "set":
+                _, key, value, nx = command
+                created = not (nx and key in self.store)
+                if created:
+                    self.store[key] = value
+                results.append(created)
+            elif command[0] == "get":
+                value = self.store.get(command[1])
+                results.append(None if value is None else str(value).encode())
+            else:
+                self.store[command[1]] += command[2]
+                results.append(self.store[command[1]])
+        return results
+
+
+class FakeRedisClient:
+    def __init__(self):
+        self.store = {}
+        self.pipelines = 0
+
+    def pipeline(self, transaction=True):
+        self.pipelines += 1
+        return FakePipeline(self.store)
+
+
+class FakeRedisCacheClient:
+    def __init__(self):
+        self.client = FakeRedisClient()
+
+    def get_client(self, key=None, *, write=False):
+        return self.client
+
+
+class FakeRedisCache:
+    def __init__(self):
+        self._cache = FakeRedisCacheClient()
+
+    def make_and_validate_key(self, key):
+        return f":1:{key}"
+
+
+class IncrManyTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_creates_and_increments_with_generic_cache(self):
+        self.assertEqual(incr_many(cache, ["a", "b"], 60), [1, 1])
+        self.assertEqual(incr_many(cache, ["a", "b"], 60), [2, 2])
+
+    def test_increments_by_amount(self):
+        self.assertEqual(incr_many(cache, ["a"], 60, amount=5), [5])
+        self.assertEqual(incr_many(cache, ["a"], 60, amount=5), [10])
+        redis_cache = FakeRedisCache()
+        self.assertEqual(incr_many(redis_cache, ["a"], 60, amount=3), [3])
+        self.assertEqual(incr_many(redis_cache, ["a"], 60, amount=3), [6])
+
+    def test_empty_keys(self):
+        self.assertEqual(incr_many(cache, [], 60), [])
+
+    def test_counter_expiring_between_add_and_incr_restarts_window(self):
+        calls = []
+        original_add = cache.add
+
+        def add(key, value, timeout=None):
+            calls.append(key)
+            # The first add sees a live key that expires before incr runs.
+            if len(calls) == 1:
+                return False
+            return original_add(key, value, timeout=timeout)
+
+        with patch.object(cache, "add", side_effect=add):
+            self.assertEqual(incr_many(cache, ["gone"], 60), [1])
+        self.assertEqual(cache.get("gone"), 1)
+
+    def test_redis_uses_single_pipeline(self):
+        redis_cache = FakeRedisCache()
+        self.assertEqual(incr_many(redis_cache, ["a", "b", "c"], 60), [1, 1, 1])
+        self.assertEqual(incr_many(redis_cache, ["a", "b"], 60), [2, 2])
+        client = redis_cache._cache.client
+        self.assertEqual(client.pipelines, 2)
+        self.assertEqual(client.store[":1:a"], 2)
+
+    def test_sharded_key_sums_sub_keys(self):
+        cache.set_many({"hot": 5, "hot:1": 3, "hot:2": 2}, timeout=60)
+        self.assertEqual(incr_many(cache, ["hot", "cold"], 60, {"hot": 3}), [11, 1])
+        total = sum(cache.get_many(shard_keys("hot", 3)).values())
+        self.assertEqual(total, 11)
+
+    def test_redis_sharded_key_reads_sub_keys_in_same_pipeline(self):
+        redis_cache = FakeRedisCache()
+        redis_cache._cache.client.store.update({":1:hot": 4, ":1:hot:1": 6})
+        self.assertEqual(incr_many(redis_cache, ["hot"], 60, {"hot": 2}), [11])
+        self.assertEqual(redis_cache._cache.client.pipelines, 1)
+
+
+class PromoteHotKeysTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_promotes_keys_over_threshold(self):
+        promote_hot_keys(cache, {"a": 10, "b": 2}, {}, 4, {"a": 10, "b": 10}, 60)
+        self.assertEqual(cache.get(hot_key_marker("a")), 4)
+        self.assertIsNone(cache.get(hot_key_marker("b")))
+
+    def test_skips_already_sharded_keys(self):
+        promote_hot_keys(cache, {"a": 10}, {"a": 4}, 8, {"a": 10}, 60)
+        self.assertIsNone(cache.get(hot_key_marker("a")))
+
+
+class IsSampledTests(SimpleTestCase):
+    def test_rate_one_always_samples(self):
+        self.assertTrue(is_sampled("viewer", 1))
+
+    def test_decision_is_stable_within_a_bucket(self):
+        with patch("ads_throttle.counters.time.time", return_value=1000.5):
+            first = [is_sampled(f"viewer{index}", 4) for index in range(50)]
+            second = [is_sampled(f"viewer{index}", 4) for index in range(50)]
+        self.assertEqual(first, second)
+
+    def test_samples_about_one_in_n(self):
+        with patch("ads_throttle.counters.time.time", return_value=1000.5):
+            sampled = sum(is_sampled(f"viewer{index}", 10) for index in range(10_000))
+        self.assertTrue(800 < sampled < 1200, sampled)
@@ -0,0 +1,53 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from ads_throttle.classifiers import CLASS_EXEMPT, classify_request
+from ads_throttle.throttling import should_show_ads
+from tests.utils import build_request
+
+
+class ExemptionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            username="subscriber", password="pass"
+        )
+
+    def _assert_exempt(self, request):
+        with self.assertNumQueries(0):
+            self.assertFalse(should_show_ads(request))
+        self.assertEqual(cache._cache, {})
+
+    @override_settings(ADS_THROTTLE_EXEMPT_PATH_PREFIXES=["/account/", "/checkout/"])
+    def test_path_prefix(self):
+        self._assert_exempt(build_request("/checkout/pay/", with_session=False))
+        request = build_request("/articles/", with_session=False)
+        self.assertIsNone(classify_request(request))
+
+    @override_settings(ADS_THROTTLE_EXEMPT_REQUEST_ATTRIBUTE="is_subscriber")
+    def test_request_attribute(self):
+        request = build_request(with_session=False)
+        request.is_subscriber = True
+        self._assert_exempt(request)
+
+    @override_settings(ADS_THROTTLE_EXEMPT_USER_ATTRIBUTES=["is_staff"])
+    def test_user_attribute(self):
+        self.user.is_staff = True
+        self._assert_exempt(build_request(user=self.user, with_session=False))
+        anonymous = build_request(with_session=False)
+        self.assertIsNone(classify_request(anonymous))
+
+    @override_settings(ADS_THROTTLE_EXEMPT_GROUPS=["Subscribers"])
+    def test_group_membership_cached_per_user(self):
+        group = Group.objects.create(name="Subscribers")
+        request = build_request(user=self.user, with_session=False)
+        with self.assertNumQueries(1):
+            self.assertIsNone(classify_request(request))
+        with self.assertNumQueries(0):
+            self.assertIsNone(classify_request(request))
+        self.user.groups.add(group)
+        with self.assertNumQueries(1):
+            self.assertEqual(classify_request(request), CLASS_EXEMPT)
+        self._assert_exempt(request)
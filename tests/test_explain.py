@@ -0,0 +1,91 @@
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import TestCase, override_settings
+
+from ads_throttle.explain import explain_should_show_ads
+from ads_throttle.middleware import ServerTimingMiddleware
+from ads_throttle.models import AdsThrottleOverride
+from ads_throttle.throttling import should_show_ads
+from tests.utils import build_request
+
+
+@override_settings(ADS_VIEW_REPEAT_THRESHOLD=2)
+class ExplainTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.request = build_request("/a/", with_session=False)
+
+    def test_dry_run_counts_nothing(self):
+        trace = explain_should_show_ads(self.request)
+        explain_should_show_ads(self.request)
+        self.assertTrue(trace["decision"])
+        self.assertEqual(trace["reason"], "under threshold")
+        self.assertEqual(trace["settings_source"], "defaults")
+        self.assertEqual(trace["counters"][0]["value"], 0)
+        self.assertEqual(
+            set(trace["timings_ns"]),
+            {"classify", "identity", "settings", "override", "counters"},
+        )
+        self.assertEqual(
+            explain_should_show_ads(self.request)["counters"][0]["value"], 0
+        )
+
+    def test_reports_counter_and_predicted_block(self):
+        should_show_ads(self.request)
+        should_show_ads(self.request)
+        trace = explain_should_show_ads(self.request)
+        self.assertEqual(trace["counters"][0]["value"], 2)
+        self.assertFalse(trace["decision"])
+        self.assertEqual(trace["reason"], "threshold reached")
+        should_show_ads(self.request)
+        trace = explain_should_show_ads(self.request)
+        self.assertTrue(trace["counters"][0]["blocked"])
+        self.assertEqual(trace["reason"], "blocked")
+
+    def test_not_dry_run_decides(self):
+        trace = explain_should_show_ads(self.request, dry_run=False)
+        self.assertIn("decide", trace["timings_ns"])
+        self.assertEqual(
+            explain_should_show_ads(self.request)["counters"][0]["value"], 1
+        )
+
+    def test_override_source(self):
+        override = AdsThrottleOverride.objects.create(scope="/a/", force_block=True)
+        trace = explain_should_show_ads(self.request)
+        self.assertEqual(
+            (trace["override"], trace["override_source"], trace["overrides"]),
+            ("block", "database", [override.pk]),
+        )
+        should_show_ads(self.request)
+        trace = explain_should_show_ads(self.request)
+        self.assertEqual(trace["override_source"], "cache")
+        self.assertEqual(trace["reason"], "override blocks")
+
+
+class ServerTimingMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_reports_decisions_and_stages(self):
+        def view(request):
+            should_show_ads(request, '/a/"b"/')
+            explain_should_show_ads(request, "/c/")
+            response = HttpResponse()
+            response.headers["Server-Timing"] = "db;dur=1"
+            return response
+
+        response = ServerTimingMiddleware(view)(build_request(with_session=False))
+        header = response.headers["Server-Timing"]
+        self.assertTrue(header.startswith("db;dur=1, ads-throttle;dur="))
+        self.assertIn('desc="/a/\\"b\\"/"', header)
+        self.assertIn("ads-throttle-counters;dur=", header)
+
+    def test_control_characters_in_scope_are_encoded(self):
+        def view(request):
+            should_show_ads(request)
+            return HttpResponse()
+
+        request = build_request("/a%0Ab%C3%A9/", with_session=False)
+        self.assertEqual(request.path, "/a\nbé/")
+        response = ServerTimingMiddleware(view)(request)
+        self.assertIn('desc="/a%0Ab%C3%A9/"', response.headers["Server-Timing"])
@@ -0,0 +1,177 @@
+import csv
+import io
+import json
+import tempfile
+from datetime import datetime, timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import skipIf
+from unittest.mock import patch
+
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from ads_throttle import export
+from ads_throttle.admin import AdsThrottleEventAdmin
+from ads_throttle.export import event_queryset, export_events, iter_event_rows
+from ads_throttle.models import AdsThrottleCompactEvent, AdsThrottleEvent, scope_digest
+from tests.utils import build_request
+
+
+def _create_events(model=AdsThrottleEvent, count=5):
+    now = timezone.now()
+    for index in range(count):
+        fields = {
+            "scope": "/a/" if index % 2 else "/b/",
+            "first_seen": now - timedelta(days=index),
+            "last_seen": now - timedelta(days=index),
+            "count": index,
+            "blocked": index % 2 == 1,
+        }
+        if model is AdsThrottleCompactEvent:
+            fields["scope_hash"] = scope_digest(fields["scope"])
+            fields["viewer_digest"] = bytes([index]) * 32
+        else:
+            fields["viewer_hash"] = f"{index:064x}"
+            fields["ip_address_hash"] = "ip"
+        model.objects.create(**fields)
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        _create_events()
+
+    def test_keyset_pages_cover_all_events_in_order(self):
+        with self.assertNumQueries(3):
+            rows = list(iter_event_rows(event_queryset(), chunk_size=1, page_size=2))
+        ids = list(AdsThrottleEvent.objects.order_by("pk").values_list("pk", flat=True))
+        self.assertEqual([row["id"] for row in rows], ids)
+
+    def test_filters(self):
+        since = timezone.now() - timedelta(days=2, hours=12)
+        queryset = event_queryset(scope="/a/", since=since, blocked=True)
+        self.assertEqual(sorted(queryset.values_list("count", flat=True)), [1])
+        until = timezone.now() - timedelta(days=3, hours=12)
+        self.assertEqual(
+            list(event_queryset(until=until).values_list("count", flat=True)), [4]
+        )
+        self.assertEqual(event_queryset(blocked=False).count(), 3)
+
+    def test_csv(self):
+        content = b"".join(export_events(event_queryset(), "csv", chunk_size=2))
+        rows = list(csv.DictReader(io.StringIO(content.decode())))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[1]["scope"], "/a/")
+        self.assertEqual(rows[1]["blocked"], "True")
+        self.assertEqual(rows[1]["viewer_hash"], f"{1:064x}")
+
+    def test_ndjson(self):
+        content = b"".join(export_events(event_queryset(), "ndjson", chunk_size=2))
+        rows = [json.loads(line) for line in content.decode().splitlines()]
+        self.assertEqual([row["count"] for row in rows], [0, 1, 2, 3, 4])
+        self.assertEqual(
+            datetime.fromisoformat(rows[0]["last_seen"]),
+            AdsThrottleEvent.objects.get(count=0).last_seen,
+        )
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            export_events(event_queryset(), "xml")
+
+    def test_parquet_requires_pyarrow(self):
+        with patch.object(export, "pyarrow", None):
+            with self.assertRaises(ImproperlyConfigured):
+                export_events(event_queryset(), "parquet")
+
+    @skipIf(export.pyarrow is None, "pyarrow is not installed")
+    def test_parquet_round_trip(self):
+        import pyarrow.parquet
+
+        content = b"".join(export_events(event_queryset(), "parquet", chunk_size=2))
+        table = pyarrow.parquet.read_table(io.BytesIO(content))
+        self.assertEqual(table.num_rows, 5)
+        self.assertEqual(table.column("count").to_pylist(), [0, 1, 2, 3, 4])
+        self.assertEqual(
+            table.column("last_seen").to_pylist()[0],
+            AdsThrottleEvent.objects.get(count=0).last_seen,
+        )
+
+
+@override_settings(ADS_THROTTLE_COMPACT_SCHEMA=True)
+class CompactExportTests(TestCase):
+    def test_digests_are_exported_as_hex(self):
+        _create_events(AdsThrottleCompactEvent, count=3)
+        rows = list(iter_event_rows(event_queryset(scope="/a/")))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["viewer_hash"], "01" * 32)
+        self.assertEqual(rows[0]["ip_address_hash"], "")
+
+
+class ExportAdminActionTests(TestCase):
+    def setUp(self):
+        _create_events(count=2)
+        self.admin = AdsThrottleEventAdmin(AdsThrottleEvent, admin.sites.AdminSite())
+        user = get_user_model().objects.create_superuser(
+            username="exporter", password="pass", email="exporter@example.com"
+        )
+        self.request = build_request(user=user)
+
+    def test_export_csv_streams_attachment(self):
+        response = self.admin.export_csv(self.request, AdsThrottleEvent.objects.all())
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertIn("adsthrottleevent.csv", response["Content-Disposition"])
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 3)
+
+    def test_export_parquet_without_pyarrow_reports_error(self):
+        with (
+            patch.object(export, "pyarrow", None),
+            patch.object(self.admin, "message_user") as message_user,
+        ):
+            response = self.admin.export_parquet(
+                self.request, AdsThrottleEvent.objects.all()
+            )
+        self.assertIsNone(response)
+        self.assertIn("pyarrow", message_user.call_args[0][1])
+
+
+class ExportCommandTests(TestCase):
+    def setUp(self):
+        _create_events()
+
+    def test_writes_ndjson_to_stdout(self):
+        stdout = StringIO()
+        call_command(
+            "ads_throttle_export_events",
+            "--format",
+            "ndjson",
+            "--scope",
+            "/b/",
+            "--unblocked",
+            stdout=stdout,
+        )
+        rows = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        self.assertEqual([row["count"] for row in rows], [0, 2, 4])
+
+    def test_writes_csv_to_file_with_date_range(self):
+        since = timezone.localdate(timezone.now() - timedelta(days=1)).isoformat()
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "events.csv"
+            call_command(
+                "ads_throttle_export_events", "--since", since, "--output", str(path)
+            )
+            rows = list(csv.DictReader(io.StringIO(path.read_text(encoding="utf-8"))))
+        self.assertEqual([row["count"] for row in rows], ["0", "1"])
+
+    def test_parquet_requires_output(self):
+        with self.assertRaisesMessage(CommandError, "--output"):
+            call_command("ads_throttle_export_events", "--format", "parquet")
+
+    def test_rejects_bad_dates(self):
+        with self.assertRaisesMessage(CommandError, "--since"):
+            call_command("ads_throttle_export_events", "--since", "yesterday")
@@ -0,0 +1,104 @@
+import hashlib
+
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from ads_throttle.hashing import (
+    Blake2bHasher,
+    Sha256Hasher,
+    get_hasher,
+    get_key_formats,
+    hash_scope,
+    hash_viewer,
+)
+from ads_throttle.models import AdsThrottleEvent
+from ads_throttle.throttling import _hash_ip, should_show_ads
+from tests.utils import build_request
+
+
+class HasherTests(SimpleTestCase):
+    def test_default_hasher_matches_sha256(self):
+        expected = hashlib.sha256(b"/page/").hexdigest()
+        self.assertIsInstance(get_hasher(), Sha256Hasher)
+        self.assertEqual(hash_scope("/page/"), expected)
+        self.assertEqual(hash_viewer("/page/"), expected)
+
+    @override_settings(ADS_THROTTLE_HASHER="blake2b", SECRET_KEY="k" * 80)
+    def test_blake2b_is_keyed_and_short(self):
+        digest = hash_viewer("user:1:127.0.0.1:ua")
+        self.assertEqual(len(digest), 32)
+        self.assertEqual(
+            digest, Blake2bHasher(key="k" * 80).hexdigest("user:1:127.0.0.1:ua")
+        )
+        self.assertNotEqual(
+            digest, Blake2bHasher(key="other").hexdigest("user:1:127.0.0.1:ua")
+        )
+
+    @override_settings(
+        ADS_THROTTLE_HASHER="blake2b",
+        ADS_THROTTLE_HASHER_OPTIONS={"digest_size": 8},
+    )
+    def test_hasher_options(self):
+        self.assertEqual(len(hash_scope("/page/")), 16)
+
+    def test_rejects_digest_longer_than_event_columns(self):
+        with self.assertRaises(ImproperlyConfigured):
+            Blake2bHasher(key="k", digest_size=64)
+
+    @override_settings(ADS_THROTTLE_HASHER="missing.Hasher")
+    def test_unknown_hasher_is_improperly_configured(self):
+        with self.assertRaises(ImproperlyConfigured):
+            get_hasher()
+
+    def test_scope_hash_is_memoized_and_reset_with_hasher(self):
+        hash_scope.cache_clear()
+        hash_scope("/a/")
+        hash_scope("/a/")
+        self.assertEqual(hash_scope.cache_info().hits, 1)
+        with override_settings(ADS_THROTTLE_HASHER="blake2b"):
+            self.assertEqual(len(hash_scope("/a/")), 32)
+        self.assertEqual(len(hash_scope("/a/")), 64)
+
+    @override_settings(ADS_THROTTLE_KEY_FORMAT=9)
+    def test_unknown_key_format_is_improperly_configured(self):
+        with self.assertRaises(ImproperlyConfigured):
+            get_key_formats()
+
+
+@override_settings(
+    ADS_VIEW_REPEAT_WINDOW_SECONDS=60,
+    ADS_VIEW_REPEAT_THRESHOLD=1,
+    ADS_BLOCK_SECONDS=60,
+    ADS_SITE_IP_REPEAT_THRESHOLD=5,
+    ADS_THROTTLE_HASHER="blake2b",
+    ADS_THROTTLE_KEY_FORMAT=2,
+)
+class ShortKeyFormatTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_short_keys_are_used_for_counters_and_blocks(self):
+        request = build_request(
+            meta={"REMOTE_ADDR": "10.0.0.1", "HTTP_USER_AGENT": "ua"}
+        )
+        self.assertTrue(should_show_ads(request, scope="/a/"))
+        self.assertFalse(should_show_ads(request, scope="/a/"))
+        keys = list(cache._cache)
+        self.assertFalse(any(":ads:" in key for key in keys))
+        scope_hash = hash_scope("/a/")
+        self.assertTrue(any(f":at2:b:{scope_hash}:" in key for key in keys))
+        self.assertIsNotNone(cache.get(f"at2:vs:{_hash_ip('10.0.0.1')[:32]}"))
+        counter_keys = [key for key in keys if ":at2:v" in key or ":at2:b" in key]
+        self.assertTrue(counter_keys)
+        self.assertTrue(all(len(key) <= 80 for key in counter_keys))
+
+    def test_events_store_short_viewer_hash(self):
+        request = build_request(
+            meta={"REMOTE_ADDR": "10.0.0.2", "HTTP_USER_AGENT": "ua"}
+        )
+        should_show_ads(request, scope="/a/")
+        should_show_ads(request, scope="/a/")
+        event = AdsThrottleEvent.objects.get()
+        self.assertEqual(len(event.viewer_hash), 32)
+        self.assertEqual(event.ip_address_hash, _hash_ip("10.0.0.2"))
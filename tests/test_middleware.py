@@ -0,0 +1,145 @@
+import time
+from unittest.mock import patch
+
+from django.core import signing
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import TestCase, override_settings
+
+from ads_throttle.hashing import hash_scope
+from ads_throttle.middleware import (
+    BLOCK_TOKEN_SALT,
+    BlockTokenMiddleware,
+    ViewerCookieMiddleware,
+    token_scope,
+)
+from ads_throttle.models import AdsThrottleOverride
+from ads_throttle.penalties import Penalty, pack_penalty
+from ads_throttle.throttling import should_show_ads
+from tests.utils import build_request
+
+
+def _view(request):
+    return HttpResponse(str(should_show_ads(request, scope="/a/")))
+
+
+@override_settings(
+    ADS_VIEW_REPEAT_WINDOW_SECONDS=60,
+    ADS_VIEW_REPEAT_THRESHOLD=1,
+    ADS_BLOCK_SECONDS=600,
+    ADS_THROTTLE_BLOCK_TOKEN_SECONDS=120,
+)
+class BlockTokenMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.middleware = BlockTokenMiddleware(_view)
+
+    def _get(self, cookies=None):
+        request = build_request(
+            meta={"REMOTE_ADDR": "10.0.0.1"}, cookies=cookies, with_session=False
+        )
+        return self.middleware(request)
+
+    def test_block_sets_token_that_skips_cache(self):
+        self.assertEqual(self._get().content, b"True")
+        response = self._get()
+        self.assertEqual(response.content, b"False")
+        cookie = response.cookies["ads_throttle_block"]
+        self.assertTrue(cookie["httponly"])
+        self.assertEqual(cookie["max-age"], 120)
+        self.assertIn("Cookie", response["Vary"])
+        with patch.object(cache, "get_many", wraps=cache.get_many) as get_many:
+            response = self._get({"ads_throttle_block": cookie.value})
+        self.assertEqual(response.content, b"False")
+        # Only the cached override decision is read; settings and counters are not.
+        get_many.assert_called_once()
+        self.assertNotIn("ads_throttle_block", response.cookies)
+
+    def _rewrite_blocks(self, value):
+        block_keys = [
+            key.split(":", 2)[2] for key in cache._cache if ":ads:block:" in key
+        ]
+        self.assertTrue(block_keys)
+        cache.set_many(dict.fromkeys(block_keys, value), timeout=600)
+
+    def test_existing_flag_block_sets_no_token(self):
+        self._get()
+        self._get()
+        self._rewrite_blocks(True)
+        response = self._get()
+        self.assertEqual(response.content, b"False")
+        self.assertNotIn("ads_throttle_block", response.cookies)
+
+    def test_existing_penalty_token_ends_with_the_block(self):
+        self._get()
+        self._get()
+        now = int(time.time())
+        self._rewrite_blocks(pack_penalty(Penalty(1, now + 45, now + 45)))
+        with patch("time.time", return_value=now):
+            response = self._get()
+        self.assertEqual(response.content, b"False")
+        self.assertEqual(response.cookies["ads_throttle_block"]["max-age"], 45)
+
+    def test_show_override_wins_over_token(self):
+        self._get()
+        cookie = self._get().cookies["ads_throttle_block"]
+        with self.captureOnCommitCallbacks(execute=True):
+            AdsThrottleOverride.objects.create(scope="/a/", force_show=True)
+        decisions = [
+            self._get({"ads_throttle_block": cookie.value}).content for _ in range(3)
+        ]
+        self.assertEqual(decisions, [b"True"] * 3)
+
+    def test_show_decision_sets_no_token(self):
+        response = self._get()
+        self.assertEqual(response.content, b"True")
+        self.assertNotIn("ads_throttle_block", response.cookies)
+
+    def test_tampered_token_falls_back_to_cache(self):
+        token = signing.dumps({token_scope(hash_scope("/a/")): 2**40}, salt="other")
+        self.assertEqual(self._get({"ads_throttle_block": token}).content, b"True")
+
+    def test_expired_token_falls_back_to_cache(self):
+        token = signing.dumps(
+            {token_scope(hash_scope("/a/")): 1000}, salt=BLOCK_TOKEN_SALT
+        )
+        self.assertEqual(self._get({"ads_throttle_block": token}).content, b"True")
+
+    def test_token_for_other_scope_is_ignored(self):
+        token = signing.dumps(
+            {token_scope(hash_scope("/b/")): 2**40}, salt=BLOCK_TOKEN_SALT
+        )
+        self.assertEqual(self._get({"ads_throttle_block": token}).content, b"True")
+
+
+@override_settings(ADS_THROTTLE_IDENTITY_MODE="signed_cookie")
+class ViewerCookieMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.middleware = ViewerCookieMiddleware(_view)
+
+    def _get(self, cookies=None, view=None):
+        middleware = ViewerCookieMiddleware(view) if view else self.middleware
+        request = build_request(
+            meta={"REMOTE_ADDR": "10.0.0.1"}, cookies=cookies, with_session=False
+        )
+        return request, middleware(request)
+
+    def test_new_viewer_gets_cookie_that_is_reused(self):
+        request, response = self._get()
+        cookie = response.cookies["ads_throttle_viewer"]
+        self.assertTrue(cookie["httponly"])
+        self.assertIn("Cookie", response["Vary"])
+        viewer = request._ads_throttle_viewer
+        request, response = self._get({"ads_throttle_viewer": cookie.value})
+        self.assertEqual(request._ads_throttle_viewer, viewer)
+        self.assertNotIn("ads_throttle_viewer", response.cookies)
+
+    def test_tampered_cookie_is_replaced(self):
+        request, response = self._get({"ads_throttle_viewer": "abc:forged"})
+        self.assertNotEqual(request._ads_throttle_viewer, "abc")
+        self.assertIn("ads_throttle_viewer", response.cookies)
+
+    def test_no_cookie_when_throttle_not_used(self):
+        _, response = self._get(view=lambda request: HttpResponse())
+        self.assertNotIn("ads_throttle_viewer", response.cookies)
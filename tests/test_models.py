@@ -16,6 +16,8 @@ class SiteSettingTests(TestCase):
             view_repeat_window_seconds=123,
             view_repeat_threshold=7,
             block_seconds=321,
+            ip_repeat_threshold=40,
+            site_ip_repeat_threshold=200,
             event_record_seconds=11,
         )
         cache_key = "ads_throttle:settings"
@@ -26,6 +28,8 @@ class SiteSettingTests(TestCase):
                 "view_repeat_window_seconds": setting.view_repeat_window_seconds,
                 "view_repeat_threshold": setting.view_repeat_threshold,
                 "block_seconds": setting.block_seconds,
+                "ip_repeat_threshold": setting.ip_repeat_threshold,
+                "site_ip_repeat_threshold": setting.site_ip_repeat_threshold,
                 "event_record_seconds": setting.event_record_seconds,
             },
         )
@@ -0,0 +1,203 @@
+import json
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.core.signals import request_finished
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from ads_throttle import overrides
+from ads_throttle.hashing import hash_viewer
+from ads_throttle.models import AdsThrottleCompactOverride, AdsThrottleOverride
+from ads_throttle.overrides import (
+    batched_invalidation,
+    create_overrides,
+    get_override_generation,
+    sweep_expired_overrides,
+)
+from ads_throttle.throttling import (
+    _get_override_decision,
+    _hash_ip,
+    _viewer_fingerprint,
+    should_show_ads,
+)
+from tests.utils import build_request
+
+
+class CreateOverridesTests(TestCase):
+    def test_dedupes_input_and_active_rows(self):
+        AdsThrottleOverride.objects.create(
+            ip_address_hash=_hash_ip("1.1.1.1"), force_block=True
+        )
+        created = create_overrides(
+            ip_address_hashes=[_hash_ip("1.1.1.1"), _hash_ip("2.2.2.2")] * 2,
+            viewer_ids=["user:1", "user:1"],
+            chunk_size=1,
+        )
+        self.assertEqual(created, 2)
+        self.assertEqual(AdsThrottleOverride.objects.count(), 3)
+
+    def test_show_override_is_not_deduped_against_block(self):
+        create_overrides(viewer_ids=["user:1"])
+        self.assertEqual(create_overrides(viewer_ids=["user:1"], force_block=False), 1)
+
+    def test_uses_bulk_create(self):
+        ip_hashes = [_hash_ip(f"10.0.0.{index}") for index in range(5)]
+        with self.assertNumQueries(4):
+            create_overrides(ip_address_hashes=ip_hashes, scope="/a/")
+
+    @override_settings(ADS_THROTTLE_COMPACT_SCHEMA=True)
+    def test_compact_schema(self):
+        create_overrides(ip_address_hashes=[_hash_ip("1.1.1.1")], scope="/a/")
+        self.assertEqual(
+            create_overrides(ip_address_hashes=[_hash_ip("1.1.1.1")], scope="/a/"), 0
+        )
+        override = AdsThrottleCompactOverride.objects.get()
+        self.assertEqual(override.ip_address_hash, _hash_ip("1.1.1.1"))
+        self.assertEqual(override.scope, "/a/")
+
+
+class OverrideInvalidationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_bulk_import_bumps_generation_once(self):
+        with patch("ads_throttle.overrides.bump_override_generation") as bump:
+            with self.captureOnCommitCallbacks(execute=True):
+                create_overrides(viewer_ids=["user:1", "user:2", "user:3"])
+            bump.assert_called_once_with()
+            bump.reset_mock()
+            with self.captureOnCommitCallbacks(execute=True):
+                with batched_invalidation():
+                    AdsThrottleOverride.objects.all().delete()
+            bump.assert_called_once_with()
+
+    def test_save_invalidates_cached_decision(self):
+        ip_hash = _hash_ip("1.2.3.4")
+        self.assertIsNone(_get_override_decision(None, "", ip_hash, "/a/"))
+        with self.captureOnCommitCallbacks(execute=True):
+            AdsThrottleOverride.objects.create(
+                ip_address_hash=ip_hash, force_block=True
+            )
+        self.assertIsNotNone(get_override_generation())
+        self.assertEqual(_get_override_decision(None, "", ip_hash, "/a/"), "block")
+
+    def test_fingerprint_override_blocks_viewer(self):
+        request = build_request("/a/", meta={"REMOTE_ADDR": "1.2.3.4"})
+        viewer_hash = hash_viewer(_viewer_fingerprint(request))
+        self.assertTrue(should_show_ads(request))
+        with self.captureOnCommitCallbacks(execute=True):
+            create_overrides(viewer_ids=[f"fingerprint:{viewer_hash}"])
+        self.assertFalse(should_show_ads(request))
+
+
+class ImportOverridesCommandTests(TestCase):
+    def _import(self, lines, *args):
+        with tempfile.NamedTemporaryFile("w", suffix=".txt") as handle:
+            handle.write("\n".join(lines))
+            handle.flush()
+            stdout = StringIO()
+            call_command(
+                "ads_throttle_import_overrides", handle.name, *args, stdout=stdout
+            )
+        return stdout.getvalue()
+
+    def test_imports_ips_and_viewer_ids(self):
+        output = self._import(
+            ["# blocklist", "", "1.1.1.1", "2001:db8::1", "session:abc", "nope"],
+            "--scope",
+            "/a/",
+            "--expires-in",
+            "60",
+        )
+        self.assertIn("created=3 existing=0 invalid=1", output)
+        self.assertTrue(
+            AdsThrottleOverride.objects.filter(
+                scope="/a/", ip_address_hash=_hash_ip("2001:db8::1"), force_block=True
+            ).exists()
+        )
+        self.assertFalse(
+            AdsThrottleOverride.objects.filter(expires_at__isnull=True).exists()
+        )
+        output = self._import(["1.1.1.1", "session:abc"], "--scope", "/a/")
+        self.assertIn("created=0 existing=2 invalid=0", output)
+
+    def test_show_action(self):
+        self._import(["user:7"], "--action", "show")
+        override = AdsThrottleOverride.objects.get()
+        self.assertTrue(override.force_show)
+        self.assertFalse(override.force_block)
+
+    def test_rejects_relative_scope(self):
+        with self.assertRaisesMessage(CommandError, "Scope must be empty"):
+            self._import(["1.1.1.1"], "--scope", "a/")
+
+
+class SweepExpiredOverridesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        past = timezone.now() - timedelta(hours=1)
+        AdsThrottleOverride.objects.bulk_create(
+            [
+                AdsThrottleOverride(viewer_id=f"user:{index}", expires_at=past)
+                for index in range(5)
+            ]
+            + [
+                AdsThrottleOverride(viewer_id="user:active"),
+                AdsThrottleOverride(
+                    viewer_id="user:later", expires_at=past + timedelta(days=1)
+                ),
+            ]
+        )
+        AdsThrottleCompactOverride.objects.create(viewer_id="user:c", expires_at=past)
+
+    def test_deletes_expired_rows_in_batches(self):
+        self.assertEqual(sweep_expired_overrides(batch_size=2), 6)
+        self.assertEqual(
+            set(AdsThrottleOverride.objects.values_list("viewer_id", flat=True)),
+            {"user:active", "user:later"},
+        )
+        self.assertFalse(AdsThrottleCompactOverride.objects.exists())
+
+    def test_sweep_keeps_override_generation(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            sweep_expired_overrides()
+        self.assertIsNone(get_override_generation())
+
+    def test_max_batches_and_grace(self):
+        self.assertEqual(sweep_expired_overrides(batch_size=2, max_batches=1), 2)
+        self.assertEqual(sweep_expired_overrides(grace_seconds=7200), 0)
+
+    def test_command_archives_deleted_rows(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "archive.ndjson")
+            stdout = StringIO()
+            call_command(
+                "ads_throttle_sweep_overrides", "--archive", path, stdout=stdout
+            )
+            with open(path, encoding="utf-8") as handle:
+                rows = [json.loads(line) for line in handle]
+        self.assertIn("deleted=6", stdout.getvalue())
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[0]["model"], "ads_throttle.AdsThrottleOverride")
+        self.assertEqual(rows[-1]["viewer_id"], "user:c")
+
+    @override_settings(ADS_THROTTLE_OVERRIDE_SWEEP_SECONDS=60)
+    @patch.object(overrides, "_next_sweep_at", 0.0)
+    def test_request_finished_hook_runs_once_per_interval(self):
+        request_finished.send(sender=None)
+        self.assertEqual(AdsThrottleOverride.objects.count(), 2)
+        AdsThrottleOverride.objects.update(expires_at=timezone.now())
+        with patch.object(cache, "add") as add:
+            request_finished.send(sender=None)
+        add.assert_not_called()
+        self.assertEqual(AdsThrottleOverride.objects.count(), 2)
+        # The cache key still holds the interval for every process.
+        overrides._next_sweep_at = 0.0
+        request_finished.send(sender=None)
+        self.assertEqual(AdsThrottleOverride.objects.count(), 2)
@@ -0,0 +1,84 @@
+import time
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from ads_throttle.penalties import (
+    Penalty,
+    is_blocking,
+    next_penalty,
+    pack_penalty,
+    unpack_penalty,
+)
+from ads_throttle.throttling import should_show_ads
+from tests.utils import build_request
+
+ESCALATION = {
+    "ADS_THROTTLE_ESCALATION_FACTOR": 2,
+    "ADS_THROTTLE_ESCALATION_MAX_SECONDS": 35,
+    "ADS_THROTTLE_ESCALATION_DECAY_SECONDS": 100,
+}
+
+
+class PenaltyTests(SimpleTestCase):
+    def test_pack_round_trip(self):
+        penalty = Penalty(3, 1_800_000_000, 1_800_086_400)
+        self.assertEqual(unpack_penalty(pack_penalty(penalty)), penalty)
+        self.assertTrue(is_blocking(pack_penalty(penalty), 1_799_999_999))
+        self.assertFalse(is_blocking(pack_penalty(penalty), 1_800_000_000))
+
+    def test_plain_flags_still_block(self):
+        self.assertIsNone(unpack_penalty(True))
+        self.assertTrue(is_blocking(True, time.time()))
+        self.assertTrue(is_blocking(1, time.time()))
+        self.assertFalse(is_blocking(None, time.time()))
+
+    @override_settings(**ESCALATION)
+    def test_duration_doubles_until_cap_and_resets_after_decay(self):
+        now = 1_800_000_000
+        durations = []
+        previous = None
+        for _ in range(4):
+            penalty = next_penalty(previous, now, 10)
+            durations.append(penalty.block_until - now)
+            previous = pack_penalty(penalty)
+        self.assertEqual(durations, [10, 20, 35, 35])
+        self.assertEqual(unpack_penalty(previous).strikes, 4)
+        later = unpack_penalty(previous).decay_until
+        self.assertEqual(next_penalty(previous, later, 10).strikes, 1)
+
+
+@override_settings(
+    ADS_VIEW_REPEAT_WINDOW_SECONDS=5,
+    ADS_VIEW_REPEAT_THRESHOLD=1,
+    ADS_BLOCK_SECONDS=10,
+    **ESCALATION,
+)
+class EscalationThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.now = time.time()
+        patcher = patch("time.time", side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _decisions(self, count):
+        request = build_request("/a/", with_session=False)
+        return [should_show_ads(request) for _ in range(count)]
+
+    def test_repeat_offender_blocked_longer(self):
+        self.assertEqual(self._decisions(3), [True, False, False])
+        self.now += 11
+        self.assertEqual(self._decisions(2), [True, False])
+        self.now += 11
+        self.assertEqual(self._decisions(1), [False])
+        self.now += 10
+        self.assertEqual(self._decisions(1), [True])
+
+    def test_strikes_reset_after_decay(self):
+        self.assertEqual(self._decisions(2), [True, False])
+        self.now += 111
+        self.assertEqual(self._decisions(2), [True, False])
+        self.now += 11
+        self.assertEqual(self._decisions(1), [True])
@@ -0,0 +1,144 @@
+import threading
+from unittest.mock import patch
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.test import SimpleTestCase, override_settings
+from django.utils.functional import SimpleLazyObject
+
+from ads_throttle.context_processors import ads
+from ads_throttle.prefetch import DecisionPrefetchMiddleware
+from ads_throttle.templatetags.ads_throttle_tags import should_show_ads_filter
+from tests.utils import build_request
+
+
+def _sidebar_scopes(request):
+    return [request.path, "/sidebar/"]
+
+
+@override_settings(ADS_THROTTLE_PREFETCH_PATH_PREFIXES=["/articles/"])
+class DecisionPrefetchMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        patcher = patch("ads_throttle.prefetch.should_show_ads", return_value=False)
+        self.decide = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def _render(self, request, template_call):
+        async def view(request):
+            return HttpResponse(str(await sync_to_async(template_call)(request)))
+
+        return await DecisionPrefetchMiddleware(view)(request)
+
+    async def test_template_uses_prefetched_decision(self):
+        request = build_request("/articles/", with_session=False)
+        with patch(
+            "ads_throttle.templatetags.ads_throttle_tags.should_show_ads"
+        ) as direct:
+            response = await self._render(request, should_show_ads_filter)
+        self.assertEqual(response.content, b"False")
+        self.decide.assert_called_once_with(request, "/articles/")
+        direct.assert_not_called()
+
+    async def test_context_processor_uses_prefetched_decision(self):
+        request = build_request("/articles/", with_session=False)
+        with patch("ads_throttle.context_processors.should_show_ads") as direct:
+            response = await self._render(request, lambda r: ads(r)["show_ads"])
+        self.assertEqual(response.content, b"False")
+        direct.assert_not_called()
+
+    @override_settings(
+        ADS_THROTTLE_PREFETCH_SCOPES="tests.test_prefetch._sidebar_scopes"
+    )
+    async def test_callable_resolves_scopes(self):
+        request = build_request("/articles/", with_session=False)
+        await self._render(request, lambda r: should_show_ads_filter(r, "/sidebar/"))
+        self.assertEqual(
+            set(request._ads_throttle_prefetch), {"/articles/", "/sidebar/"}
+        )
+        self.assertEqual(self.decide.call_count, 2)
+
+    @override_settings(ADS_THROTTLE_FAIL_OPEN_DECISION=True)
+    async def test_pending_decision_is_not_decided_again_on_event_loop(self):
+        release = threading.Event()
+
+        def slow_decision(request, scope):
+            release.wait(5)
+            return False
+
+        self.decide.side_effect = slow_decision
+        request = build_request("/articles/", with_session=False)
+
+        async def view(request):
+            try:
+                return HttpResponse(str(should_show_ads_filter(request)))
+            finally:
+                release.set()
+
+        with patch(
+            "ads_throttle.templatetags.ads_throttle_tags.should_show_ads"
+        ) as direct:
+            response = await DecisionPrefetchMiddleware(view)(request)
+            await request._ads_throttle_prefetch["/articles/"]
+        self.assertEqual(response.content, b"True")
+        self.decide.assert_called_once()
+        direct.assert_not_called()
+
+    async def test_user_is_loaded_before_decision_starts(self):
+        threads = {}
+
+        def load_user():
+            threads["user"] = threading.get_ident()
+            return AnonymousUser()
+
+        def decide(request, scope):
+            threads["decide_saw_user"] = "user" in threads
+            return False
+
+        self.decide.side_effect = decide
+        request = build_request("/articles/", with_session=False)
+        request.user = SimpleLazyObject(load_user)
+        await self._render(request, should_show_ads_filter)
+        self.assertTrue(threads["decide_saw_user"])
+
+    @override_settings(ADS_THROTTLE_IDENTITY_MODE="cookie")
+    async def test_cookie_mode_does_not_load_user(self):
+        request = build_request("/articles/", with_session=False)
+        loaded = []
+        request.user = SimpleLazyObject(lambda: loaded.append(1) or AnonymousUser())
+        with patch("ads_throttle.prefetch._user_overrides_exist", return_value=False):
+            await self._render(request, should_show_ads_filter)
+        self.assertEqual(loaded, [])
+
+    async def test_skips_paths_not_opted_in(self):
+        request = build_request("/search/", with_session=False)
+        await self._render(request, lambda r: None)
+        self.assertEqual(request._ads_throttle_prefetch, {})
+        self.decide.assert_not_called()
+
+    @override_settings(
+        ADS_THROTTLE_PREFETCH_PATH_PREFIXES=[],
+        ADS_THROTTLE_PREFETCH_SCOPES="tests.test_prefetch._sidebar_scopes",
+    )
+    async def test_resolver_opts_in_without_path_prefixes(self):
+        request = build_request("/search/", with_session=False)
+        await self._render(request, lambda r: None)
+        self.assertEqual(set(request._ads_throttle_prefetch), {"/search/", "/sidebar/"})
+
+    async def test_skips_non_get_requests(self):
+        request = build_request("/articles/", with_session=False)
+        request.method = "POST"
+        with patch(
+            "ads_throttle.templatetags.ads_throttle_tags.should_show_ads",
+            return_value=True,
+        ) as direct:
+            response = await self._render(request, should_show_ads_filter)
+        self.assertEqual(response.content, b"True")
+        self.decide.assert_not_called()
+        direct.assert_called_once()
+
+    def test_sync_requests_pass_through(self):
+        request = build_request("/articles/", with_session=False)
+        response = DecisionPrefetchMiddleware(lambda r: HttpResponse("ok"))(request)
+        self.assertEqual(response.content, b"ok")
+        self.assertFalse(hasattr(request, "_ads_throttle_prefetch"))
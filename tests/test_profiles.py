@@ -0,0 +1,76 @@
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from ads_throttle.models import ScopeProfile, SiteSetting
+from ads_throttle.profiles import ProfileTable
+from ads_throttle.throttling import _get_settings_values, should_show_ads
+from tests.utils import build_request
+
+
+class ProfileTableTests(SimpleTestCase):
+    def setUp(self):
+        self.table = ProfileTable(
+            [
+                ScopeProfile(scope="/a/", match="prefix", view_repeat_threshold=1),
+                ScopeProfile(scope="/a/b/", match="prefix", view_repeat_threshold=2),
+                ScopeProfile(scope="/a/b/c/", view_repeat_threshold=3),
+            ]
+        )
+
+    def test_exact_then_longest_prefix(self):
+        self.assertEqual(self.table.lookup("/a/b/c/"), {"view_repeat_threshold": 3})
+        self.assertEqual(self.table.lookup("/a/b/c/d/"), {"view_repeat_threshold": 2})
+        self.assertEqual(self.table.lookup("/a/x/"), {"view_repeat_threshold": 1})
+        self.assertEqual(self.table.lookup("/b/"), {})
+
+    def test_blank_limits_fall_back(self):
+        values = {"view_repeat_threshold": 20, "block_seconds": 60}
+        self.assertEqual(
+            self.table.apply(values, "/a/"),
+            {"view_repeat_threshold": 1, "block_seconds": 60},
+        )
+        self.assertIs(self.table.apply(values, "/b/"), values)
+
+    def test_scope_must_be_a_path(self):
+        with self.assertRaises(ValidationError):
+            ScopeProfile(scope="landing").clean()
+
+
+@override_settings(ADS_VIEW_REPEAT_THRESHOLD=3)
+class ScopeProfileThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_profile_limits_apply_to_matching_scopes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            ScopeProfile.objects.create(
+                scope="/landing/", match="prefix", view_repeat_threshold=1
+            )
+        request = build_request("/", with_session=False)
+        self.assertEqual(
+            [should_show_ads(request, "/landing/spring/") for _ in range(2)],
+            [True, False],
+        )
+        self.assertEqual(
+            [should_show_ads(request, "/articles/") for _ in range(4)],
+            [True, True, True, False],
+        )
+
+    def test_compiled_once_and_reloaded_on_save(self):
+        SiteSetting.objects.create()
+        with self.captureOnCommitCallbacks(execute=True):
+            profile = ScopeProfile.objects.create(
+                scope="/landing/", view_repeat_threshold=5
+            )
+        self.assertEqual(_get_settings_values("/landing/")["view_repeat_threshold"], 5)
+        with self.assertNumQueries(0):
+            values = _get_settings_values("/landing/")
+        self.assertEqual(values["view_repeat_threshold"], 5)
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.view_repeat_threshold = 7
+            profile.save()
+        self.assertEqual(_get_settings_values("/landing/")["view_repeat_threshold"], 7)
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.delete()
+        self.assertEqual(_get_settings_values("/landing/")["view_repeat_threshold"], 20)
@@ -0,0 +1,65 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, override_settings
+
+from ads_throttle.proxies import trusted_networks
+from ads_throttle.throttling import _get_client_ip
+from tests.utils import build_request
+
+PROXIES = ["10.0.0.0/8", "2001:db8::/32"]
+
+
+@override_settings(ADS_THROTTLE_TRUSTED_PROXIES=PROXIES)
+class TrustedProxyTests(SimpleTestCase):
+    def _client_ip(self, remote_addr, **meta):
+        request = build_request(
+            meta={"REMOTE_ADDR": remote_addr, **meta}, with_session=False
+        )
+        return _get_client_ip(request)
+
+    def test_walks_forwarded_chain_from_the_right(self):
+        self.assertEqual(
+            self._client_ip(
+                "10.0.0.2",
+                HTTP_X_FORWARDED_FOR="6.6.6.6, 1.2.3.4, 10.0.0.1",
+            ),
+            "1.2.3.4",
+        )
+
+    def test_spoofed_entries_do_not_change_the_client(self):
+        results = {
+            self._client_ip("10.0.0.2", HTTP_X_FORWARDED_FOR=f"{spoofed}, 1.2.3.4")
+            for spoofed in ("5.5.5.5", "7.7.7.7", "garbage")
+        }
+        self.assertEqual(results, {"1.2.3.4"})
+
+    def test_headers_ignored_from_untrusted_peer(self):
+        self.assertEqual(
+            self._client_ip("8.8.8.8", HTTP_X_FORWARDED_FOR="1.2.3.4"), "8.8.8.8"
+        )
+
+    def test_all_trusted_chain_and_ipv6(self):
+        self.assertEqual(
+            self._client_ip("10.0.0.2", HTTP_X_FORWARDED_FOR="10.0.0.9"), "10.0.0.9"
+        )
+        self.assertEqual(
+            self._client_ip(
+                "2001:db8::1", HTTP_X_FORWARDED_FOR="2001:0db8:0:0::2, 2a00::1"
+            ),
+            "2a00::1",
+        )
+
+    @override_settings(ADS_THROTTLE_IP_HEADER="X-Client-IP")
+    def test_custom_header_from_trusted_peer(self):
+        self.assertEqual(
+            self._client_ip(
+                "10.0.0.2",
+                HTTP_X_CLIENT_IP="1.2.3.4",
+                HTTP_X_FORWARDED_FOR="9.9.9.9",
+            ),
+            "1.2.3.4",
+        )
+
+    @override_settings(ADS_THROTTLE_TRUSTED_PROXIES=["10.0.0.0/33"])
+    def test_invalid_network_is_rejected(self):
+        with self.assertRaises(ImproperlyConfigured):
+            trusted_networks()
@@ -0,0 +1,81 @@
+from unittest.mock import patch
+
+from django.core.cache import caches
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from ads_throttle.counters import incr_many
+from ads_throttle.sharding import HashRing, ShardedCache, routing_token
+from ads_throttle.throttling import _counter_cache, should_show_ads
+from tests.utils import build_request
+
+SHARDED_CACHES = {
+    alias: {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": f"sharding-{alias}",
+    }
+    for alias in ("default", "a", "b", "c")
+}
+
+
+class HashRingTests(SimpleTestCase):
+    def test_routing_token_ignores_sub_key_suffixes(self):
+        key = "ads:views:scope:viewer"
+        self.assertEqual(routing_token(key), "viewer")
+        self.assertEqual(routing_token(f"{key}:hot"), "viewer")
+        self.assertEqual(routing_token(f"{key}:3"), "viewer")
+        self.assertEqual(routing_token("ads:block:scope:viewer"), "viewer")
+
+    def test_adding_alias_moves_only_its_share_of_keys(self):
+        keys = [f"ads:views:s:{index:064x}" for index in range(3000)]
+        before = HashRing(["a", "b", "c"])
+        after = HashRing(["a", "b", "c", "d"])
+        moved = [key for key in keys if before.alias_for(key) != after.alias_for(key)]
+        self.assertTrue({after.alias_for(key) for key in moved} <= {"d"})
+        self.assertLess(len(moved) / len(keys), 0.35)
+        counts = {alias: 0 for alias in "abc"}
+        for key in keys:
+            counts[before.alias_for(key)] += 1
+        self.assertGreater(min(counts.values()), 800)
+
+
+@override_settings(CACHES=SHARDED_CACHES)
+class ShardedCacheTests(SimpleTestCase):
+    def setUp(self):
+        for alias in SHARDED_CACHES:
+            caches[alias].clear()
+        self.cache = ShardedCache(["a", "b", "c"])
+        self.keys = [f"ads:block:s:{index:064x}" for index in range(30)]
+
+    def test_batches_one_call_per_shard(self):
+        self.cache.set_many(dict.fromkeys(self.keys, True), timeout=60)
+        self.assertTrue(all(caches[alias].get_many(self.keys) for alias in "abc"))
+        with patch.object(caches["a"], "get_many", wraps=caches["a"].get_many) as a:
+            self.assertEqual(len(self.cache.get_many(self.keys)), 30)
+        a.assert_called_once()
+
+    def test_incr_many_keeps_key_order(self):
+        keys = [self.keys[0], self.keys[1], self.keys[0]]
+        self.assertEqual(incr_many(self.cache, keys, 60), [1, 1, 2])
+        self.assertEqual(self.cache.get(self.keys[0]), 2)
+
+
+@override_settings(
+    CACHES=SHARDED_CACHES,
+    ADS_THROTTLE_COUNTER_CACHE=["a", "b", "c"],
+    ADS_VIEW_REPEAT_THRESHOLD=2,
+)
+class ShardedThrottleTests(TestCase):
+    def setUp(self):
+        for alias in SHARDED_CACHES:
+            caches[alias].clear()
+
+    def test_viewer_blocked_across_shards(self):
+        request = build_request("/a/", with_session=False)
+        self.assertEqual(
+            [should_show_ads(request) for _ in range(3)], [True, True, False]
+        )
+        self.assertIsInstance(_counter_cache(), ShardedCache)
+        self.assertFalse([key for key in caches["default"]._cache if ":ads:" in key])
+        self.assertTrue(
+            any(":ads:block:" in key for alias in "abc" for key in caches[alias]._cache)
+        )
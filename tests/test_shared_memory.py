@@ -0,0 +1,112 @@
+import multiprocessing
+import time
+import uuid
+
+from django.core.cache import cache, caches
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from ads_throttle.counters import incr_many
+from ads_throttle.shared_memory import SharedMemoryCache
+from ads_throttle.throttling import should_show_ads
+from tests.utils import build_request
+
+
+def _shared_cache(name, **options):
+    return SharedMemoryCache(name, {"OPTIONS": {"slots": 256, "stripes": 8, **options}})
+
+
+def _count(name, key, times):
+    counters = _shared_cache(name)
+    for _ in range(times):
+        incr_many(counters, [key], 60)
+
+
+class SharedMemoryCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.name = f"at_test_{uuid.uuid4().hex[:12]}"
+        self.cache = _shared_cache(self.name)
+        self.addCleanup(self.cache.unlink)
+
+    def test_basic_operations(self):
+        self.assertTrue(self.cache.add("a", 1, 60))
+        self.assertFalse(self.cache.add("a", 5, 60))
+        self.assertEqual(self.cache.incr("a", 2), 3)
+        self.cache.set("b", True, 60)
+        self.assertEqual(self.cache.get_many(["a", "b", "c"]), {"a": 3, "b": 1})
+        self.assertTrue(self.cache.delete("a"))
+        self.assertIsNone(self.cache.get("a"))
+        with self.assertRaises(ValueError):
+            self.cache.incr("a")
+        self.cache.clear()
+        self.assertFalse(self.cache.has_key("b"))
+
+    def test_expired_records_are_missing_and_reused(self):
+        self.cache.set("a", 7, 0.05)
+        self.assertTrue(self.cache.touch("a", 0.05))
+        time.sleep(0.06)
+        self.assertIsNone(self.cache.get("a"))
+        self.assertTrue(self.cache.add("a", 1, 60))
+        self.assertGreater(list(self.cache.live_records())[0], 59)
+
+    def test_full_probe_sequence_reuses_least_recently_used_slot(self):
+        small = _shared_cache(f"{self.name}_lru", slots=4, stripes=1, probe_length=4)
+        self.addCleanup(small.unlink)
+        for key in "abcd":
+            small.set(key, 1, None)
+        small.get("a")
+        small.set("e", 1, None)
+        self.assertEqual(
+            {key for key in "abcde" if small.has_key(key)}, {"a", "c", "d", "e"}
+        )
+
+    def test_counts_are_exact_across_processes(self):
+        context = multiprocessing.get_context("fork")
+        processes = [
+            context.Process(target=_count, args=(self.name, "hits", 200))
+            for _ in range(4)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        self.assertEqual(self.cache.get("hits"), 800)
+
+    def test_rejects_different_layout(self):
+        self.cache.set("a", 1)
+        with self.assertRaisesMessage(ImproperlyConfigured, "different layout"):
+            _shared_cache(self.name, slots=512).get("a")
+
+    def test_rejects_uneven_stripes(self):
+        with self.assertRaises(ImproperlyConfigured):
+            _shared_cache(self.name, slots=100, stripes=8)
+
+
+class SharedMemoryCounterCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        name = f"at_test_{uuid.uuid4().hex[:12]}"
+        caches_setting = override_settings(
+            CACHES={
+                "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+                "counters": {
+                    "BACKEND": "ads_throttle.shared_memory.SharedMemoryCache",
+                    "LOCATION": name,
+                    "OPTIONS": {"slots": 256, "stripes": 8},
+                },
+            },
+            ADS_THROTTLE_COUNTER_CACHE="counters",
+            ADS_VIEW_REPEAT_THRESHOLD=2,
+        )
+        caches_setting.enable()
+        self.addCleanup(caches_setting.disable)
+        self.addCleanup(lambda: caches["counters"].unlink())
+
+    def test_counters_live_in_counter_cache(self):
+        request = build_request("/a/", with_session=False)
+        self.assertEqual(
+            [should_show_ads(request) for _ in range(3)], [True, True, False]
+        )
+        # The viewer counter and its block flag.
+        self.assertEqual(len(list(caches["counters"].live_records())), 2)
+        self.assertFalse([key for key in cache._cache if ":ads:" in key])
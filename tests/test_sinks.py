@@ -0,0 +1,246 @@
+import json
+import tempfile
+from datetime import timedelta
+import os
+import time
+from io import StringIO
+from pathlib import Path
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from ads_throttle.breaker import STATE_CLOSED, get_breaker, reset_breakers
+from ads_throttle.management.commands import ads_throttle_load_events
+from ads_throttle.models import AdsThrottleEvent
+from ads_throttle.sinks import (
+    EventSink,
+    FileEventSink,
+    closed_event_files,
+    get_event_sink,
+    read_event_file,
+)
+from ads_throttle.throttling import should_show_ads
+from tests.utils import build_request
+
+
+class FailingSink(EventSink):
+    def record(self, scope_value, viewer_hash, ip_address_hash, blocked):
+        raise OSError("disk full")
+
+
+class FileEventSinkTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_buffers_until_threshold(self):
+        sink = FileEventSink(self.directory, buffer_bytes=10_000, flush_seconds=60)
+        sink.record("/a/", "viewer", "ip", True)
+        self.assertEqual(list(self.directory.iterdir()), [])
+        sink.close()
+        [path] = closed_event_files(self.directory)
+        [event] = read_event_file(path)
+        self.assertEqual(event["s"], "/a/")
+        self.assertEqual(event["v"], "viewer")
+        self.assertEqual(event["i"], "ip")
+        self.assertEqual(event["b"], 1)
+
+    def test_idle_sink_flushes_on_timer(self):
+        sink = FileEventSink(self.directory, buffer_bytes=10_000, flush_seconds=0.05)
+        sink.record("/a/", "viewer", "ip", True)
+        deadline = time.monotonic() + 5
+        while not list(self.directory.glob("*.part")) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        [active] = self.directory.glob("*.part")
+        self.assertEqual(len(list(read_event_file(active))), 1)
+        sink.close()
+
+    def test_rotates_by_size(self):
+        sink = FileEventSink(self.directory, max_bytes=1, buffer_bytes=1)
+        sink.record("/a/", "v1", "", True)
+        sink.record("/a/", "v2", "", True)
+        self.assertEqual(len(closed_event_files(self.directory)), 1)
+        self.assertEqual(len(list(self.directory.glob("*.part"))), 1)
+        sink.close()
+        self.assertEqual(len(closed_event_files(self.directory)), 2)
+
+    def test_idle_sink_rotates_on_time_check(self):
+        sink = FileEventSink(self.directory, max_seconds=60, buffer_bytes=1)
+        sink.record("/a/", "v1", "", True)
+        self.assertEqual(closed_event_files(self.directory), [])
+        with patch("time.monotonic", return_value=time.monotonic() + 61):
+            sink.flush()
+        self.assertEqual(len(closed_event_files(self.directory)), 1)
+        self.assertEqual(list(self.directory.glob("*.part")), [])
+
+    def test_stale_part_files_are_claimed(self):
+        old = self.directory / "events-otherhost-1-1.part"
+        old.write_text("{}\n")
+        os.utime(old, (time.time() - 120, time.time() - 120))
+        fresh = self.directory / "events-otherhost-2-1.part"
+        fresh.write_text("{}\n")
+        self.assertEqual(closed_event_files(self.directory), [])
+        self.assertEqual(
+            [path.name for path in closed_event_files(self.directory, 60)],
+            ["events-otherhost-1-1.ndjson"],
+        )
+        self.assertTrue(fresh.exists())
+
+    def test_part_file_of_dead_process_is_claimed(self):
+        sink = FileEventSink(self.directory, buffer_bytes=1)
+        sink.record("/a/", "v1", "", True)
+        [active] = self.directory.glob("*.part")
+        self.assertEqual(closed_event_files(self.directory, 3600), [])
+        with patch("ads_throttle.sinks._pid_running", return_value=False):
+            self.assertEqual(len(closed_event_files(self.directory, 3600)), 1)
+        # The sink notices its file was claimed and starts a new one.
+        sink.record("/a/", "v2", "", True)
+        sink.close()
+        self.assertEqual(len(closed_event_files(self.directory)), 2)
+
+    def test_reader_skips_damaged_lines(self):
+        path = self.directory / "events.ndjson"
+        path.write_text('{"s":"/","v":"x","t":1}\nnot json\n{"s":"/"}\n')
+        self.assertEqual(len(list(read_event_file(path))), 1)
+
+
+class FileEventSinkIntegrationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        get_event_sink.cache_clear()
+        self.tmp.cleanup()
+
+    @override_settings(ADS_VIEW_REPEAT_THRESHOLD=0)
+    def test_blocked_event_goes_to_sink_instead_of_database(self):
+        with self.settings(
+            ADS_THROTTLE_EVENT_SINK="ads_throttle.sinks.FileEventSink",
+            ADS_THROTTLE_EVENT_SINK_OPTIONS={"directory": self.tmp.name},
+        ):
+            request = build_request(
+                path="/sink/", meta={"REMOTE_ADDR": "10.2.2.2", "HTTP_USER_AGENT": "ua"}
+            )
+            self.assertFalse(should_show_ads(request))
+            get_event_sink().close()
+        self.assertFalse(AdsThrottleEvent.objects.exists())
+        [path] = closed_event_files(self.tmp.name)
+        self.assertEqual([event["s"] for event in read_event_file(path)], ["/sink/"])
+
+    @override_settings(
+        ADS_VIEW_REPEAT_THRESHOLD=0,
+        ADS_THROTTLE_EVENT_SINK="tests.test_sinks.FailingSink",
+    )
+    def test_sink_errors_do_not_change_decision(self):
+        reset_breakers()
+        request = build_request(
+            path="/sink/", meta={"REMOTE_ADDR": "10.2.2.3", "HTTP_USER_AGENT": "ua"}
+        )
+        with self.assertLogs("ads_throttle.throttling", "WARNING"):
+            decisions = [should_show_ads(request) for _ in range(6)]
+        self.assertEqual(decisions, [False] * 6)
+        self.assertEqual(get_breaker("cache").state, STATE_CLOSED)
+
+
+class LoadEventsCommandTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _write(self, name, events):
+        lines = [json.dumps(event) for event in events]
+        (self.directory / name).write_text("\n".join(lines) + "\n")
+
+    def test_merges_events_into_existing_rows(self):
+        now = timezone.now()
+        AdsThrottleEvent.objects.create(
+            scope="/a/",
+            viewer_hash="v1",
+            first_seen=now - timedelta(hours=1),
+            last_seen=now - timedelta(hours=1),
+            count=5,
+        )
+        ts = now.timestamp()
+        self._write(
+            "events-1.ndjson",
+            [
+                {"s": "/a/", "v": "v1", "i": "ip1", "b": 1, "t": ts},
+                {"s": "/a/", "v": "v1", "i": "ip1", "b": 1, "t": ts + 1},
+                {"s": "/b/", "v": "v2", "i": "", "b": 0, "t": ts},
+            ],
+        )
+        (self.directory / "events-2.part").write_text("{}\n")
+        out = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command(
+                "ads_throttle_load_events",
+                str(self.directory),
+                "--chunk-size=2",
+                stdout=out,
+            )
+        self.assertIn("Loaded 3 events", out.getvalue())
+        first = AdsThrottleEvent.objects.get(scope="/a/", viewer_hash="v1")
+        self.assertEqual(first.count, 7)
+        self.assertTrue(first.blocked)
+        self.assertEqual(first.ip_address_hash, "ip1")
+        self.assertLess(first.first_seen, now)
+        second = AdsThrottleEvent.objects.get(scope="/b/", viewer_hash="v2")
+        self.assertEqual(second.count, 1)
+        self.assertFalse(second.blocked)
+        self.assertEqual(closed_event_files(self.directory), [])
+        self.assertTrue((self.directory / "events-2.part").exists())
+
+    def test_merges_rows_inserted_concurrently(self):
+        now = timezone.now()
+        self._write(
+            "events-1.ndjson",
+            [{"s": "/a/", "v": "v1", "i": "", "b": 0, "t": now.timestamp()}],
+        )
+        merge_existing = ads_throttle_load_events._merge_existing
+        calls = []
+
+        def racing_merge(*args):
+            merge_existing(*args)
+            if not calls:
+                AdsThrottleEvent.objects.create(
+                    scope="/a/",
+                    viewer_hash="v1",
+                    first_seen=now,
+                    last_seen=now,
+                    count=4,
+                )
+            calls.append(1)
+
+        with (
+            patch.object(ads_throttle_load_events, "_merge_existing", racing_merge),
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            call_command(
+                "ads_throttle_load_events", str(self.directory), stdout=StringIO()
+            )
+        self.assertEqual(AdsThrottleEvent.objects.get().count, 5)
+        self.assertEqual(len(calls), 2)
+
+    def test_keep_moves_files_out_of_later_runs(self):
+        self._write("events-1.ndjson", [{"s": "/a/", "v": "v1", "t": 1.0}])
+        for _ in range(2):
+            with self.captureOnCommitCallbacks(execute=True):
+                call_command(
+                    "ads_throttle_load_events",
+                    str(self.directory),
+                    "--keep",
+                    stdout=StringIO(),
+                )
+        self.assertEqual(closed_event_files(self.directory), [])
+        self.assertTrue((self.directory / "loaded" / "events-1.ndjson").exists())
+        self.assertEqual(AdsThrottleEvent.objects.get().count, 1)
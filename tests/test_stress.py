@@ -0,0 +1,74 @@
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TransactionTestCase, override_settings
+
+from ads_throttle.models import AdsThrottleEvent
+
+
+@override_settings(
+    ADS_VIEW_REPEAT_WINDOW_SECONDS=60,
+    ADS_VIEW_REPEAT_THRESHOLD=5,
+    ADS_BLOCK_SECONDS=60,
+    ADS_THROTTLE_EVENT_SINK="ads_throttle.sinks.FileEventSink",
+)
+class StressCommandTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        sink_options = override_settings(
+            ADS_THROTTLE_EVENT_SINK_OPTIONS={"directory": self.tmp.name}
+        )
+        sink_options.enable()
+        self.addCleanup(sink_options.disable)
+
+    def _stress(self, *args):
+        stdout = StringIO()
+        call_command(
+            "ads_throttle_stress",
+            "--processes",
+            "1",
+            "--threads",
+            "4",
+            "--viewers",
+            "3",
+            "--requests-per-viewer",
+            "12",
+            *args,
+            stdout=stdout,
+        )
+        return stdout.getvalue()
+
+    def test_invariants_hold_on_atomic_backend(self):
+        output = self._stress()
+        self.assertIn("errors=0", output)
+        self.assertIn("max_shown=5", output)
+        self.assertIn("invariants hold", output)
+
+    @override_settings(ADS_THROTTLE_EVENT_SINK=None)
+    def test_phase_removes_its_events_and_cache_keys(self):
+        # One thread: SQLite serializes concurrent event writes.
+        self._stress("--threads", "1")
+        self.assertFalse(AdsThrottleEvent.objects.exists())
+        leftover = [
+            key
+            for key in cache._cache
+            if ":ads:" in key or ":ads_throttle:event:" in key
+        ]
+        self.assertEqual(leftover, [])
+
+    def test_reports_viewers_shown_past_threshold(self):
+        with patch(
+            "ads_throttle.management.commands.ads_throttle_stress.should_show_ads",
+            return_value=True,
+        ):
+            with self.assertRaisesMessage(CommandError, "Invariant violations"):
+                self._stress()
+
+    def test_refuses_process_local_cache_across_processes(self):
+        with self.assertRaisesMessage(CommandError, "LocMemCache"):
+            call_command("ads_throttle_stress", "--processes", "2", stdout=StringIO())
@@ -1,20 +1,23 @@
 import hashlib
 from datetime import timedelta
+from unittest.mock import patch
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AnonymousUser
 from django.core.cache import cache
+from django.core.signing import Signer
 from django.test import SimpleTestCase, TestCase, override_settings
 from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
 
 from ads_throttle.models import (AdsThrottleEvent, AdsThrottleOverride,
                                  SiteSetting)
 from ads_throttle.throttling import (_get_client_ip, _get_override_decision,
                                      _get_settings_values, _hash_ip,
                                      _record_event, _should_record_event,
-                                     _viewer_fingerprint, _viewer_id,
-                                     should_show_ads)
+                                     _should_show_ads, _viewer_fingerprint,
+                                     _viewer_id, should_show_ads)
 from tests.utils import build_request
 
 
@@ -49,6 +52,7 @@ class SettingsValuesTests(TestCase):
             event_record_seconds=33,
         )
         values = _get_settings_values()
+        self.assertEqual(values["ip_repeat_threshold"], 0)
         self.assertEqual(values["view_repeat_window_seconds"], 555)
         self.assertEqual(values["view_repeat_threshold"], 9)
         self.assertEqual(values["block_seconds"], 321)
@@ -261,3 +265,185 @@ class ShouldShowAdsTests(TestCase):
         self.assertFalse(should_show_ads(request))
         event = AdsThrottleEvent.objects.get(scope=scope)
         self.assertEqual(event.count, 1)
+
+
+@override_settings(
+    ADS_VIEW_REPEAT_WINDOW_SECONDS=60,
+    ADS_VIEW_REPEAT_THRESHOLD=100,
+    ADS_BLOCK_SECONDS=60,
+    ADS_IP_REPEAT_THRESHOLD=2,
+    ADS_SITE_IP_REPEAT_THRESHOLD=3,
+)
+class AggregateCounterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def _rotating_session_request(self, path, ip):
+        return build_request(
+            path=path,
+            meta={"REMOTE_ADDR": ip, "HTTP_USER_AGENT": "ua"},
+        )
+
+    def test_ip_counter_blocks_rotating_sessions(self):
+        ip = "10.20.30.40"
+        self.assertTrue(should_show_ads(self._rotating_session_request("/a/", ip)))
+        self.assertTrue(should_show_ads(self._rotating_session_request("/a/", ip)))
+        self.assertFalse(should_show_ads(self._rotating_session_request("/a/", ip)))
+        self.assertFalse(should_show_ads(self._rotating_session_request("/a/", ip)))
+        self.assertTrue(
+            should_show_ads(self._rotating_session_request("/a/", "10.20.30.41"))
+        )
+
+    def test_site_wide_ip_counter_spans_scopes(self):
+        ip = "10.20.30.42"
+        for path in ("/a/", "/b/", "/c/"):
+            self.assertTrue(should_show_ads(self._rotating_session_request(path, ip)))
+        self.assertFalse(should_show_ads(self._rotating_session_request("/d/", ip)))
+        self.assertTrue(cache.get(f"ads:block:site:{_hash_ip(ip)}"))
+
+    @override_settings(ADS_IP_REPEAT_THRESHOLD=0, ADS_SITE_IP_REPEAT_THRESHOLD=0)
+    def test_disabled_levels_do_not_write_counters(self):
+        ip = "10.20.30.43"
+        self.assertTrue(should_show_ads(self._rotating_session_request("/a/", ip)))
+        ip_hash = _hash_ip(ip)
+        self.assertIsNone(cache.get(f"ads:views:site:{ip_hash}"))
+        self.assertFalse(any(":ads:views:ip:" in key for key in cache._cache))
+
+
+@override_settings(
+    ADS_VIEW_REPEAT_WINDOW_SECONDS=60,
+    ADS_VIEW_REPEAT_THRESHOLD=6,
+    ADS_BLOCK_SECONDS=60,
+    ADS_THROTTLE_COUNTER_SHARDS=4,
+    ADS_THROTTLE_HOT_KEY_THRESHOLD=2,
+)
+class HotKeyShardingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_hot_viewer_counter_is_sharded_and_still_blocks(self):
+        request = build_request(
+            path="/nat/",
+            with_session=False,
+            meta={"REMOTE_ADDR": "10.9.9.9", "HTTP_USER_AGENT": "ua"},
+        )
+        for _ in range(6):
+            self.assertTrue(should_show_ads(request))
+        self.assertFalse(should_show_ads(request))
+        markers = [key for key in cache._cache if key.endswith(":hot")]
+        self.assertEqual(len(markers), 1)
+
+    @override_settings(ADS_VIEW_REPEAT_THRESHOLD=20, ADS_THROTTLE_HOT_KEY_THRESHOLD=100)
+    def test_hot_threshold_follows_view_threshold(self):
+        request = build_request(
+            path="/nat/",
+            with_session=False,
+            meta={"REMOTE_ADDR": "10.9.9.8", "HTTP_USER_AGENT": "ua"},
+        )
+        for _ in range(10):
+            self.assertTrue(should_show_ads(request))
+        self.assertTrue(any(key.endswith(":hot") for key in cache._cache))
+
+    def test_identified_viewer_counter_is_not_sharded(self):
+        request = build_request(
+            path="/nat/",
+            meta={"REMOTE_ADDR": "10.9.9.7", "HTTP_USER_AGENT": "ua"},
+            cookies={settings.SESSION_COOKIE_NAME: "busy-reader"},
+        )
+        for _ in range(6):
+            self.assertTrue(should_show_ads(request))
+        self.assertFalse(should_show_ads(request))
+        self.assertFalse(any(key.endswith(":hot") for key in cache._cache))
+
+
+@override_settings(
+    ADS_VIEW_REPEAT_WINDOW_SECONDS=60,
+    ADS_VIEW_REPEAT_THRESHOLD=10,
+    ADS_BLOCK_SECONDS=60,
+    ADS_THROTTLE_SAMPLED_SCOPES={"/hot/": 5},
+)
+class SampledCountingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_sampled_impression_counts_as_n(self):
+        request = build_request()
+        with patch("ads_throttle.throttling.is_sampled", return_value=True):
+            self.assertTrue(should_show_ads(request, scope="/hot/"))
+            self.assertTrue(should_show_ads(request, scope="/hot/"))
+            self.assertFalse(should_show_ads(request, scope="/hot/"))
+
+    def test_unsampled_impression_skips_counter_write(self):
+        request = build_request()
+        with patch("ads_throttle.throttling.is_sampled", return_value=False):
+            for _ in range(20):
+                self.assertTrue(should_show_ads(request, scope="/hot/"))
+        self.assertFalse(any(":ads:views:" in key for key in cache._cache))
+
+    def test_other_scopes_are_counted_exactly(self):
+        request = build_request()
+        with patch("ads_throttle.throttling.is_sampled", return_value=False):
+            for _ in range(10):
+                self.assertTrue(should_show_ads(request, scope="/cold/"))
+            self.assertFalse(should_show_ads(request, scope="/cold/"))
+
+
+class _Untouchable:
+    def __getattr__(self, name):
+        raise AssertionError(f"loaded {name} on the throttle path")
+
+
+@override_settings(ADS_THROTTLE_IDENTITY_MODE="cookie")
+class IdentityModeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            username="cookie-viewer",
+            password="pass",
+        )
+        self.user_loads = 0
+
+    def _load_user(self):
+        self.user_loads += 1
+        return self.user
+
+    def _request(self):
+        request = build_request(
+            "/a/",
+            with_session=False,
+            meta={"REMOTE_ADDR": "1.2.3.4"},
+            cookies={settings.SESSION_COOKIE_NAME: "raw-session"},
+        )
+        request.session = _Untouchable()
+        request.user = SimpleLazyObject(self._load_user)
+        return request
+
+    def test_cookie_mode_skips_user_and_session(self):
+        request = self._request()
+        self.assertEqual(_viewer_id(request), "session:raw-session")
+        self.assertTrue(_should_show_ads(request, None, None))
+        self.assertEqual(self.user_loads, 0)
+
+    def test_session_override_matches_raw_cookie(self):
+        AdsThrottleOverride.objects.create(
+            viewer_id="session:raw-session", force_block=True
+        )
+        self.assertFalse(_should_show_ads(self._request(), None, None))
+        self.assertEqual(self.user_loads, 0)
+
+    def test_user_loaded_only_when_user_overrides_exist(self):
+        self.assertTrue(_should_show_ads(self._request(), "/b/", None))
+        self.assertEqual(self.user_loads, 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            AdsThrottleOverride.objects.create(user=self.user, force_block=True)
+        self.assertFalse(_should_show_ads(self._request(), "/b/", None))
+        self.assertEqual(self.user_loads, 1)
+
+    @override_settings(ADS_THROTTLE_IDENTITY_MODE="signed_cookie")
+    def test_signed_cookie_mode(self):
+        request = self._request()
+        self.assertEqual(_viewer_id(request), "anonymous")
+        request.COOKIES["ads_throttle_viewer"] = Signer(
+            salt="ads_throttle.viewer"
+        ).sign("abc")
+        self.assertEqual(_viewer_id(request), "viewer:abc")
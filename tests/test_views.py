@@ -0,0 +1,178 @@
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ads_throttle.counters import incr_many
+from ads_throttle.models import AdsThrottleEvent
+
+SLOT_TEMPLATES = [
+    {
+        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "OPTIONS": {
+            "loaders": [
+                (
+                    "django.template.loaders.locmem.Loader",
+                    {"ads/sidebar.html": "<ins>ad for {{ scope }}</ins>"},
+                )
+            ]
+        },
+    }
+]
+
+
+@override_settings(
+    ADS_VIEW_REPEAT_WINDOW_SECONDS=60,
+    ADS_VIEW_REPEAT_THRESHOLD=1,
+    ADS_BLOCK_SECONDS=60,
+)
+class DecisionViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.url = reverse("ads_throttle:decision")
+
+    def test_returns_decisions_per_scope(self):
+        response = self.client.get(self.url, {"scope": ["/a/", "/b/", "/a/"]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"decisions": {"/a/": True, "/b/": True}})
+        response = self.client.get(self.url, {"scope": ["/a/"]})
+        self.assertEqual(response.json(), {"decisions": {"/a/": False}})
+
+    def test_response_is_private_and_not_stored(self):
+        response = self.client.get(self.url, {"scope": "/a/"})
+        directives = {value.strip() for value in response["Cache-Control"].split(",")}
+        self.assertEqual(directives, {"private", "no-store"})
+
+    def test_requires_scopes(self):
+        self.assertEqual(self.client.get(self.url).status_code, 400)
+        response = self.client.get(
+            self.url, {"scope": [f"/{index}/" for index in range(11)]}
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_rejects_invalid_scopes(self):
+        for scope in ("a/", "/" + "x" * 512):
+            response = self.client.get(self.url, {"scope": ["/a/", scope]})
+            self.assertEqual(response.status_code, 400)
+        self.assertFalse(any(":ads:views:" in key for key in cache._cache))
+
+    def test_rejects_cross_site_requests(self):
+        for headers in (
+            {"sec_fetch_site": "cross-site"},
+            {"origin": "https://evil.example"},
+        ):
+            response = self.client.get(self.url, {"scope": "/a/"}, headers=headers)
+            self.assertEqual(response.status_code, 403)
+        self.assertFalse(any(":ads:views:" in key for key in cache._cache))
+        response = self.client.get(
+            self.url, {"scope": "/a/"}, headers={"sec_fetch_site": "same-origin"}
+        )
+        self.assertEqual(response.json(), {"decisions": {"/a/": True}})
+
+    def test_rejects_post(self):
+        self.assertEqual(self.client.post(self.url).status_code, 405)
+
+
+@override_settings(
+    ADS_VIEW_REPEAT_WINDOW_SECONDS=60,
+    ADS_VIEW_REPEAT_THRESHOLD=1,
+    ADS_BLOCK_SECONDS=60,
+    ADS_THROTTLE_SLOT_TEMPLATES={"sidebar": "ads/sidebar.html"},
+    TEMPLATES=SLOT_TEMPLATES,
+)
+class SlotViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.url = reverse("ads_throttle:slot", args=["sidebar"])
+
+    def test_renders_slot_until_blocked(self):
+        response = self.client.get(self.url, {"scope": "/a/"})
+        self.assertEqual(response.content, b"<ins>ad for /a/</ins>")
+        self.assertIn("no-store", response["Cache-Control"])
+        response = self.client.get(self.url, {"scope": "/a/"})
+        self.assertEqual(response.content, b"")
+        self.assertIn("no-store", response["Cache-Control"])
+
+    def test_rejects_cross_site_and_invalid_scopes(self):
+        response = self.client.get(
+            self.url, {"scope": "/a/"}, headers={"sec_fetch_site": "cross-site"}
+        )
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.client.get(self.url, {"scope": "a"}).status_code, 400)
+        self.assertFalse(any(":ads:views:" in key for key in cache._cache))
+
+    def test_unknown_slot(self):
+        url = reverse("ads_throttle:slot", args=["missing"])
+        self.assertEqual(self.client.get(url, {"scope": "/a/"}).status_code, 404)
+
+
+@override_settings(
+    ADS_VIEW_REPEAT_WINDOW_SECONDS=60,
+    ADS_VIEW_REPEAT_THRESHOLD=2,
+    ADS_BLOCK_SECONDS=60,
+    ADS_THROTTLE_COUNT_MODE="beacon",
+)
+class BeaconViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client(enforce_csrf_checks=True)
+        self.url = reverse("ads_throttle:beacon")
+        self.decision_url = reverse("ads_throttle:decision")
+
+    def _decide(self, scope):
+        response = self.client.get(self.decision_url, {"scope": scope})
+        return response.json()["decisions"][scope]
+
+    def test_decisions_are_read_only(self):
+        for _ in range(5):
+            self.assertTrue(self._decide("/a/"))
+        self.assertFalse(any(":ads:views:" in key for key in cache._cache))
+
+    def test_beacons_count_and_block(self):
+        for _ in range(2):
+            response = self.client.post(self.url, {"scope": ["/a/", "/b/"]})
+            self.assertEqual(response.status_code, 204)
+        self.assertTrue(self._decide("/a/"))
+        self.client.post(self.url, {"scope": "/a/"})
+        self.assertFalse(self._decide("/a/"))
+        self.assertTrue(self._decide("/b/"))
+        self.assertEqual(AdsThrottleEvent.objects.get().scope, "/a/")
+
+    def test_scopes_in_one_beacon_share_one_increment_batch(self):
+        with patch(
+            "ads_throttle.throttling.incr_many", wraps=incr_many
+        ) as mocked_incr_many:
+            self.client.post(self.url, {"scope": ["/a/", "/b/", "/c/"]})
+        mocked_incr_many.assert_called_once()
+        self.assertEqual(len(mocked_incr_many.call_args.args[1]), 3)
+
+    @override_settings(ADS_THROTTLE_COUNT_MODE="decision")
+    def test_beacons_are_ignored_in_decision_mode(self):
+        self.client.post(self.url, {"scope": "/a/"})
+        self.assertFalse(any(":ads:views:" in key for key in cache._cache))
+
+    def test_cross_site_beacons_are_rejected(self):
+        for headers in (
+            {"origin": "https://evil.example"},
+            {"origin": "null"},
+            {"sec_fetch_site": "cross-site"},
+            {"sec_fetch_site": "same-site"},
+        ):
+            response = self.client.post(self.url, {"scope": "/a/"}, headers=headers)
+            self.assertEqual(response.status_code, 403)
+        self.assertFalse(any(":ads:views:" in key for key in cache._cache))
+
+    @override_settings(CSRF_TRUSTED_ORIGINS=["https://www.example.com"])
+    def test_same_origin_and_trusted_beacons_count(self):
+        for headers in (
+            {"origin": "http://testserver", "sec_fetch_site": "same-origin"},
+            {"origin": "https://www.example.com"},
+            {"sec_fetch_site": "same-origin"},
+        ):
+            response = self.client.post(self.url, {"scope": "/a/"}, headers=headers)
+            self.assertEqual(response.status_code, 204)
+        self.assertFalse(self._decide("/a/"))
+
+    def test_rejects_get(self):
+        self.assertEqual(self.client.get(self.url).status_code, 405)
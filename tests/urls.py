@@ -1,9 +1,12 @@
 from django.http import HttpResponse
-from django.urls import path
+from django.urls import include, path
 
 
 def _dummy_view(request):
     return HttpResponse("ok")
 
 
-urlpatterns = [path("__dummy__/", _dummy_view, name="dummy")]
+urlpatterns = [
+    path("__dummy__/", _dummy_view, name="dummy"),
+    path("ads-throttle/", include("ads_throttle.urls")),
+]